@@ -1,11 +1,22 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import Group
+from django.core.paginator import Paginator
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.functional import cached_property
 
-from .models import User
+from .models import User, OutboundEmail
 from .forms import UserCreationForm, UserChangeForm
 
 
+class UserAdminPaginator(Paginator):
+    @cached_property
+    def count(self):
+        # Count primary keys only, so per-row annotations aren't evaluated for the whole table
+        return self.object_list.values('pk').count()
+
+
 class UserAdmin(BaseUserAdmin):
     # The forms to add and change user instances
     form = UserChangeForm
@@ -27,9 +38,22 @@ class UserAdmin(BaseUserAdmin):
             'fields': ('email', 'first_name', 'last_name', 'password1', 'password2')
         }),
     )
-    search_fields = ('email',)
+    # Prefix search, so it can use the accounts_user_email_search index rather than scanning the table
+    search_fields = ('^email',)
     ordering = ('email',)
     filter_horizontal = ()
+    list_per_page = 50
+    paginator = UserAdminPaginator
+    # Skip counting the whole table on every changelist page
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # Annotate whether each user has direct permissions, for has_change_permission()
+        qs = super(UserAdmin, self).get_queryset(request)
+        if request.user.is_superuser:
+            return qs
+        user_permissions = User.user_permissions.through.objects.filter(user=OuterRef('pk'))
+        return qs.annotate(has_user_permissions=Exists(user_permissions))
 
     def get_readonly_fields(self, request, obj=None):
         # Prevent staff changing their own permissions
@@ -43,11 +67,36 @@ class UserAdmin(BaseUserAdmin):
         has = super(UserAdmin, self).has_change_permission(request, obj)
         if obj and not request.user.is_superuser:
             if obj != request.user:
-                if obj.is_superuser or obj.user_permissions.exists():
+                has_user_permissions = getattr(obj, 'has_user_permissions', None)
+                if has_user_permissions is None:
+                    has_user_permissions = obj.user_permissions.exists()
+                if obj.is_superuser or has_user_permissions:
                     has = False
         return has
 
 
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('id', 'to_email', 'subject', 'status', 'attempts', 'available_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to_email',)
+    ordering = ('-id',)
+    readonly_fields = ('created', 'sent_at', 'last_error')
+    # Bodies carry working activation and email change links
+    exclude = ('message', 'html_message')
+    actions = ['requeue']
+
+    def requeue(self, request, queryset):
+        # Give dead or failing emails a fresh set of attempts
+        count = queryset.exclude(status=OutboundEmail.STATUS_SENT).update(
+            status=OutboundEmail.STATUS_PENDING,
+            attempts=0,
+            available_at=timezone.now(),
+        )
+        self.message_user(request, '{0} email(s) requeued'.format(count))
+    requeue.short_description = 'Requeue selected emails'
+
+
 # Register user admin
 admin.site.register(User, UserAdmin)
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
 admin.site.unregister(Group)
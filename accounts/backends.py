@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from .models import User
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that keeps the user row for each session in the cache, so authenticated requests
+    don't need to query the user table. Entries are dropped by User.save() and User.delete(), so
+    changes made with QuerySet.update() only show up once the entry expires.
+
+    Only the USER_AUTH_FIELDS columns are loaded and cached; the rest of the row is fetched the first time
+    one of them is used. Each user's permission set is cached alongside, and dropped when their groups
+    or permissions change (see accounts.signals).
+    """
+    def get_user(self, user_id):
+        key = User.cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            users = User._default_manager.all()
+            fields = getattr(settings, 'USER_AUTH_FIELDS', None)
+            if fields:
+                users = users.only(*fields)
+            try:
+                user = users.get(pk=user_id)
+            except User.DoesNotExist:
+                return None
+            cache.set(key, user, getattr(settings, 'USER_CACHE_TIMEOUT', 300))
+        return user if self.user_can_authenticate(user) else None
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, '_perm_cache'):
+            key = User.perm_cache_key(user_obj.pk)
+            perms = cache.get(key)
+            if perms is None:
+                perms = super(CachedModelBackend, self).get_all_permissions(user_obj)
+                cache.set(key, perms, getattr(settings, 'USER_CACHE_TIMEOUT', 300))
+            user_obj._perm_cache = perms
+        return user_obj._perm_cache
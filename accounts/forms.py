@@ -2,6 +2,7 @@ from django.contrib.auth import forms as auth_forms
 from django.contrib.auth.password_validation import validate_password, password_validators_help_text_html
 from django import forms
 from django.contrib.auth.forms import ReadOnlyPasswordHashField
+from django.utils import timezone
 
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Submit
@@ -11,6 +12,7 @@ from .models import User
 
 #
 # User-facing forms
+# Crispy form helpers are class attributes, built once and shared by every instance
 #
 class UserCreationForm(forms.ModelForm):
     """
@@ -19,6 +21,9 @@ class UserCreationForm(forms.ModelForm):
     password1 = forms.CharField(label='Password', widget=forms.PasswordInput, help_text=password_validators_help_text_html)
     password2 = forms.CharField(label='Password confirmation', widget=forms.PasswordInput)
 
+    helper = FormHelper()
+    helper.add_input(Submit('submit', 'Register'))
+
     class Meta:
         model = User
         fields = ('email', 'first_name', 'last_name')
@@ -41,16 +46,14 @@ class UserCreationForm(forms.ModelForm):
             user.save()
         return user
 
-    def __init__(self, *args, **kwargs):
-        super(UserCreationForm, self).__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.add_input(Submit('submit', 'Register'))
-
 
 class UserProfileEditForm(forms.ModelForm):
     """
     A form for regular uses to edit their profile
     """
+    helper = FormHelper()
+    helper.add_input(Submit('submit', 'Save'))
+
     class Meta:
         model = User
         fields = (
@@ -58,16 +61,14 @@ class UserProfileEditForm(forms.ModelForm):
             'last_name',
           )
 
-    def __init__(self, *args, **kwargs):
-        super(UserProfileEditForm, self).__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.add_input(Submit('submit', 'Save'))
-
 
 class UserChangeSelfForm(forms.ModelForm):
     """
     A form for regular uses to edit their own details.
     """
+    helper = FormHelper()
+    helper.add_input(Submit('submit', 'Save'))
+
     class Meta:
         model = User
         fields = (
@@ -75,16 +76,14 @@ class UserChangeSelfForm(forms.ModelForm):
             'last_name',
           )
 
-    def __init__(self, *args, **kwargs):
-        super(UserChangeSelfForm, self).__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.add_input(Submit('submit', 'Save'))
-
 
 class EmailChangeForm(forms.ModelForm):
     """
     A form for changing one's email address
     """
+    helper = FormHelper()
+    helper.add_input(Submit('submit', 'Save'))
+
     class Meta:
         model = User
         fields = {
@@ -93,46 +92,45 @@ class EmailChangeForm(forms.ModelForm):
 
     def clean_requested_email(self):
         requested_email = self.cleaned_data.get('requested_email')
+        if requested_email:
+            requested_email = User.objects.normalize_email(requested_email)
         if User.objects.filter(email=requested_email).exists():
             if self.instance.email == requested_email:
                 raise forms.ValidationError('That is the same as your current email address')
             raise forms.ValidationError('That email is already taken')
         return requested_email
 
-    def __init__(self, *args, **kwargs):
-        super(EmailChangeForm, self).__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.add_input(Submit('submit', 'Save'))
+    def save(self, commit=True):
+        # Lets `manage.py cleanup_accounts` clear requests once their verification link has expired
+        self.instance.email_requested_at = timezone.now()
+        return super(EmailChangeForm, self).save(commit)
 
 
 class PasswordChangeForm(auth_forms.PasswordChangeForm):
-    def __init__(self, *args, **kwargs):
-        super(PasswordChangeForm, self).__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.add_input(Submit('submit', 'Change'))
+    helper = FormHelper()
+    helper.add_input(Submit('submit', 'Change'))
 
 
 class PasswordResetForm(auth_forms.PasswordResetForm):
-    def __init__(self, *args, **kwargs):
-        super(PasswordResetForm, self).__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.add_input(Submit('submit', 'Reset'))
+    helper = FormHelper()
+    helper.add_input(Submit('submit', 'Reset'))
+
+    def get_users(self, email):
+        # Emails are stored lowercased, so match exactly rather than with Django's email__iexact, which can't use the unique index
+        users = User.objects.filter(email=User.objects.normalize_email(email), is_active=True)
+        return (u for u in users if u.has_usable_password())
 
 
 class SetPasswordForm(auth_forms.SetPasswordForm):
-    def __init__(self, *args, **kwargs):
-        super(SetPasswordForm, self).__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.add_input(Submit('submit', 'Set Password'))
+    helper = FormHelper()
+    helper.add_input(Submit('submit', 'Set Password'))
 
 
 class AuthenticationForm(auth_forms.AuthenticationForm):
     username = forms.EmailField(max_length=255)
 
-    def __init__(self, *args, **kwargs):
-        super(AuthenticationForm, self).__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.add_input(Submit('submit', 'Login'))
+    helper = FormHelper()
+    helper.add_input(Submit('submit', 'Login'))
 
 
 #
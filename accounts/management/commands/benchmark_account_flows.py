@@ -0,0 +1,196 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core import mail
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from accounts.models import OutboundEmail
+
+PASSWORD = 'benchmark-Passw0rd'
+LINK_RE = re.compile(r'https?://\S+')
+
+
+def percentile(values, p):
+    """
+    Nearest-rank percentile of a list of numbers
+    """
+    values = sorted(values)
+    if not values:
+        return None
+    return values[max(0, int(round(p / 100 * len(values) + 0.5)) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Drives the account flows (register, activate, login, profile edit, email change, verify, delete) '
+        'through the test client against a throwaway SQLite database, and reports throughput, latency '
+        'percentiles and queries per request. Results can be saved and compared against a previous run.'
+    )
+    steps = ('register', 'activate', 'login', 'profile', 'profile_edit', 'email_edit', 'email_verify', 'delete')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flows', type=int, default=50, help='Number of users to take through the flows')
+        parser.add_argument('--concurrency', type=int, default=4, help='Flows run in parallel')
+        parser.add_argument('--fast-hashers', action='store_true',
+                            help='Use the MD5 password hasher, to measure everything but password hashing')
+        parser.add_argument('--output', help='Save results as JSON to this file')
+        parser.add_argument('--compare', help='Fail if results regress against this saved JSON file')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed p95 latency increase over the baseline, as a fraction')
+
+    def handle(self, *args, **options):
+        if options['fast_hashers']:
+            settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+        setup_test_environment()
+        tmp_dir = tempfile.mkdtemp()
+        # A file rather than the usual in-memory test database, so concurrent flows can share it
+        connection.settings_dict.update({
+            'ENGINE': 'gifttracker.db.sqlite3',
+            'OPTIONS': {'pragmas': {'journal_mode': 'wal', 'synchronous': 'normal', 'busy_timeout': 30000}},
+            'TEST': {'NAME': os.path.join(tmp_dir, 'benchmark.sqlite3')},
+        })
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Every flow comes from the same address, which would soon be throttled. Pages are rendered without
+            # collectstatic having been run.
+            with override_settings(RATE_LIMITS={},
+                                   STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'):
+                results = self.run(options['flows'], options['concurrency'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+        if options['compare']:
+            with open(options['compare']) as f:
+                regressions = self.compare(json.load(f), results, options['tolerance'])
+            if regressions:
+                raise CommandError('Regressions against {0}:\n{1}'.format(options['compare'], '\n'.join(regressions)))
+            self.stdout.write(self.style.SUCCESS('No regressions against {0}'.format(options['compare'])))
+
+    def run(self, flows, concurrency):
+        """
+        Runs the flows and returns a summary dict
+        """
+        self.samples = {step: [] for step in self.steps}
+        self.lock = threading.Lock()
+        self.mail_lock = threading.Lock()
+        start = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(self.threaded_flow, range(flows)))
+        else:
+            for i in range(flows):
+                self.flow(i)
+        elapsed = time.perf_counter() - start
+
+        requests = sum(len(s) for s in self.samples.values())
+        return {
+            'flows': flows,
+            'concurrency': concurrency,
+            'seconds': elapsed,
+            'requests_per_second': requests / elapsed,
+            'flows_per_second': flows / elapsed,
+            'steps': {
+                step: {
+                    'requests': len(samples),
+                    'p50_ms': percentile([ms for ms, q in samples], 50),
+                    'p95_ms': percentile([ms for ms, q in samples], 95),
+                    'p99_ms': percentile([ms for ms, q in samples], 99),
+                    'queries': sum(q for ms, q in samples) / len(samples),
+                }
+                for step, samples in self.samples.items() if samples
+            },
+        }
+
+    def threaded_flow(self, i):
+        try:
+            self.flow(i)
+        finally:
+            connections.close_all()
+
+    def flow(self, i):
+        client = Client()
+        email = 'flow{0}@benchmark.example.com'.format(i)
+
+        self.request('register', client, 'post', reverse('register'), {
+            'email': email, 'first_name': 'Flow', 'last_name': str(i), 'password1': PASSWORD, 'password2': PASSWORD,
+        })
+        self.request('activate', client, 'get', self.find_link(email, 'Activate your account'))
+        self.request('login', client, 'post', reverse('login'), {'username': email, 'password': PASSWORD})
+        self.request('profile', client, 'get', reverse('profile'))
+        self.request('profile_edit', client, 'post', reverse('profile_edit'), {'first_name': 'Edited', 'last_name': str(i)})
+        new_email = 'changed-' + email
+        self.request('email_edit', client, 'post', reverse('email_edit'), {'requested_email': new_email})
+        self.request('email_verify', client, 'get', self.find_link(email, 'Verify Email Address'))
+        self.request('delete', client, 'post', reverse('delete_account'), {'confirm': '1'})
+
+    def request(self, step, client, method, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            ms = (time.perf_counter() - start) * 1000
+        if response.status_code >= 400:
+            raise CommandError('{0} returned {1}'.format(step, response.status_code))
+        with self.lock:
+            self.samples[step].append((ms, len(queries)))
+        return response
+
+    def find_link(self, email, subject, attempts=50):
+        """
+        Delivers queued mail to the locmem outbox and returns the path of the link in `email`'s message
+        """
+        for _ in range(attempts):
+            # One drainer at a time, and retry if SQLite refuses to upgrade the claim transaction to a write
+            with self.mail_lock:
+                try:
+                    OutboundEmail.objects.send_pending(backend='django.core.mail.backends.locmem.EmailBackend')
+                except OperationalError:
+                    pass
+            with self.lock:
+                for message in mail.outbox:
+                    if message.to == [email] and message.subject == subject:
+                        return urlparse(LINK_RE.search(message.body).group()).path
+            time.sleep(0.05)
+        raise CommandError('No "{0}" email for {1}'.format(subject, email))
+
+    def report(self, results):
+        self.stdout.write('{0} flows, concurrency {1}: {2:.1f} requests/s, {3:.2f} flows/s'.format(
+            results['flows'], results['concurrency'], results['requests_per_second'], results['flows_per_second']))
+        self.stdout.write('{0:<14} {1:>8} {2:>9} {3:>9} {4:>9} {5:>8}'.format(
+            'step', 'requests', 'p50 ms', 'p95 ms', 'p99 ms', 'queries'))
+        for step, s in results['steps'].items():
+            self.stdout.write('{0:<14} {1:>8} {2:>9.1f} {3:>9.1f} {4:>9.1f} {5:>8.1f}'.format(
+                step, s['requests'], s['p50_ms'], s['p95_ms'], s['p99_ms'], s['queries']))
+
+    def compare(self, baseline, results, tolerance):
+        """
+        Returns a description of each step whose p95 latency or query count got worse
+        """
+        regressions = []
+        for step, s in results['steps'].items():
+            base = baseline['steps'].get(step)
+            if not base:
+                continue
+            if s['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+                regressions.append('{0}: p95 {1:.1f} ms, was {2:.1f} ms'.format(step, s['p95_ms'], base['p95_ms']))
+            if s['queries'] > base['queries']:
+                regressions.append('{0}: {1:.1f} queries, was {2:.1f}'.format(step, s['queries'], base['queries']))
+        return regressions
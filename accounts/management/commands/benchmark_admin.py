@@ -0,0 +1,89 @@
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Permission
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a throwaway SQLite database with a large user table and times the user admin changelist, search '
+        'and change view for a staff user.'
+    )
+    domain = 'admin-benchmark.example.com'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500000, help='Number of users to seed')
+        parser.add_argument('--repeat', type=int, default=10, help='Timed runs per page')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        tmp_dir = tempfile.mkdtemp()
+        # A file rather than the usual in-memory test database, to include reading the user table from disk
+        connection.settings_dict.update({
+            'ENGINE': 'gifttracker.db.sqlite3',
+            'OPTIONS': {'pragmas': {'journal_mode': 'wal', 'synchronous': 'normal'}},
+            'TEST': {'NAME': os.path.join(tmp_dir, 'benchmark.sqlite3')},
+        })
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.seed(options['users'])
+            # Plain static storage, so the admin renders without collectstatic having been run
+            with override_settings(ALLOWED_HOSTS=['testserver'],
+                                   STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'):
+                self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def seed(self, count, batch_size=10000):
+        password = make_password(None)
+        for start in range(0, count, batch_size):
+            with transaction.atomic():
+                User.objects.bulk_create([
+                    User(email='user{0}@{1}'.format(i, self.domain), first_name='User', last_name=str(i), password=password)
+                    for i in range(start, min(start + batch_size, count))
+                ])
+            self.stdout.write('\rSeeded {0}/{1} users'.format(min(start + batch_size, count), count), ending='')
+        self.stdout.write('')
+
+    def run(self, options):
+        # A staff user without superuser status, which is the path that checks each user's permissions
+        staff = User.objects.create(email='staff@' + self.domain, first_name='Staff', last_name='User',
+                                    is_active=True, is_staff=True)
+        staff.user_permissions.set(
+            Permission.objects.filter(content_type__app_label='accounts', content_type__model='user')
+        )
+        client = Client()
+        client.force_login(staff)
+        target = User.objects.filter(email__endswith='@' + self.domain).order_by('pk').first()
+
+        changelist = reverse('admin:accounts_user_changelist')
+        pages = [
+            ('changelist', changelist, {}),
+            ('changelist p100', changelist, {'p': 100}),
+            ('search prefix', changelist, {'q': 'user12345'}),
+            ('change view', reverse('admin:accounts_user_change', args=[target.pk]), {}),
+        ]
+        self.stdout.write('{0:<18} {1:>10} {2:>8}'.format('page', 'median ms', 'queries'))
+        for name, url, params in pages:
+            timings = []
+            for _ in range(options['repeat']):
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = client.get(url, params)
+                    timings.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    self.stderr.write('{0} returned {1}'.format(name, response.status_code))
+            self.stdout.write('{0:<18} {1:>10.2f} {2:>8}'.format(name, statistics.median(timings), len(queries)))
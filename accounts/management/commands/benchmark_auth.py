@@ -0,0 +1,86 @@
+import pickle
+import statistics
+import time
+
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.backends import CachedModelBackend
+from accounts.models import User
+
+
+class FullRowBackend(CachedModelBackend):
+    """
+    The backend as it was: the whole row cached, and permissions queried on every request that checks one
+    """
+    get_all_permissions = ModelBackend.get_all_permissions
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares authenticated requests with the whole user row cached and permissions queried per request, '
+        'against USER_AUTH_FIELDS and the cached permission set: cache entry bytes, queries and time per page, '
+        'with the user cache cold and warm.'
+    )
+    email = 'auth-benchmark@example.com'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50, help='Timed requests per page')
+
+    def handle(self, *args, **options):
+        User.objects.filter(email=self.email).delete()
+        # Staff with some permissions, so the admin index checks them
+        user = User.objects.create(email=self.email, first_name='Auth', last_name='Benchmark', is_active=True,
+                                   is_staff=True, requested_email='auth-benchmark-new@example.com')
+        user.user_permissions.set(Permission.objects.filter(content_type__app_label='accounts'))
+        pages = [
+            ('home', reverse('main:home')),
+            ('profile', reverse('profile')),
+            ('admin index', reverse('admin:index')),
+        ]
+        modes = [
+            ('full row', FullRowBackend, []),
+            ('lean', CachedModelBackend, None),
+        ]
+        try:
+            self.stdout.write('{0:<10} {1:<12} {2:>11} {3:>12} {4:>12} {5:>10}'.format(
+                'mode', 'page', 'cache bytes', 'cold queries', 'warm queries', 'median ms'))
+            for mode, backend, fields in modes:
+                path = '{0}.{1}'.format(backend.__module__, backend.__name__)
+                mode_settings = {
+                    'AUTHENTICATION_BACKENDS': [path],
+                    'ALLOWED_HOSTS': ['testserver'],
+                    # Plain static storage, so pages render without collectstatic having been run
+                    'STATICFILES_STORAGE': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+                }
+                if fields is not None:
+                    mode_settings['USER_AUTH_FIELDS'] = fields
+                with override_settings(**mode_settings):
+                    client = Client()
+                    client.force_login(user, backend=path)
+                    for name, url in pages:
+                        self.run(client, user, mode, name, url, options['repeat'])
+        finally:
+            user.delete()
+
+    def run(self, client, user, mode, name, url, repeat):
+        User.invalidate_cached([user.pk])
+        with CaptureQueriesContext(connection) as cold:
+            client.get(url)
+        size = len(pickle.dumps(cache.get(User.cache_key(user.pk)), pickle.HIGHEST_PROTOCOL))
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as warm:
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            self.stderr.write('{0} returned {1}'.format(name, response.status_code))
+        self.stdout.write('{0:<10} {1:<12} {2:>11} {3:>12} {4:>12} {5:>10.2f}'.format(
+            mode, name, size, len(cold), len(warm), statistics.median(timings)))
@@ -0,0 +1,161 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from accounts.models import User
+from accounts.tokens import ACTIVATE, account_token_generator
+
+PASSWORD = 'benchmark-Passw0rd'
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class BenchmarkHandler(WSGIHandler):
+    """
+    Skips CSRF checks, as the test client does, so requests can be posted without fetching a form first
+    """
+    def get_response(self, request):
+        request._dont_enforce_csrf_checks = True
+        return super().get_response(request)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares serving registration, activation and email change requests from one sync worker, which '
+        'handles a request at a time, against a threaded worker (gunicorn gthread), at the same client '
+        'concurrency. --db-latency adds a delay to every query to stand in for a database across the network.'
+    )
+    servers = (('sync', WSGIServer), ('threaded', ThreadingWSGIServer))
+    domain = 'serving-benchmark.example.com'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=150, help='Requests per server')
+        parser.add_argument('--concurrency', type=int, default=8, help='Clients sending requests at once')
+        parser.add_argument('--db-latency', type=float, default=5, help='Milliseconds added to each query')
+        parser.add_argument('--fast-hashers', action='store_true',
+                            help='Use the MD5 password hasher, to measure everything but password hashing')
+
+    def handle(self, *args, **options):
+        if options['fast_hashers']:
+            settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        self.db_latency = options['db_latency'] / 1000
+
+        setup_test_environment()
+        tmp_dir = tempfile.mkdtemp()
+        # A file rather than the usual in-memory test database, so server threads can share it
+        connection.settings_dict['TEST'] = {'NAME': os.path.join(tmp_dir, 'benchmark.sqlite3')}
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        connection_created.connect(self.add_latency)
+        try:
+            with override_settings(ALLOWED_HOSTS=['127.0.0.1'], RATE_LIMITS={},
+                                   STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'):
+                self.seed(options['concurrency'], options['requests'])
+                self.stdout.write('{0:<10} {1:>10} {2:>9} {3:>9}'.format('server', 'requests/s', 'p50 ms', 'p95 ms'))
+                for name, server_class in self.servers:
+                    self.run(name, server_class, options)
+        finally:
+            connection_created.disconnect(self.add_latency)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def add_latency(self, sender, connection, **kwargs):
+        connection.execute_wrappers.append(self.delay)
+
+    def delay(self, execute, sql, params, many, context):
+        time.sleep(self.db_latency)
+        return execute(sql, params, many, context)
+
+    def seed(self, count, requests):
+        """
+        A logged in user to change email per client, and an inactive user per activation request, as each
+        activation link only works once
+        """
+        self.clients = []
+        for i in range(count):
+            active = User.objects.create_user('active{0}@{1}'.format(i, self.domain), 'Active', str(i), PASSWORD)
+            active.is_active = True
+            active.save()
+            client = Client()
+            client.force_login(active)
+            self.clients.append({
+                'cookie': '{0}={1}'.format(settings.SESSION_COOKIE_NAME, client.cookies[settings.SESSION_COOKIE_NAME].value),
+            })
+
+        password = make_password(PASSWORD)
+        User.objects.bulk_create([
+            User(email='inactive-{0}-{1}@{2}'.format(name, n, self.domain), first_name='Inactive', last_name=str(n),
+                 password=password)
+            for name, _ in self.servers for n in range(requests) if n % 3 == 1
+        ])
+        self.activation_paths = {}
+        for user in User.objects.filter(email__startswith='inactive-'):
+            name, n = user.email.split('@')[0].split('-')[1:]
+            self.activation_paths[name, int(n)] = reverse('activate_account', kwargs={
+                'token': account_token_generator.make_token(user, ACTIVATE),
+            })
+
+    def run(self, name, server_class, options):
+        server = make_server('127.0.0.1', 0, BenchmarkHandler(), server_class=server_class,
+                             handler_class=QuietRequestHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base_url = 'http://127.0.0.1:{0}'.format(server.server_port)
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+                timings = sorted(executor.map(
+                    lambda n: self.request(base_url, name, n, options['concurrency']), range(options['requests'])
+                ))
+            elapsed = time.perf_counter() - start
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.stdout.write('{0:<10} {1:>10.1f} {2:>9.1f} {3:>9.1f}'.format(
+            name, len(timings) / elapsed, timings[len(timings) // 2], timings[int(len(timings) * 0.95)]))
+
+    def request(self, base_url, server_name, n, concurrency):
+        """
+        Sends the n-th request, rotating between registration, activation and email change. Returns its latency in ms.
+        """
+        client = self.clients[n % concurrency]
+        kind = n % 3
+        if kind == 0:
+            email = '{0}-{1}@{2}'.format(server_name, n, self.domain)
+            request = Request(base_url + reverse('register'), data=urlencode({
+                'email': email, 'first_name': 'New', 'last_name': 'User', 'password1': PASSWORD, 'password2': PASSWORD,
+            }).encode())
+        elif kind == 1:
+            request = Request(base_url + self.activation_paths[server_name, n])
+        else:
+            request = Request(base_url + reverse('email_edit'), data=urlencode({
+                'requested_email': '{0}-{1}-changed@{2}'.format(server_name, n, self.domain),
+            }).encode(), headers={'Cookie': client['cookie']})
+        start = time.perf_counter()
+        with urlopen(request) as response:
+            response.read()
+        return (time.perf_counter() - start) * 1000
@@ -0,0 +1,86 @@
+import os
+import statistics
+import time
+
+from crispy_forms.helper import FormHelper
+from crispy_forms.layout import Submit
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+
+from accounts import forms
+from accounts.models import User
+from gifttracker.warmup import warm_templates
+
+# Forms for the pages that render one
+PAGE_FORMS = {
+    'accounts/register.html': lambda user: forms.UserCreationForm(),
+    'accounts/profile_edit_form.html': lambda user: forms.UserProfileEditForm(instance=user),
+    'accounts/email_edit_form.html': lambda user: forms.EmailChangeForm(instance=user),
+    'registration/login.html': lambda user: forms.AuthenticationForm(),
+    'registration/password_change_form.html': lambda user: forms.PasswordChangeForm(user),
+    'registration/password_reset_form.html': lambda user: forms.PasswordResetForm(),
+    'registration/password_reset_confirm.html': lambda user: forms.SetPasswordForm(user),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Times rendering each accounts page with templates compiled on every render, as with DEBUG, '
+        'against the cached loader after warming, and what building a crispy FormHelper per form instance cost.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50, help='Timed renders per page')
+
+    def handle(self, *args, **options):
+        templates_dir = os.path.join(settings.BASE_DIR, 'accounts', 'templates')
+        pages = sorted(
+            os.path.relpath(os.path.join(root, f), templates_dir).replace(os.sep, '/')
+            for root, _, files in os.walk(templates_dir) for f in files if f.endswith('.html')
+        )
+        user = User(pk=1, email='templates-benchmark@example.com', first_name='Benchmark', last_name='User', is_active=True)
+
+        loaders = [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]
+        modes = (('uncached', loaders), ('cached', [('django.template.loaders.cached.Loader', loaders)]))
+        timings = {}
+        for mode, mode_loaders in modes:
+            engine = dict(settings.TEMPLATES[0], OPTIONS=dict(settings.TEMPLATES[0]['OPTIONS'], loaders=mode_loaders))
+            # Plain static storage, so pages render without collectstatic having been run
+            with override_settings(TEMPLATES=[engine],
+                                   STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'):
+                if mode == 'cached':
+                    warm_templates()
+                for page in pages:
+                    timings.setdefault(page, {})[mode] = self.time(page, user, options['repeat'])
+
+        self.stdout.write('{0:<45} {1:>12} {2:>12}'.format('page', 'uncached ms', 'cached ms'))
+        for page in pages:
+            self.stdout.write('{0:<45} {1:>12.3f} {2:>12.3f}'.format(page, timings[page]['uncached'], timings[page]['cached']))
+
+        start = time.perf_counter()
+        for _ in range(options['repeat']):
+            helper = FormHelper()
+            helper.add_input(Submit('submit', 'Save'))
+        self.stdout.write('Building a FormHelper per form instance, as before: {0:.3f} ms'.format(
+            (time.perf_counter() - start) * 1000 / options['repeat']))
+
+    def time(self, page, user, repeat):
+        request = RequestFactory().get('/')
+        request.user = user
+        context = {
+            # For the password reset email and confirmation pages
+            'protocol': 'https', 'domain': 'example.com', 'uid': 'MQ', 'token': 'token', 'validlink': True,
+        }
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            if page in PAGE_FORMS:
+                context['form'] = PAGE_FORMS[page](user)
+            render_to_string(page, context, request)
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
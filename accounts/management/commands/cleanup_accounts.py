@@ -0,0 +1,85 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import User, OutboundEmail
+from gifttracker.models import RateLimitCounter
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes accounts never activated within ACCOUNT_TOKEN_TIMEOUT of being sent their activation link, and clears email '
+        'change requests whose verification link has expired. Works in short batches so it can run on a '
+        'schedule without holding locks on the user table for long. Also deletes expired rate limit counters, '
+        'and sent or dead emails older than EMAIL_QUEUE_RETENTION.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows changed per transaction')
+        parser.add_argument('--sleep', type=float, default=0, help='Seconds to pause between batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be changed')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'ACCOUNT_TOKEN_TIMEOUT', 60 * 60 * 24 * 3))
+
+        # Deactivated accounts have logged in before, so never having logged in marks an unactivated one.
+        # Only accounts sent an activation link, whose link has since expired: not e.g. imported ones.
+        unactivated = User.objects.filter(is_active=False, last_login__isnull=True, is_staff=False,
+                                          activation_sent_at__lt=cutoff)
+        # Requests from before email_requested_at was recorded have no working link either
+        expired_requests = User.objects.filter(requested_email__isnull=False).filter(
+            Q(email_requested_at__lt=cutoff) | Q(email_requested_at__isnull=True)
+        )
+        expired_counters = RateLimitCounter.objects.filter(expires_at__lt=timezone.now())
+        old_emails = OutboundEmail.objects.filter(
+            status__in=[OutboundEmail.STATUS_SENT, OutboundEmail.STATUS_DEAD],
+            created__lt=timezone.now() - timedelta(seconds=getattr(settings, 'EMAIL_QUEUE_RETENTION', 60 * 60 * 24 * 7)),
+        )
+
+        if options['dry_run']:
+            self.stdout.write('Would delete {0} unactivated users and clear {1} expired email change requests'.format(
+                unactivated.count(), expired_requests.count()))
+            self.stdout.write('Would delete {0} expired rate limit counters and {1} old emails'.format(
+                expired_counters.count(), old_emails.count()))
+            return
+
+        deleted = self.in_batches(unactivated, options, 'Deleted {0} unactivated users',
+                                  lambda batch: batch.delete())
+        cleared = self.in_batches(expired_requests, options, 'Cleared {0} expired email change requests',
+                                  lambda batch: batch.update(requested_email=None, email_requested_at=None))
+        # Keyed on whatever email a client posts, so a bot rotating emails or addresses leaves a row per request
+        counters = self.in_batches(expired_counters, options, 'Deleted {0} expired rate limit counters',
+                                   lambda batch: batch.delete())
+        emails = self.in_batches(old_emails, options, 'Deleted {0} old emails', lambda batch: batch.delete())
+        self.stdout.write(self.style.SUCCESS(
+            'Deleted {0} unactivated users, cleared {1} expired email change requests, deleted {2} expired '
+            'rate limit counters and {3} old emails'.format(deleted, cleared, counters, emails)))
+
+    def in_batches(self, queryset, options, progress, action):
+        """
+        Applies `action` to the queryset's rows in primary key order, a batch per transaction
+        """
+        done = 0
+        last_pk = 0
+        while True:
+            pks = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:options['batch_size']])
+            if not pks:
+                break
+            last_pk = pks[-1]
+            with transaction.atomic():
+                action(queryset.filter(pk__in=pks))
+            if queryset.model is User:
+                User.invalidate_cached(pks)
+            done += len(pks)
+            self.stdout.write('\r' + progress.format(done), ending='')
+            self.stdout.flush()
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        if done:
+            self.stdout.write('')
+        return done
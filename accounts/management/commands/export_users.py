@@ -0,0 +1,47 @@
+import csv
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Streams users to a CSV or JSONL file without loading the whole table'
+    fields = ['email', 'first_name', 'last_name', 'is_active', 'date_joined']
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to write, or '-' for stdout")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched from the database at a time')
+        parser.add_argument('--include-password-hashes', action='store_true',
+                            help='Add a password_hash column, which import_users accepts')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or ('jsonl' if options['path'].endswith(('.jsonl', '.json')) else 'csv')
+        fields = list(self.fields)
+        columns = list(self.fields)
+        if options['include_password_hashes']:
+            fields.append('password')
+            columns.append('password_hash')
+
+        rows = User.objects.order_by('pk').values_list(*fields).iterator(chunk_size=options['chunk_size'])
+        stream = sys.stdout if options['path'] == '-' else open(options['path'], 'w', newline='', encoding='utf-8')
+        count = 0
+        try:
+            if fmt == 'csv':
+                writer = csv.writer(stream)
+                writer.writerow(columns)
+                for row in rows:
+                    writer.writerow(row)
+                    count += 1
+            else:
+                for row in rows:
+                    stream.write(json.dumps(dict(zip(columns, row)), default=str) + '\n')
+                    count += 1
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        if stream is not sys.stdout:
+            self.stdout.write(self.style.SUCCESS('Exported {0} users'.format(count)))
@@ -0,0 +1,155 @@
+import csv
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import User
+
+
+@contextmanager
+def no_pool():
+    # Hash in this process. contextlib.nullcontext() would do, but needs Python 3.7
+    yield None
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports users from a CSV or JSONL file with email, first_name, last_name and either password (plain text, '
+        'hashed in a process pool) or password_hash (already hashed), and optionally is_active and date_joined, '
+        'as written by export_users. Existing emails are skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for stdin")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users inserted per transaction')
+        parser.add_argument('--workers', type=int, default=None, help='Processes used to hash passwords. 0 hashes them in this process.')
+        parser.add_argument('--active', action='store_true', help='Mark imported users without an is_active column as active')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or ('jsonl' if options['path'].endswith(('.jsonl', '.json')) else 'csv')
+        stream = sys.stdin if options['path'] == '-' else open(options['path'], newline='', encoding='utf-8')
+
+        created = skipped = 0
+        seen = set()
+        try:
+            executor = no_pool() if options['workers'] == 0 else ProcessPoolExecutor(max_workers=options['workers'])
+            with executor as pool:
+                records = self.read(stream, fmt)
+                while True:
+                    batch = list(islice(records, options['batch_size']))
+                    if not batch:
+                        break
+                    users = self.build_users(batch, seen, pool, options['active'])
+                    inserted = self.insert(users)
+                    created += inserted
+                    skipped += len(batch) - inserted
+                    self.stdout.write('\rImported {0}, skipped {1}'.format(created, skipped), ending='')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS('Imported {0} users, skipped {1}'.format(created, skipped)))
+
+    def insert(self, users):
+        """
+        Inserts the users, returning how many were new. ignore_conflicts skips rows added by someone else
+        since build_users() checked, so those are counted from the table rather than assumed inserted.
+        """
+        emails = [user.email for user in users]
+        with transaction.atomic():
+            existing = User.objects.filter(email__in=emails).count()
+            User.objects.bulk_create(users, ignore_conflicts=True)
+            return User.objects.filter(email__in=emails).count() - existing
+
+    def read(self, stream, fmt):
+        if fmt == 'csv':
+            yield from csv.DictReader(stream)
+        else:
+            for line_no, line in enumerate(stream, 1):
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        raise CommandError('Invalid JSON on line {0}'.format(line_no))
+
+    def build_users(self, batch, seen, pool, active):
+        """
+        Turns a batch of records into unsaved Users, dropping blank, duplicate and existing emails
+        """
+        records = {}
+        for record in batch:
+            email = User.objects.normalize_email((record.get('email') or '').strip())
+            if email and email not in seen:
+                seen.add(email)
+                records[email] = record
+        # One query per batch against the unique email index
+        for email in User.objects.filter(email__in=list(records)).values_list('email', flat=True):
+            del records[email]
+
+        passwords = {}
+        to_hash = []
+        for email, record in records.items():
+            if record.get('password_hash'):
+                try:
+                    identify_hasher(record['password_hash'])
+                except ValueError:
+                    raise CommandError('Unrecognised password_hash for {0}'.format(email))
+                passwords[email] = record['password_hash']
+            elif record.get('password'):
+                to_hash.append((email, record['password']))
+            else:
+                passwords[email] = make_password(None)
+        raw_passwords = [raw for email, raw in to_hash]
+        hashed = map(make_password, raw_passwords) if pool is None else pool.map(make_password, raw_passwords, chunksize=64)
+        passwords.update(zip([email for email, raw in to_hash], hashed))
+
+        return [
+            User(
+                email=email,
+                first_name=record.get('first_name') or '',
+                last_name=record.get('last_name') or '',
+                password=passwords[email],
+                is_active=self.parse_bool(email, record.get('is_active'), active),
+                date_joined=self.parse_datetime(email, record.get('date_joined')),
+            )
+            for email, record in records.items()
+        ]
+
+    @staticmethod
+    def parse_bool(email, value, default):
+        """
+        is_active as written by export_users (True/False in CSV, a boolean in JSONL), or `default` when missing
+        """
+        if value is None or value == '':
+            return default
+        if isinstance(value, bool):
+            return value
+        if value.lower() in ('true', '1', 'yes'):
+            return True
+        if value.lower() in ('false', '0', 'no'):
+            return False
+        raise CommandError('Invalid is_active for {0}: {1}'.format(email, value))
+
+    @staticmethod
+    def parse_datetime(email, value):
+        """
+        date_joined as written by export_users, or now when missing
+        """
+        if not value:
+            return timezone.now()
+        try:
+            joined = parse_datetime(value)
+        except ValueError:
+            joined = None
+        if joined is None:
+            raise CommandError('Invalid date_joined for {0}: {1}'.format(email, value))
+        return joined if timezone.is_aware(joined) else timezone.make_aware(joined)
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import OutboundEmail
+
+
+class Command(BaseCommand):
+    help = 'Delivers queued outbound emails in batches over a single mail backend connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Emails to send per connection')
+        parser.add_argument('--backend', default=None, help='Mail backend to use instead of EMAIL_QUEUE_BACKEND')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the queue instead of exiting when empty')
+        parser.add_argument('--sleep', type=float, default=5, help='Seconds to wait between polls when the queue is empty')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = OutboundEmail.objects.send_pending(
+                batch_size=options['batch_size'],
+                backend=options['backend'],
+            )
+            if sent or failed:
+                self.stdout.write('Sent {0}, failed {1}'.format(sent, failed))
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
@@ -0,0 +1,92 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks password hashing on this host and suggests cost settings for a target login latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=100, help='Target time to hash one password')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per measurement')
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        target = options['target_ms']
+        self.stdout.write('Target: {0:.0f} ms per hash\n'.format(target))
+
+        self.tune_pbkdf2(target)
+        if self.available(hashers.BCryptSHA256PasswordHasher()):
+            self.tune_bcrypt(target)
+        else:
+            self.stdout.write('bcrypt: not installed')
+        if self.available(hashers.Argon2PasswordHasher()):
+            self.tune_argon2(target)
+        else:
+            self.stdout.write('argon2: not installed (pip install argon2-cffi)')
+
+    def available(self, hasher):
+        try:
+            hasher._load_library()
+        except ValueError:
+            return False
+        return True
+
+    def measure(self, hasher):
+        """
+        Median milliseconds to hash a password with `hasher`
+        """
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            hasher.encode('correct horse battery staple', hasher.salt())
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def report(self, name, setting, current, current_ms, suggested, suggested_ms):
+        self.stdout.write('{0}: {1}={2} takes {3:.1f} ms'.format(name, setting, current, current_ms))
+        self.stdout.write(self.style.SUCCESS('  suggest {0}={1} ({2:.1f} ms)'.format(setting, suggested, suggested_ms)))
+
+    def tune_pbkdf2(self, target):
+        hasher = hashers.PBKDF2PasswordHasher()
+        hasher.iterations = settings.PASSWORD_PBKDF2_ITERATIONS
+        current_ms = self.measure(hasher)
+        # Cost is linear in iterations
+        suggested = max(10000, int(round(hasher.iterations * target / current_ms, -4)))
+        hasher.iterations = suggested
+        self.report('pbkdf2_sha256', 'PASSWORD_PBKDF2_ITERATIONS', settings.PASSWORD_PBKDF2_ITERATIONS,
+                    current_ms, suggested, self.measure(hasher))
+
+    def tune_bcrypt(self, target):
+        hasher = hashers.BCryptSHA256PasswordHasher()
+        hasher.rounds = settings.PASSWORD_BCRYPT_ROUNDS
+        current_ms = self.measure(hasher)
+        # Each extra round doubles the cost, so take the most rounds that stay within the target
+        suggested, suggested_ms = 4, None
+        for rounds in range(4, 20):
+            hasher.rounds = rounds
+            ms = self.measure(hasher)
+            if ms > target and suggested_ms is not None:
+                break
+            suggested, suggested_ms = rounds, ms
+        self.report('bcrypt_sha256', 'PASSWORD_BCRYPT_ROUNDS', settings.PASSWORD_BCRYPT_ROUNDS,
+                    current_ms, suggested, suggested_ms)
+
+    def tune_argon2(self, target):
+        hasher = hashers.Argon2PasswordHasher()
+        hasher.memory_cost = settings.PASSWORD_ARGON2_MEMORY_COST
+        hasher.time_cost = settings.PASSWORD_ARGON2_TIME_COST
+        current_ms = self.measure(hasher)
+        # Keep the configured memory cost and raise the time cost while within the target
+        suggested, suggested_ms = 1, None
+        for time_cost in range(1, 17):
+            hasher.time_cost = time_cost
+            ms = self.measure(hasher)
+            if ms > target and suggested_ms is not None:
+                break
+            suggested, suggested_ms = time_cost, ms
+        self.report('argon2', 'PASSWORD_ARGON2_TIME_COST', settings.PASSWORD_ARGON2_TIME_COST,
+                    current_ms, suggested, suggested_ms)
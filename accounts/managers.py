@@ -1,10 +1,109 @@
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib.auth.base_user import BaseUserManager
+from django.core.mail import EmailMessage, get_connection
+from django.db import models, transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+
+# Outcome of sending one message in a bulk send
+BulkEmailResult = namedtuple('BulkEmailResult', ['user', 'sent', 'error'])
 
 
-class UserManager(BaseUserManager):
+def _send_chunk(chunk, backend):
+    """
+    Sends a chunk of (user, message) pairs over one backend connection
+    """
+    results = []
+    connection = get_connection(backend)
+    try:
+        connection.open()
+    except Exception as e:
+        return [BulkEmailResult(user, False, e) for user, msg in chunk]
+    try:
+        for user, msg in chunk:
+            msg.connection = connection
+            try:
+                results.append(BulkEmailResult(user, bool(connection.send_messages([msg])), None))
+            except Exception as e:
+                results.append(BulkEmailResult(user, False, e))
+    finally:
+        connection.close()
+    return results
+
+
+class UserQuerySet(models.QuerySet):
+    def send_bulk_email(self, subject, template, context_fn=None, from_email=None,
+                        chunk_size=None, concurrency=None, backend=None):
+        """
+        Sends an email, rendered from `template` for each user, to every user in the queryset.
+
+        `context_fn(user)` returns the template context for a user (defaults to {'user': user}).
+        Messages are sent in chunks of `chunk_size`, each chunk over a single backend connection,
+        with up to `concurrency` chunks in flight at once. Each chunk is sent as soon as it's rendered,
+        so only those in flight are held in memory. Returns a list of BulkEmailResult.
+        """
+        if chunk_size is None:
+            chunk_size = getattr(settings, 'BULK_EMAIL_CHUNK_SIZE', 100)
+        if concurrency is None:
+            concurrency = getattr(settings, 'BULK_EMAIL_CONCURRENCY', 1)
+        if context_fn is None:
+            context_fn = lambda user: {'user': user}
+        if from_email is None:
+            from_email = settings.DEFAULT_FROM_EMAIL
+
+        results = []
+        executor = ThreadPoolExecutor(max_workers=concurrency) if concurrency > 1 else None
+        in_flight = deque()
+
+        def send(chunk):
+            if executor is None:
+                results.extend(_send_chunk(chunk, backend))
+                return
+            # Wait for the oldest chunk before rendering more than the workers can take
+            if len(in_flight) >= concurrency:
+                results.extend(in_flight.popleft().result())
+            in_flight.append(executor.submit(_send_chunk, chunk, backend))
+
+        try:
+            # Render in this thread, so context_fn is free to use the database
+            chunk = []
+            for user in self.iterator(chunk_size=chunk_size):
+                body = render_to_string(template, context_fn(user))
+                chunk.append((user, EmailMessage(subject, body, from_email, [user.email])))
+                if len(chunk) >= chunk_size:
+                    send(chunk)
+                    chunk = []
+            if chunk:
+                send(chunk)
+            while in_flight:
+                results.extend(in_flight.popleft().result())
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return results
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
     """
     User manager that provides methods for creating users and superusers, setting password's properly
     """
+    @classmethod
+    def normalize_email(cls, email):
+        """
+        Lowercases the whole address. Stored emails are normalised, so the unique index on email is
+        case-insensitive and lookups can match exactly.
+        """
+        return (email or '').strip().lower()
+
+    def get_by_natural_key(self, email):
+        # Used by the login backend
+        return self.get(email=self.normalize_email(email))
+
     def create_user(self, email, first_name, last_name, password=None):
         """
         Creates and saves a User with the given email and password.
@@ -36,3 +135,79 @@ class UserManager(BaseUserManager):
         user.is_superuser = True
         user.save(using=self._db)
         return user
+
+
+class OutboundEmailManager(models.Manager):
+    """
+    Manager for the outbound mail queue
+    """
+    def enqueue(self, to_email, subject, message, from_email, html_message=None):
+        """
+        Adds an email to the queue. Returns immediately, without contacting the mail backend.
+        """
+        return self.create(
+            to_email=to_email,
+            subject=subject,
+            message=message,
+            from_email=from_email,
+            html_message=html_message,
+        )
+
+    def due(self):
+        """
+        Pending emails that are ready to be (re)tried
+        """
+        return self.filter(status=self.model.STATUS_PENDING, available_at__lte=timezone.now())
+
+    def claim_batch(self, batch_size):
+        """
+        Leases up to `batch_size` due emails to the calling worker, so other workers skip them.
+        If the worker dies mid-send, the emails become due again once the lease expires.
+        """
+        lease = timedelta(seconds=getattr(settings, 'EMAIL_QUEUE_LEASE', 300))
+        with transaction.atomic(using=self.db):
+            pks = list(
+                self.due()
+                .select_for_update(skip_locked=True)
+                .order_by('available_at', 'pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            self.filter(pk__in=pks).update(available_at=timezone.now() + lease)
+        return list(self.filter(pk__in=pks).order_by('pk'))
+
+    def send_pending(self, batch_size=None, backend=None):
+        """
+        Sends one batch of due emails over a single backend connection.
+        Returns a tuple of (sent, failed) counts.
+        """
+        if batch_size is None:
+            batch_size = getattr(settings, 'EMAIL_QUEUE_BATCH_SIZE', 100)
+        emails = self.claim_batch(batch_size)
+        sent = failed = 0
+        if not emails:
+            return sent, failed
+
+        connection = get_connection(backend or getattr(settings, 'EMAIL_QUEUE_BACKEND', None))
+        try:
+            connection.open()
+        except Exception as e:
+            # Backend is unreachable, so the whole batch has to be retried later
+            for email in emails:
+                email.mark_failed(e)
+            return sent, len(emails)
+
+        try:
+            for email in emails:
+                try:
+                    if connection.send_messages([email.as_message(connection)]):
+                        email.mark_sent()
+                        sent += 1
+                    else:
+                        email.mark_failed('Backend did not accept the message')
+                        failed += 1
+                except Exception as e:
+                    email.mark_failed(e)
+                    failed += 1
+        finally:
+            connection.close()
+        return sent, failed
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+# Index backing the admin's case-insensitive prefix search on email (search_fields = ('^email',)).
+# Django builds istartswith as UPPER(email::text) LIKE UPPER(%s) on PostgreSQL, and as a plain
+# (case-insensitive) LIKE on SQLite, which can only use an index with NOCASE collation.
+INDEX_SQL = {
+    'postgresql': (
+        'CREATE INDEX accounts_user_email_search ON accounts_user (UPPER(email::text) text_pattern_ops)',
+        'DROP INDEX accounts_user_email_search',
+    ),
+    'sqlite': (
+        'CREATE INDEX accounts_user_email_search ON accounts_user (email COLLATE NOCASE)',
+        'DROP INDEX accounts_user_email_search',
+    ),
+}
+
+
+def create_index(apps, schema_editor):
+    sql = INDEX_SQL.get(schema_editor.connection.vendor)
+    if sql:
+        schema_editor.execute(sql[0])
+
+
+def drop_index(apps, schema_editor):
+    sql = INDEX_SQL.get(schema_editor.connection.vendor)
+    if sql:
+        schema_editor.execute(sql[1])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_outboundemail'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,69 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower, Trim
+
+
+BATCH_SIZE = 5000
+
+
+class EmailCollision(Exception):
+    pass
+
+
+def find_collisions(users):
+    """
+    Returns {lowercased email: [(pk, email), ...]} for addresses that differ only in case (or surrounding
+    whitespace) from another user's
+    """
+    normalised = users.annotate(normalised=Lower(Trim('email')))
+    duplicated = (normalised.values('normalised').annotate(users=Count('pk')).filter(users__gt=1)
+                  .values_list('normalised', flat=True))
+    collisions = {}
+    for pk, email, lowered in normalised.filter(normalised__in=list(duplicated)).order_by('pk').values_list('pk', 'email', 'normalised'):
+        collisions.setdefault(lowered, []).append((pk, email))
+    return collisions
+
+
+def lowercase_emails(apps, schema_editor):
+    """
+    Lowercases stored emails, walking the table in batches of primary keys. Addresses that differ
+    only in case from another user's can't be lowercased without breaking the unique index, and
+    leaving them mixed case would lock their owners out, so the migration stops before changing
+    anything until they have been merged or renamed.
+    """
+    User = apps.get_model('accounts', 'User')
+    users = User.objects.using(schema_editor.connection.alias)
+    collisions = find_collisions(users)
+    if collisions:
+        lines = ['{0} addresses are used by more than one user, differing only in case. Merge or rename these '
+                 'users, e.g. in the admin, then migrate again:'.format(len(collisions))]
+        for lowered, duplicates in sorted(collisions.items()):
+            lines.append('  {0}: {1}'.format(lowered, ', '.join('user {0} <{1}>'.format(pk, email) for pk, email in duplicates)))
+        raise EmailCollision('\n'.join(lines))
+
+    last_pk = 0
+    while True:
+        batch = list(users.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'email', 'requested_email')[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+
+        for pk, email, requested_email in batch:
+            changes = {}
+            if email != email.strip().lower():
+                changes['email'] = email.strip().lower()
+            if requested_email and requested_email != requested_email.strip().lower():
+                changes['requested_email'] = requested_email.strip().lower()
+            if changes:
+                users.filter(pk=pk).update(**changes)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_email_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_lowercase_emails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='email_requested_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
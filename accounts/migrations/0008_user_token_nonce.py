@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 21:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_user_date_joined_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_nonce',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 21:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_user_token_nonce'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='activation_sent_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
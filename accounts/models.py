@@ -1,9 +1,14 @@
-from django.db import models
-from django.core.mail import send_mail
+import time
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 
 from django.conf import settings
-from .managers import UserManager
+from .managers import UserManager, OutboundEmailManager
 
 
 class User(AbstractBaseUser, PermissionsMixin):
@@ -14,12 +19,18 @@ class User(AbstractBaseUser, PermissionsMixin):
     first_name = models.CharField(max_length=30)
     last_name = models.CharField(max_length=30)
 
-    date_joined = models.DateTimeField(auto_now_add=True)
+    date_joined = models.DateTimeField(default=timezone.now)
     is_active = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
+    # When the activation link was last emailed. Only these accounts are removed by cleanup_accounts if
+    # never activated; imported accounts may be waiting to be activated some other way.
+    activation_sent_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     # Temporary holding spot when user requests changing their email address
     requested_email = models.EmailField(verbose_name='new email address', max_length=255, null=True, blank=True)
+    email_requested_at = models.DateTimeField(null=True, blank=True)
+    # Signed into activation and email change links, and bumped when one is used, so each works once
+    token_nonce = models.PositiveIntegerField(default=0, editable=False)
 
     # Custom user manager
     objects = UserManager()
@@ -45,6 +56,12 @@ class User(AbstractBaseUser, PermissionsMixin):
         """
         return self.first_name
 
+    def clean(self):
+        super(User, self).clean()
+        self.email = self.__class__.objects.normalize_email(self.email)
+        if self.requested_email:
+            self.requested_email = self.__class__.objects.normalize_email(self.requested_email)
+
     def has_perm(self, perm, obj=None):
         """
         Does the user have a specific permission?
@@ -59,11 +76,162 @@ class User(AbstractBaseUser, PermissionsMixin):
         has = super(User, self).has_module_perms(app_label)
         return has
 
-    def send_email(self, subject, message, from_email=settings.DEFAULT_FROM_EMAIL, **kwargs):
+    @property
+    def cache_version(self):
+        """
+        Version of this user's cached template fragments. Changes whenever the user is saved.
+        """
+        return cache.get_or_set(self._cache_version_key(self.pk), self._new_cache_version, None)
+
+    def bump_cache_version(self):
+        """
+        Invalidates this user's cached template fragments
+        """
+        cache.set(self._cache_version_key(self.pk), self._new_cache_version(), None)
+
+    @staticmethod
+    def _cache_version_key(pk):
+        return 'accounts.user.cache_version:{0}'.format(pk)
+
+    @staticmethod
+    def _new_cache_version():
+        # A timestamp rather than a counter, so a version evicted from the cache never comes back
+        return int(time.time() * 1000000)
+
+    @staticmethod
+    def cache_key(pk):
+        """
+        Cache key for the user row, as stored by accounts.backends.CachedModelBackend
+        """
+        return 'accounts.user:{0}'.format(pk)
+
+    @staticmethod
+    def perm_cache_key(pk):
+        """
+        Cache key for the user's permission set, as stored by accounts.backends.CachedModelBackend
+        """
+        return 'accounts.user.perms:{0}'.format(pk)
+
+    @classmethod
+    def invalidate_cached(cls, pks):
         """
-        Sends an email to this User.
+        Drops the cached rows, permissions and fragments of users that were saved or deleted (including with
+        QuerySet.update() or delete()), or whose groups or permissions changed
         """
-        send_mail(subject, message, from_email, [self.email], **kwargs)
+        pks = list(pks)
+
+        def invalidate():
+            cache.delete_many([cls.cache_key(pk) for pk in pks] + [cls.perm_cache_key(pk) for pk in pks])
+            version = cls._new_cache_version()
+            cache.set_many({cls._cache_version_key(pk): version for pk in pks}, None)
+
+        # Now, and again once the change is committed: until then a concurrent request still reads the
+        # old row from the database, and may cache it again for USER_CACHE_TIMEOUT
+        invalidate()
+        transaction.on_commit(invalidate)
+
+    def refresh_from_db(self, using=None, fields=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred.issuperset(fields):
+            # Reading one deferred field, e.g. of a user loaded by CachedModelBackend: fetch the rest of
+            # the row with it, rather than one query per field
+            fields = deferred
+        super(User, self).refresh_from_db(using, fields)
+
+    def save(self, *args, **kwargs):
+        # Also covers saves that skip clean(), e.g. from code and the shell
+        self.email = self.__class__.objects.normalize_email(self.email)
+        if self.requested_email:
+            self.requested_email = self.__class__.objects.normalize_email(self.requested_email)
+        super(User, self).save(*args, **kwargs)
+        self.invalidate_cached([self.pk])
+
+    def delete(self, *args, **kwargs):
+        self.invalidate_cached([self.pk])
+        return super(User, self).delete(*args, **kwargs)
+
+    def send_email(self, subject, message, from_email=settings.DEFAULT_FROM_EMAIL, html_message=None):
+        """
+        Queues an email to this User. It is delivered by the `send_queued_email` worker.
+        """
+        return OutboundEmail.objects.enqueue(
+            to_email=self.email,
+            subject=subject,
+            message=message,
+            from_email=from_email,
+            html_message=html_message,
+        )
 
     def __str__(self):
         return self.email
+
+
+class OutboundEmail(models.Model):
+    """
+    An email waiting to be delivered (or already delivered) by the mail queue worker
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_DEAD, 'Dead'),
+    )
+
+    to_email = models.EmailField(max_length=255)
+    from_email = models.CharField(max_length=255)
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    html_message = models.TextField(null=True, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # Earliest time the worker may (re)try this email. Also used as a lease while a worker is sending it.
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    created = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    objects = OutboundEmailManager()
+
+    class Meta:
+        verbose_name = 'outbound email'
+        verbose_name_plural = 'outbound emails'
+        indexes = [
+            # The worker polls for due, pending emails
+            models.Index(fields=['status', 'available_at'], name='accounts_email_queue_idx'),
+        ]
+
+    def as_message(self, connection=None):
+        """
+        Builds the EmailMessage to hand to a mail backend
+        """
+        msg = EmailMultiAlternatives(self.subject, self.message, self.from_email, [self.to_email], connection=connection)
+        if self.html_message:
+            msg.attach_alternative(self.html_message, 'text/html')
+        return msg
+
+    def mark_sent(self):
+        self.status = self.STATUS_SENT
+        self.attempts += 1
+        self.sent_at = timezone.now()
+        self.last_error = ''
+        self.save(update_fields=['status', 'attempts', 'sent_at', 'last_error'])
+
+    def mark_failed(self, error):
+        """
+        Schedules a retry with exponential backoff, or gives up once the attempts are exhausted
+        """
+        self.attempts += 1
+        self.last_error = str(error)
+        if self.attempts >= getattr(settings, 'EMAIL_QUEUE_MAX_ATTEMPTS', 5):
+            self.status = self.STATUS_DEAD
+        else:
+            delay = getattr(settings, 'EMAIL_QUEUE_RETRY_DELAY', 60) * 2 ** (self.attempts - 1)
+            self.available_at = timezone.now() + timedelta(seconds=delay)
+        self.save(update_fields=['status', 'attempts', 'available_at', 'last_error'])
+
+    def __str__(self):
+        return '{0} -> {1}'.format(self.subject, self.to_email)
@@ -0,0 +1,50 @@
+"""
+Drops the permission sets cached by accounts.backends.CachedModelBackend when the groups or permissions
+behind them change. Changes to the User row itself are handled by User.save().
+"""
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, pre_delete
+
+from .models import User
+
+CHANGES = ('post_add', 'post_remove', 'pre_clear')
+
+
+def user_m2m_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    A user's groups or permissions changed, or the users in a group or with a permission
+    """
+    if action not in CHANGES:
+        return
+    if not reverse:
+        User.invalidate_cached([instance.pk])
+    elif action == 'pre_clear':
+        User.invalidate_cached(instance.user_set.values_list('pk', flat=True))
+    else:
+        User.invalidate_cached(pk_set)
+
+
+def group_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    A group's permissions changed, or the groups with a permission
+    """
+    if action not in CHANGES:
+        return
+    if not reverse:
+        users = instance.user_set.all()
+    elif action == 'pre_clear':
+        users = User.objects.filter(groups__permissions=instance)
+    else:
+        users = User.objects.filter(groups__in=pk_set)
+    User.invalidate_cached(users.values_list('pk', flat=True).distinct())
+
+
+def group_deleted(sender, instance, **kwargs):
+    User.invalidate_cached(instance.user_set.values_list('pk', flat=True))
+
+
+def connect():
+    m2m_changed.connect(user_m2m_changed, sender=User.groups.through)
+    m2m_changed.connect(user_m2m_changed, sender=User.user_permissions.through)
+    m2m_changed.connect(group_permissions_changed, sender=Group.permissions.through)
+    pre_delete.connect(group_deleted, sender=Group)
@@ -0,0 +1,43 @@
+"""
+Builds users for tests. Create shared users in setUpTestData, so each TestCase class writes them once
+rather than once per test; every test still sees them as they were after setUpTestData.
+"""
+import itertools
+
+from ..models import User
+
+
+class UserFactory:
+    sequence = itertools.count(1)
+    defaults = {
+        'first_name': 'John',
+        'last_name': 'Doe',
+        'is_active': True,
+    }
+
+    @classmethod
+    def build(cls, password=None, **kwargs):
+        """
+        An unsaved user with a unique email. Without a password the user can't log in with one.
+        """
+        fields = dict(cls.defaults, email='user{0}@test.com'.format(next(cls.sequence)))
+        fields.update(kwargs)
+        user = User(**fields)
+        if password is None:
+            user.set_unusable_password()
+        else:
+            user.set_password(password)
+        return user
+
+    @classmethod
+    def create(cls, password=None, **kwargs):
+        user = cls.build(password, **kwargs)
+        user.save()
+        return user
+
+    @classmethod
+    def create_batch(cls, count, password=None, **kwargs):
+        """
+        Saves `count` users in one query. Skips User.save(), so emails must already be lowercase.
+        """
+        return User.objects.bulk_create([cls.build(password, **kwargs) for _ in range(count)])
@@ -0,0 +1,63 @@
+from django.contrib.auth.models import Permission
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import *
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class AccountsUserAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user_perms = Permission.objects.filter(content_type__app_label='accounts', content_type__model='user')
+        cls.staff = User.objects.create(email='staff@test.com', first_name='Staff', last_name='User',
+                                        is_active=True, is_staff=True)
+        cls.staff.user_permissions.set(user_perms)
+        cls.privileged = User.objects.create(email='privileged@test.com', first_name='John', last_name='Doe')
+        cls.privileged.user_permissions.set(user_perms)
+        cls.regular = User.objects.create(email='regular@test.com', first_name='Jane', last_name='Doe')
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def test_staff_cannot_change_privileged_user(self):
+        """
+        Staff can't edit users who have permissions of their own
+        """
+        url = reverse('admin:accounts_user_change', args=[self.privileged.pk])
+        response = self.client.post(url, {'email': 'changed@test.com', 'first_name': 'X', 'last_name': 'Y'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_change_view_checks_permissions_once(self):
+        """
+        The permission flag comes with the user row, rather than a query per permission check
+        """
+        url = reverse('admin:accounts_user_change', args=[self.regular.pk])
+        self.client.get(url)
+        # Savepoint pair, the user with its permission flag and the read-only permissions field. The staff
+        # user's own permissions are cached, and there are no per-check exists() queries.
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_prefix_search(self):
+        response = self.client.get(reverse('admin:accounts_user_changelist'), {'q': 'REG'})
+        self.assertContains(response, 'regular@test.com')
+        self.assertNotContains(response, 'privileged@test.com')
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class AccountsOutboundEmailAdminTests(TestCase):
+    def test_message_body_hidden(self):
+        """
+        Queued bodies carry working activation links, so staff only see who an email went to and how it went
+        """
+        admin_user = User.objects.create(email='admin@test.com', first_name='Admin', last_name='User',
+                                         is_active=True, is_staff=True, is_superuser=True)
+        email = OutboundEmail.objects.create(to_email='jane@test.com', subject='Activate your account',
+                                             message='https://example.com/activate/secret-token/',
+                                             html_message='<a href="https://example.com/activate/secret-token/">')
+        self.client.force_login(admin_user)
+        response = self.client.get(reverse('admin:accounts_outboundemail_change', args=[email.pk]))
+        self.assertContains(response, 'Activate your account')
+        self.assertNotContains(response, 'secret-token')
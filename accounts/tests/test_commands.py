@@ -0,0 +1,167 @@
+import csv
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from gifttracker.models import RateLimitCounter
+from ..models import *
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AccountsImportExportTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.dir.name, name)
+
+    def test_import_csv(self):
+        """
+        Emails are normalised, duplicates and existing users skipped, and passwords hashed
+        """
+        User.objects.create(email='existing@test.com', first_name='John', last_name='Doe')
+        with open(self.path('users.csv'), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['email', 'first_name', 'last_name', 'password', 'password_hash'])
+            writer.writerow(['new@TEST.com', 'Jane', 'Doe', 'secret', ''])
+            writer.writerow(['new@test.com', 'Jane', 'Duplicate', 'secret', ''])
+            writer.writerow(['existing@test.com', 'John', 'Doe', 'secret', ''])
+            writer.writerow(['hashed@test.com', 'Jim', 'Doe', '', make_password('hashed')])
+            writer.writerow(['nopassword@test.com', 'Jill', 'Doe', '', ''])
+        call_command('import_users', self.path('users.csv'), batch_size=2, workers=0, stdout=StringIO())
+
+        self.assertEqual(User.objects.count(), 4)
+        self.assertTrue(User.objects.get(email='new@test.com').check_password('secret'))
+        self.assertTrue(User.objects.get(email='hashed@test.com').check_password('hashed'))
+        self.assertFalse(User.objects.get(email='nopassword@test.com').has_usable_password())
+
+    def test_export_import_round_trip(self):
+        """
+        Exported users come back with the same password, active flag and join date
+        """
+        joined = timezone.now() - timedelta(days=400)
+        User.objects.create_user('one@test.com', 'One', 'User', password='secret')
+        User.objects.create_user('two@test.com', 'Two', 'User', password='secret')
+        User.objects.filter(email='two@test.com').update(is_active=True, date_joined=joined)
+        for name in ('users.jsonl', 'users.csv'):
+            call_command('export_users', self.path(name), chunk_size=1, include_password_hashes=True,
+                         stdout=StringIO())
+        with open(self.path('users.jsonl')) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([r['email'] for r in rows], ['one@test.com', 'two@test.com'])
+
+        for name in ('users.jsonl', 'users.csv'):
+            User.objects.all().delete()
+            call_command('import_users', self.path(name), workers=0, stdout=StringIO())
+            self.assertFalse(User.objects.get(email='one@test.com').is_active)
+            user = User.objects.get(email='two@test.com')
+            self.assertTrue(user.is_active)
+            self.assertEqual(user.date_joined, joined)
+            self.assertTrue(user.check_password('secret'))
+
+    def test_conflicting_rows_not_counted(self):
+        """
+        Rows another process inserted after the existence check are reported as skipped, not imported
+        """
+        from ..management.commands.import_users import Command
+        User.objects.create(email='taken@test.com', first_name='John', last_name='Doe')
+        users = [User(email='taken@test.com', first_name='Jim'), User(email='free@test.com', first_name='Jill')]
+        self.assertEqual(Command().insert(users), 1)
+        self.assertEqual(User.objects.get(email='taken@test.com').first_name, 'John')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AccountsFlowBenchmarkTests(TestCase):
+    def test_flows(self):
+        """
+        Every step of the account flows runs, and the user is gone at the end
+        """
+        from ..management.commands.benchmark_account_flows import Command
+        results = Command().run(flows=2, concurrency=1)
+        self.assertEqual(set(results['steps']), set(Command.steps))
+        self.assertEqual(results['steps']['delete']['requests'], 2)
+        self.assertFalse(User.objects.exists())
+
+    def test_compare(self):
+        """
+        Slower p95 latency beyond the tolerance and extra queries are reported as regressions
+        """
+        from ..management.commands.benchmark_account_flows import Command
+        baseline = {'steps': {'login': {'p95_ms': 10.0, 'queries': 3.0}}}
+        self.assertEqual(Command().compare(baseline, {'steps': {'login': {'p95_ms': 11.0, 'queries': 3.0}}}, 0.2), [])
+        regressions = Command().compare(baseline, {'steps': {'login': {'p95_ms': 13.0, 'queries': 4.0}}}, 0.2)
+        self.assertEqual(len(regressions), 2)
+
+
+class AccountsCleanupTests(TestCase):
+    def setUp(self):
+        old = timezone.now() - timedelta(days=30)
+        self.stale = User.objects.create(email='stale@test.com', first_name='John', last_name='Doe')
+        self.recent = User.objects.create(email='recent@test.com', first_name='John', last_name='Doe')
+        self.deactivated = User.objects.create(email='deactivated@test.com', first_name='John', last_name='Doe',
+                                               last_login=old)
+        self.requested = User.objects.create(email='requested@test.com', first_name='John', last_name='Doe',
+                                             is_active=True, requested_email='new@test.com', email_requested_at=old)
+        # Imported without --active, so never sent an activation link
+        self.imported = User.objects.create(email='imported@test.com', first_name='John', last_name='Doe')
+        User.objects.exclude(pk=self.recent.pk).update(date_joined=old)
+        User.objects.filter(pk=self.stale.pk).update(activation_sent_at=old)
+        User.objects.filter(pk=self.recent.pk).update(activation_sent_at=timezone.now())
+
+    def test_dry_run(self):
+        out = StringIO()
+        call_command('cleanup_accounts', '--dry-run', stdout=out)
+        self.assertIn('Would delete 1 unactivated users and clear 1 expired', out.getvalue())
+        self.assertEqual(User.objects.count(), 5)
+
+    def test_cleanup(self):
+        call_command('cleanup_accounts', '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(set(User.objects.values_list('email', flat=True)),
+                         {'recent@test.com', 'deactivated@test.com', 'requested@test.com', 'imported@test.com'})
+        self.requested.refresh_from_db()
+        self.assertIsNone(self.requested.requested_email)
+
+    def test_registration_records_activation_sent(self):
+        self.client.post(reverse('register'), {
+            'email': 'new@test.com', 'first_name': 'Jane', 'last_name': 'Doe',
+            'password1': 'correct horse battery', 'password2': 'correct horse battery',
+        })
+        self.assertIsNotNone(User.objects.get(email='new@test.com').activation_sent_at)
+
+    def test_expired_rate_limit_counters_deleted(self):
+        now = timezone.now()
+        RateLimitCounter.objects.create(key='login:ip:10.0.0.1:60', current_window=0, expires_at=now - timedelta(minutes=1))
+        RateLimitCounter.objects.create(key='login:ip:10.0.0.2:60', current_window=0, expires_at=now + timedelta(minutes=1))
+        RateLimitCounter.objects.create(key='login:ip:10.0.0.3:60', current_window=0, expires_at=now - timedelta(minutes=1))
+        out = StringIO()
+        with mock.patch.object(User, 'invalidate_cached') as invalidate_cached:
+            call_command('cleanup_accounts', '--batch-size', '1', stdout=out)
+        self.assertIn('deleted 2 expired rate limit counters', out.getvalue())
+        # Only the user batches touch the user cache
+        self.assertEqual(invalidate_cached.call_count, 2)
+        self.assertEqual(list(RateLimitCounter.objects.values_list('key', flat=True)), ['login:ip:10.0.0.2:60'])
+
+    def test_old_emails_deleted(self):
+        """
+        Sent and dead emails go once past EMAIL_QUEUE_RETENTION, but pending ones are still to be delivered
+        """
+        for status in (OutboundEmail.STATUS_SENT, OutboundEmail.STATUS_DEAD, OutboundEmail.STATUS_PENDING):
+            OutboundEmail.objects.create(to_email='old@test.com', subject='Old', message='Body', status=status)
+        recent = OutboundEmail.objects.create(to_email='recent@test.com', subject='Recent', message='Body',
+                                              status=OutboundEmail.STATUS_SENT)
+        OutboundEmail.objects.exclude(pk=recent.pk).update(created=timezone.now() - timedelta(days=30))
+        out = StringIO()
+        call_command('cleanup_accounts', '--batch-size', '1', stdout=out)
+        self.assertIn('and 2 old emails', out.getvalue())
+        self.assertEqual(set(OutboundEmail.objects.values_list('to_email', 'status')),
+                         {('old@test.com', OutboundEmail.STATUS_PENDING), ('recent@test.com', OutboundEmail.STATUS_SENT)})
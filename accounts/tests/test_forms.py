@@ -1,6 +1,7 @@
 from django.test import TestCase
 
 from ..forms import *
+from .factories import UserFactory
 
 
 # Set up default, valid form data
@@ -55,6 +56,21 @@ class AccountsUserCreationFormTests(TestCase):
         form = UserCreationForm(data=invalid_form_data)
         self.assertFalse(form.is_valid())
 
+    def test_email_taken_in_other_case(self):
+        """
+        Emails are stored lowercased, so a differently cased copy of an existing email is taken
+        """
+        form = UserCreationForm(data=dict(form_data, email='Test@Test.com'))
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.save().email, 'test@test.com')
+        self.assertFalse(UserCreationForm(data=dict(form_data, email='TEST@test.com')).is_valid())
+
+    def test_helper_shared(self):
+        """
+        The crispy helper is built once per form class
+        """
+        self.assertIs(UserCreationForm().helper, UserCreationForm().helper)
+
     def test_mismatching_passwords(self):
         """
         Mismatching passwords correctly identified as invalid
@@ -67,6 +83,11 @@ class AccountsUserCreationFormTests(TestCase):
 
 
 class AccountsEmailChangeFormTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory.create(email='test1@test.com')
+        cls.other_user = UserFactory.create(email='test2@test.com')
+
     def test_valid_email(self):
         valid_form_data = {
             'requested_email': 'newemail@valid.com'
@@ -75,18 +96,30 @@ class AccountsEmailChangeFormTests(TestCase):
         self.assertTrue(form.is_valid())
 
     def test_same_email(self):
-        user = User.objects.create(email="test@test.com", first_name="John", last_name="Doe")
         invalid_form_data = {
-            'requested_email': 'test@test.com'
+            'requested_email': 'test1@test.com'
         }
-        form = EmailChangeForm(instance=user, data=invalid_form_data)
+        form = EmailChangeForm(instance=self.user, data=invalid_form_data)
         self.assertFalse(form.is_valid())
 
     def test_existing_email(self):
-        user = User.objects.create(email="test1@test.com", first_name="John", last_name="Doe")
-        User.objects.create(email="test2@test.com", first_name="John", last_name="Doe")
         invalid_form_data = {
             'requested_email': 'test2@test.com'
         }
-        form = EmailChangeForm(instance=user, data=invalid_form_data)
+        form = EmailChangeForm(instance=self.user, data=invalid_form_data)
+        self.assertFalse(form.is_valid())
+
+    def test_existing_email_other_case(self):
+        form = EmailChangeForm(instance=self.user, data={'requested_email': 'Test2@Test.com'})
         self.assertFalse(form.is_valid())
+
+
+class AccountsPasswordResetFormTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory.create(email='test@test.com', password='password')
+
+    def test_get_users_any_case(self):
+        form = PasswordResetForm()
+        with self.assertNumQueries(1):
+            self.assertEqual(list(form.get_users('Test@TEST.com')), [self.user])
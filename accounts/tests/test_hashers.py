@@ -0,0 +1,53 @@
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import PBKDF2SHA1PasswordHasher, check_password, identify_hasher, make_password
+from django.test import TestCase, override_settings
+
+from gifttracker import settings as project_settings
+from ..models import *
+
+
+@override_settings(
+    PASSWORD_HASHERS=['accounts.hashers.PBKDF2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher'],
+    PASSWORD_PBKDF2_ITERATIONS=1000,
+)
+class AccountsPasswordHasherTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('test@test.com', 'John', 'Doe', password=';alskdjf')
+        self.user.is_active = True
+        self.user.save()
+
+    def iterations(self):
+        self.user.refresh_from_db()
+        return int(self.user.password.split('$')[1])
+
+    def test_iterations_from_settings(self):
+        self.assertEqual(self.iterations(), 1000)
+
+    def test_rehash_on_login_when_cost_changes(self):
+        """
+        Passwords are rehashed with the new cost when their owner logs in
+        """
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.assertEqual(authenticate(username='test@test.com', password=';alskdjf'), self.user)
+        self.assertEqual(self.iterations(), 2000)
+
+    def test_rehash_on_login_when_hasher_changes(self):
+        """
+        Passwords hashed with a non-preferred hasher are upgraded at login
+        """
+        self.user.password = make_password(';alskdjf', hasher='md5')
+        self.user.save()
+        self.assertEqual(authenticate(username='test@test.com', password=';alskdjf'), self.user)
+        self.user.refresh_from_db()
+        self.assertEqual(identify_hasher(self.user.password).algorithm, 'pbkdf2_sha256')
+
+    def test_django_default_hashes_verify(self):
+        """
+        Passwords stored with the hashers Django used before PASSWORD_HASHERS was set still verify
+        """
+        with self.settings(PASSWORD_HASHERS=project_settings.PASSWORD_HASHERS):
+            for encoded in (
+                make_password(';alskdjf', hasher='pbkdf2_sha256'),
+                PBKDF2SHA1PasswordHasher().encode(';alskdjf', 'salt', iterations=1000),
+            ):
+                self.assertTrue(check_password(';alskdjf', encoded))
@@ -0,0 +1,130 @@
+from io import StringIO
+from datetime import timedelta
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import *
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('SendGrid is down')
+
+
+@override_settings(EMAIL_QUEUE_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class AccountsOutboundEmailTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='test@test.com', first_name='John', last_name='Doe')
+
+    def test_send_email_enqueues(self):
+        """
+        Sending an email to a user queues it rather than contacting the backend
+        """
+        self.user.send_email(subject='Hello', message='World')
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.to_email, 'test@test.com')
+        self.assertEqual(email.status, OutboundEmail.STATUS_PENDING)
+
+    def test_worker_delivers_queue(self):
+        """
+        The worker delivers all due emails and marks them as sent
+        """
+        for i in range(3):
+            self.user.send_email(subject='Hello {0}'.format(i), message='World')
+        call_command('send_queued_email', batch_size=2, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.STATUS_SENT).exists())
+
+    def test_future_emails_not_sent(self):
+        """
+        Emails waiting on a retry are left alone until they are due
+        """
+        email = self.user.send_email(subject='Hello', message='World')
+        OutboundEmail.objects.filter(pk=email.pk).update(available_at=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(OutboundEmail.objects.send_pending(), (0, 0))
+        self.assertEqual(len(mail.outbox), 0)
+
+    @override_settings(EMAIL_QUEUE_MAX_ATTEMPTS=2, EMAIL_QUEUE_RETRY_DELAY=0)
+    def test_failures_retry_then_dead_letter(self):
+        """
+        Failed sends are retried, and give up after the maximum number of attempts
+        """
+        email = self.user.send_email(subject='Hello', message='World')
+        backend = 'accounts.tests.test_mail.FailingEmailBackend'
+
+        self.assertEqual(OutboundEmail.objects.send_pending(backend=backend), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.STATUS_PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('SendGrid is down', email.last_error)
+
+        self.assertEqual(OutboundEmail.objects.send_pending(backend=backend), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.STATUS_DEAD)
+
+
+class AccountsBulkEmailTests(TestCase):
+    def setUp(self):
+        for i in range(5):
+            User.objects.create(email='test{0}@test.com'.format(i), first_name='User{0}'.format(i), last_name='Doe')
+
+    def test_bulk_email_rendered_per_user(self):
+        """
+        Each user receives their own rendered copy
+        """
+        results = User.objects.order_by('pk').send_bulk_email(
+            'Notice',
+            'accounts/email/notice.txt',
+            lambda user: {'user': user, 'message': 'Hello'},
+            chunk_size=2,
+        )
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(r.sent for r in results))
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[0].to, ['test0@test.com'])
+        self.assertIn('Dear User0', mail.outbox[0].body)
+
+    def test_bulk_email_sends_chunks_as_rendered(self):
+        """
+        Each chunk goes out before the next is rendered, rather than holding every message until the end
+        """
+        sent_before = []
+
+        def context(user):
+            sent_before.append(len(mail.outbox))
+            return {'user': user}
+
+        User.objects.order_by('pk').send_bulk_email('Notice', 'accounts/email/notice.txt', context, chunk_size=2,
+                                                  concurrency=1)
+        self.assertEqual(sent_before, [0, 0, 2, 2, 4])
+
+        # In parallel, rendering waits for the oldest chunk once `concurrency` are in flight
+        mail.outbox, sent_before[:] = [], []
+        User.objects.order_by('pk').send_bulk_email('Notice', 'accounts/email/notice.txt', context, chunk_size=1,
+                                                  concurrency=2)
+        self.assertGreaterEqual(sent_before[3], 1)
+        self.assertGreaterEqual(sent_before[4], 2)
+
+    def test_bulk_email_concurrent_chunks(self):
+        """
+        Sending chunks in parallel still delivers every message exactly once
+        """
+        results = User.objects.all().send_bulk_email('Notice', 'accounts/email/notice.txt', chunk_size=1, concurrency=3)
+        self.assertEqual(len(results), 5)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), sorted(User.objects.values_list('email', flat=True)))
+
+    def test_bulk_email_reports_failures(self):
+        """
+        Messages that fail to send are reported rather than raised
+        """
+        results = User.objects.all().send_bulk_email(
+            'Notice', 'accounts/email/notice.txt', backend='accounts.tests.test_mail.FailingEmailBackend',
+        )
+        self.assertEqual(len(results), 5)
+        self.assertFalse(any(r.sent for r in results))
+        self.assertIsInstance(results[0].error, ConnectionError)
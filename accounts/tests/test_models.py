@@ -1,13 +1,160 @@
-from django.test import TestCase
+from unittest import mock
 
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from ..backends import CachedModelBackend
 from ..models import *
+from .factories import UserFactory
 
 
-class AccountsUserModelTests(TestCase):
-    user = User(email='test@test.com', first_name='John', last_name='Doe')
+class AccountsUserModelTests(SimpleTestCase):
+    def setUp(self):
+        self.user = UserFactory.build(first_name='John', last_name='Doe')
 
     def test_full_name(self):
         self.assertEqual(self.user.get_full_name(), 'John Doe')
 
     def test_short_name(self):
         self.assertEqual(self.user.get_short_name(), 'John')
+
+
+class AccountsUserCacheVersionTests(TestCase):
+    def test_save_bumps_cache_version(self):
+        """
+        Saving a user invalidates their cached fragments
+        """
+        user = User.objects.create(email='test@test.com', first_name='John', last_name='Doe')
+        version = user.cache_version
+        self.assertEqual(user.cache_version, version)
+        user.first_name = 'Jane'
+        user.save()
+        self.assertNotEqual(user.cache_version, version)
+
+    def test_profile_fragment_invalidated(self):
+        user = User.objects.create(email='test@test.com', first_name='John', last_name='Doe', is_active=True)
+        self.client.force_login(user)
+        self.assertContains(self.client.get(reverse('profile')), 'John')
+        self.client.post(reverse('profile_edit'), {'first_name': 'Jane', 'last_name': 'Doe'})
+        self.assertContains(self.client.get(reverse('profile')), 'Jane')
+
+
+class AccountsCachedAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='test@test.com', first_name='John', last_name='Doe', is_active=True)
+        self.client.force_login(self.user)
+
+    def test_steady_state_needs_no_queries(self):
+        """
+        Once the session and user are cached, an authenticated page view doesn't touch the database
+        """
+        self.client.get(reverse('profile'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('profile'))
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_save_invalidates_cached_user(self):
+        self.client.get(reverse('profile'))
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse('profile'))
+        self.assertRedirects(response, '{0}?next={1}'.format(reverse('login'), reverse('profile')))
+
+    def test_only_auth_fields_loaded(self):
+        """
+        request.user carries the auth columns, and reading any other field loads the rest of the row at once
+        """
+        user = CachedModelBackend().get_user(self.user.pk)
+        self.assertIn('last_name', user.get_deferred_fields())
+        self.assertIn('requested_email', user.get_deferred_fields())
+        with self.assertNumQueries(1):
+            self.assertEqual(user.last_name, 'Doe')
+            self.assertIsNone(user.requested_email)
+        self.assertEqual(user.get_deferred_fields(), set())
+
+    def test_permissions_cached(self):
+        """
+        The permission set is cached per user, and dropped when the user's or their groups' permissions change
+        """
+        perm = Permission.objects.get(codename='change_user')
+        backend = CachedModelBackend()
+        self.assertFalse(backend.get_user(self.user.pk).has_perm('accounts.change_user'))
+        with self.assertNumQueries(0):
+            self.assertFalse(backend.get_user(self.user.pk).has_perm('accounts.change_user'))
+
+        self.user.user_permissions.add(perm)
+        self.assertTrue(backend.get_user(self.user.pk).has_perm('accounts.change_user'))
+        self.user.user_permissions.clear()
+        self.assertFalse(backend.get_user(self.user.pk).has_perm('accounts.change_user'))
+
+        group = Group.objects.create(name='Editors')
+        group.user_set.add(self.user)
+        self.assertFalse(backend.get_user(self.user.pk).has_perm('accounts.change_user'))
+        group.permissions.add(perm)
+        self.assertTrue(backend.get_user(self.user.pk).has_perm('accounts.change_user'))
+        group.delete()
+        self.assertFalse(backend.get_user(self.user.pk).has_perm('accounts.change_user'))
+
+
+class AccountsCacheInvalidationCommitTests(TransactionTestCase):
+    def test_row_cached_before_commit_dropped(self):
+        """
+        A concurrent request that caches the old row while a deactivation is still uncommitted doesn't
+        keep it for USER_CACHE_TIMEOUT
+        """
+        user = UserFactory.create()
+        backend = CachedModelBackend()
+        with transaction.atomic():
+            user.is_active = False
+            user.save()
+            # What another connection, still seeing the old row, would cache
+            cache.set(User.cache_key(user.pk), UserFactory.build(pk=user.pk, email=user.email))
+        self.assertIsNone(cache.get(User.cache_key(user.pk)))
+        self.assertIsNone(backend.get_user(user.pk))
+
+
+class AccountsEmailCaseTests(TestCase):
+    def test_login_any_case(self):
+        User.objects.create_user('John@Test.com', 'John', 'Doe', 'password')
+        User.objects.filter(email='john@test.com').update(is_active=True)
+        self.assertTrue(self.client.login(username='JOHN@test.COM', password='password'))
+
+    def test_migration_lowercases_emails(self):
+        from importlib import import_module
+        from django.apps import apps
+        from django.db import connection
+        migration = import_module('accounts.migrations.0005_lowercase_emails')
+
+        User.objects.create(email='jane@test.com', first_name='Jane', last_name='Doe')
+        mixed = User.objects.create(email='john@test.com', first_name='John', last_name='Doe')
+        # Rows from before emails were normalised on save
+        User.objects.filter(pk=mixed.pk).update(email='John@Test.com', requested_email='New@Test.com')
+
+        migration.lowercase_emails(apps, mock.Mock(connection=connection))
+        mixed.refresh_from_db()
+        self.assertEqual((mixed.email, mixed.requested_email), ('john@test.com', 'new@test.com'))
+
+    def test_migration_stops_on_collisions(self):
+        """
+        Users whose addresses differ only in case are reported, and nothing is changed until they are resolved
+        """
+        from importlib import import_module
+        from django.apps import apps
+        from django.db import connection
+        migration = import_module('accounts.migrations.0005_lowercase_emails')
+
+        lower = User.objects.create(email='jane@test.com', first_name='Jane', last_name='Doe')
+        colliding = User.objects.create(email='other@test.com', first_name='Jane', last_name='Doe')
+        mixed = User.objects.create(email='john@test.com', first_name='John', last_name='Doe')
+        User.objects.filter(pk=colliding.pk).update(email='JANE@test.com')
+        User.objects.filter(pk=mixed.pk).update(email='John@Test.com')
+
+        with self.assertRaises(migration.EmailCollision) as raised:
+            migration.lowercase_emails(apps, mock.Mock(connection=connection))
+        self.assertIn('jane@test.com: user {0} <jane@test.com>, user {1} <JANE@test.com>'.format(lower.pk, colliding.pk),
+                      str(raised.exception))
+        mixed.refresh_from_db()
+        self.assertEqual(mixed.email, 'John@Test.com')
@@ -0,0 +1,71 @@
+from django.core import signing
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import *
+from ..tokens import ACTIVATE, VERIFY_EMAIL, account_token_generator
+
+
+class AccountsTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='test@test.com', first_name='John', last_name='Doe')
+
+    def test_activation_single_use(self):
+        url = reverse('activate_account', kwargs={'token': account_token_generator.make_token(self.user, ACTIVATE)})
+        self.assertTemplateUsed(self.client.get(url), 'accounts/activation_done.html')
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+        # Used links are recorded on the user, not in the cache
+        cache.clear()
+        self.assertContains(self.client.get(url), 'expired')
+
+    def test_using_a_link_spends_the_others(self):
+        first = account_token_generator.make_token(self.user, ACTIVATE)
+        second = account_token_generator.make_token(self.user, ACTIVATE)
+        self.assertTemplateUsed(self.client.get(reverse('activate_account', kwargs={'token': second})),
+                                'accounts/activation_done.html')
+        self.assertContains(self.client.get(reverse('activate_account', kwargs={'token': first})), 'expired')
+
+    def test_forged_and_expired_rejected_without_queries(self):
+        """
+        Tampered, wrong purpose and expired tokens never reach the database
+        """
+        token = account_token_generator.make_token(self.user, ACTIVATE)
+        forged = signing.dumps({'uid': self.user.pk, 'purpose': ACTIVATE}, salt='something else')
+        wrong_purpose = account_token_generator.make_token(self.user, VERIFY_EMAIL, 'new@test.com')
+        for bad in (token + 'x', forged, wrong_purpose):
+            with self.assertNumQueries(0):
+                self.assertContains(self.client.get(reverse('activate_account', kwargs={'token': bad})), 'expired')
+        with override_settings(ACCOUNT_TOKEN_TIMEOUT=-1), self.assertNumQueries(0):
+            self.assertContains(self.client.get(reverse('activate_account', kwargs={'token': token})), 'expired')
+
+    def test_email_verification(self):
+        """
+        The link only verifies the address it was sent for, once
+        """
+        self.user.is_active = True
+        self.user.requested_email = 'new@test.com'
+        self.user.save()
+        self.client.force_login(self.user)
+        stale = account_token_generator.make_token(self.user, VERIFY_EMAIL, 'old-request@test.com')
+        self.assertContains(self.client.get(reverse('email_edit_verify', kwargs={'token': stale})), 'invalid')
+
+        url = reverse('email_edit_verify', kwargs={
+            'token': account_token_generator.make_token(self.user, VERIFY_EMAIL, 'new@test.com'),
+        })
+        self.assertTemplateUsed(self.client.get(url), 'accounts/email_edit_complete.html')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, 'new@test.com')
+        self.assertIsNone(self.user.requested_email)
+        # Asking for the same address again needs a new link
+        self.user.requested_email = 'new@test.com'
+        self.user.save()
+        self.assertContains(self.client.get(url), 'invalid')
+
+    def test_other_users_link_rejected(self):
+        other = User.objects.create(email='other@test.com', first_name='Jane', last_name='Doe', is_active=True)
+        self.client.force_login(other)
+        token = account_token_generator.make_token(self.user, VERIFY_EMAIL, 'new@test.com')
+        self.assertContains(self.client.get(reverse('email_edit_verify', kwargs={'token': token})), 'expired')
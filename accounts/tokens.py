@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core import signing
+from django.db.models import F
+
+from .models import User
+
+ACTIVATE = 'activate'
+VERIFY_EMAIL = 'verify-email'
+
+
+class AccountTokenGenerator:
+    """
+    Signed tokens for account activation and email change links. The user id, purpose and requested
+    email travel in the token, so forged and expired links are rejected without a database query.
+    The user's token_nonce travels too, and using a token bumps it, so each token can only be used once.
+    """
+    salt = 'accounts.tokens.AccountTokenGenerator'
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'ACCOUNT_TOKEN_TIMEOUT', 60 * 60 * 24 * 3)
+
+    def make_token(self, user, purpose, email=None):
+        payload = {'uid': user.pk, 'purpose': purpose, 'nonce': user.token_nonce}
+        if email:
+            payload['email'] = email
+        return signing.dumps(payload, salt=self.salt, compress=True)
+
+    def check_token(self, token, purpose):
+        """
+        Returns the payload of a genuine, unexpired token for `purpose`, otherwise None.
+        Whether it has been used is only known to consume().
+        """
+        try:
+            payload = signing.loads(token, salt=self.salt, max_age=self.timeout)
+        except signing.BadSignature:
+            return None
+        if payload.get('purpose') != purpose:
+            return None
+        return payload
+
+    def consume(self, payload):
+        """
+        Marks the token used, along with any other outstanding tokens for the user. Returns False if
+        it already was, e.g. by a concurrent request.
+        """
+        return bool(User.objects.filter(pk=payload['uid'], token_nonce=payload.get('nonce'))
+                    .update(token_nonce=F('token_nonce') + 1))
+
+
+account_token_generator = AccountTokenGenerator()
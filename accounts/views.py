@@ -2,13 +2,14 @@ from django.shortcuts import render, HttpResponse, redirect
 from django.views import View
 from django.views.generic import TemplateView
 from django.urls import reverse
-from django.utils.encoding import force_bytes, force_text
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
-from django.contrib.auth.tokens import default_token_generator
+from django.utils import timezone
 from django.contrib.auth.mixins import LoginRequiredMixin
 
+from gifttracker.db import ReplicaReadMixin
+
 from .forms import UserCreationForm, UserProfileEditForm, EmailChangeForm
 from .models import User
+from .tokens import ACTIVATE, VERIFY_EMAIL, account_token_generator
 
 
 class UserCreationView(View):
@@ -30,16 +31,15 @@ class UserCreationView(View):
             user_obj = form.save()
 
             # Create activation URL
-            kwargs = {
-                "uidb64": urlsafe_base64_encode(force_bytes(user_obj.pk)).decode(),
-                "token": default_token_generator.make_token(user_obj)
-            }
+            kwargs = {"token": account_token_generator.make_token(user_obj, ACTIVATE)}
             activation_url = reverse('activate_account', kwargs=kwargs)
             activation_url_full = '{0}://{1}{2}'.format(request.scheme, request.get_host(), activation_url)
             user_obj.send_email(
                 subject='Activate your account',
                 message='Dear {0},\n\nThank you for registering with GiftTracker.\nPlease activate your account by clicking the link below.\n\n{1}'.format(user_obj.get_short_name(), activation_url_full),
             )
+            user_obj.activation_sent_at = timezone.now()
+            user_obj.save(update_fields=['activation_sent_at'])
 
             return render(request, self.done_template_name)
         else:
@@ -48,28 +48,25 @@ class UserCreationView(View):
 
 class UserActivationView(View):
     """
-    Activates an account using provided token and user id
+    Activates an account using provided token
     """
     template_name = 'accounts/activation_done.html'
 
-    def get(self, request, uidb64, token):
-        try:
-            # Decode user ID and get user from DB
-            uid = force_text(urlsafe_base64_decode(uidb64))
-            user = User.objects.get(pk=uid)
-        except User.DoesNotExist:
-            user = None
+    def get(self, request, token):
+        # Forged and expired links are turned away before the DB is queried
+        payload = account_token_generator.check_token(token, ACTIVATE)
+        user = User.objects.filter(pk=payload['uid']).first() if payload else None
 
-        if user and default_token_generator.check_token(user, token):
+        if user and account_token_generator.consume(payload):
             # Activate the user and display success page
             user.is_active = True
-            user.save()
+            user.save(update_fields=['is_active'])
             return render(request, self.template_name)
         else:
             return HttpResponse("Activation link has expired")
 
 
-class UserProfileView(LoginRequiredMixin, TemplateView):
+class UserProfileView(LoginRequiredMixin, ReplicaReadMixin, TemplateView):
     template_name = 'accounts/profile.html'
 
 
@@ -112,10 +109,7 @@ class UserEmailEditView(LoginRequiredMixin, View):
             form.save()
 
             # Send verification email
-            kwargs = {
-                "uidb64": urlsafe_base64_encode(force_bytes(request.user.pk)).decode(),
-                "token": default_token_generator.make_token(request.user)
-            }
+            kwargs = {"token": account_token_generator.make_token(request.user, VERIFY_EMAIL, request.user.requested_email)}
             verification_url = reverse("email_edit_verify", kwargs=kwargs)
             verification_url_full = "{0}://{1}{2}".format(request.scheme, request.get_host(), verification_url)
             request.user.send_email(
@@ -133,20 +127,17 @@ class UserEmailVerificationView(LoginRequiredMixin, View):
     """
     template_name = 'accounts/email_edit_complete.html'
 
-    def get(self, request, uidb64, token):
-        try:
-            # Decode user ID and get user from DB
-            uid = force_text(urlsafe_base64_decode(uidb64))
-            user = User.objects.get(pk=uid)
-        except User.DoesNotExist:
-            user = None
-
-        if user and default_token_generator.check_token(user, token):
-            # Get new email address from user object and replace actual email
-            if user.requested_email:
+    def get(self, request, token):
+        payload = account_token_generator.check_token(token, VERIFY_EMAIL)
+
+        if payload and payload['uid'] == request.user.pk:
+            # Replace the actual email with the one requested, as long as it hasn't since been changed again
+            user = request.user
+            if user.requested_email and user.requested_email == payload.get('email') and account_token_generator.consume(payload):
                 user.email = user.requested_email
                 user.requested_email = None
-                user.save()
+                user.email_requested_at = None
+                user.save(update_fields=['email', 'requested_email', 'email_requested_at'])
                 return render(request, self.template_name)
             else:
                 return HttpResponse("Verification link is invalid")
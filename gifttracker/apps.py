@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class GifttrackerConfig(AppConfig):
+    name = 'gifttracker'
+
+    def ready(self):
+        from . import instrumentation
+        instrumentation.connect()
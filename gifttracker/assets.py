@@ -0,0 +1,49 @@
+"""
+Third party front end assets used by base.html.
+
+Each asset is vendored into gifttracker/static/vendor and served from STATIC_ROOT, falling back to
+its CDN if the file is missing. `manage.py vendor_assets` downloads them, checking the integrity hash,
+which the browser checks too.
+"""
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+
+Asset = namedtuple('Asset', ['path', 'cdn_url', 'integrity', 'kind'])
+
+ASSETS = OrderedDict([
+    ('bootstrap.css', Asset(
+        'vendor/bootstrap-4.1.1/bootstrap.min.css',
+        'https://stackpath.bootstrapcdn.com/bootstrap/4.1.1/css/bootstrap.min.css',
+        'sha384-WskhaSGFgHYWDcbwN70/dfYBj47jz9qbsMId/iRN3ewGhXQFZCSftd1LZCfmhktB',
+        'style',
+    )),
+    ('jquery.js', Asset(
+        'vendor/jquery-3.3.1/jquery.slim.min.js',
+        'https://code.jquery.com/jquery-3.3.1.slim.min.js',
+        'sha384-q8i/X+965DzO0rT7abK41JStQIAqVgRVzpbzo5smXKp4YfRvH+8abtTE1Pi6jizo',
+        'script',
+    )),
+    ('bootstrap.js', Asset(
+        # Includes Popper.js 1.14.3, for dropdowns and tooltips
+        'vendor/bootstrap-4.1.1/bootstrap.bundle.min.js',
+        'https://stackpath.bootstrapcdn.com/bootstrap/4.1.1/js/bootstrap.bundle.min.js',
+        'sha384-u/bQvRA/1bobcXlcEYpsEdFVK/vJs3+T+nXLsBYJthmdBuavHvAW6UsmqO2Gd/F9',
+        'script',
+    )),
+])
+
+
+@lru_cache(maxsize=None)
+def is_vendored(name):
+    return finders.find(ASSETS[name].path) is not None
+
+
+def asset_url(name):
+    """
+    The hashed static URL of a vendored asset, otherwise its CDN URL
+    """
+    asset = ASSETS[name]
+    return static(asset.path) if is_vendored(name) else asset.cdn_url
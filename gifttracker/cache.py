@@ -0,0 +1,80 @@
+"""
+Cache backends that count hits and misses, so cache effectiveness can be checked from the admin.
+
+Counters are kept in memory and are per worker process.
+"""
+import threading
+from collections import defaultdict
+
+from django.core.cache.backends.filebased import FileBasedCache as BaseFileBasedCache
+from django.core.cache.backends.locmem import LocMemCache as BaseLocMemCache
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+    def record(self, label, hits=0, misses=0):
+        with self._lock:
+            self._counts[label]['hits'] += hits
+            self._counts[label]['misses'] += misses
+
+    def snapshot(self):
+        """
+        Returns a list of dicts with each cache's label, hits, misses and hit ratio
+        """
+        with self._lock:
+            counts = {label: dict(c) for label, c in self._counts.items()}
+        stats = []
+        for label, c in sorted(counts.items()):
+            total = c['hits'] + c['misses']
+            stats.append(dict(c, label=label, ratio=c['hits'] / total if total else None))
+        return stats
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+stats = CacheStats()
+_missing = object()
+
+
+class StatsMixin:
+    """
+    Records a hit or miss for every key read through get(). Counters are labelled with the cache's LOCATION.
+    """
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        self.stats_label = location or self.__class__.__name__
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version=version)
+        if value is _missing:
+            stats.record(self.stats_label, misses=1)
+            return default
+        stats.record(self.stats_label, hits=1)
+        return value
+
+
+# The local memory and file backends implement get_many() with get(), so it's already counted
+class LocMemCache(StatsMixin, BaseLocMemCache):
+    pass
+
+
+class FileBasedCache(StatsMixin, BaseFileBasedCache):
+    pass
+
+
+try:
+    from django_redis.cache import RedisCache as BaseRedisCache
+except ImportError:
+    pass
+else:
+    class RedisCache(StatsMixin, BaseRedisCache):
+        def get_many(self, keys, version=None):
+            keys = list(keys)
+            found = super().get_many(keys, version=version)
+            stats.record(self.stats_label, hits=len(found), misses=len(keys) - len(found))
+            return found
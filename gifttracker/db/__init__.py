@@ -0,0 +1,94 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+_local = threading.local()
+PRIMARY_COOKIE = 'db_primary'
+
+
+@contextmanager
+def read_from_replica():
+    """
+    Sends reads made inside the block to a replica, when any are configured
+    """
+    previous = getattr(_local, 'replica', False)
+    _local.replica = True
+    try:
+        yield
+    finally:
+        _local.replica = previous
+
+
+class ReplicaReadMixin:
+    """
+    For read-only views that can tolerate replication lag. Reads still go to the default database
+    for a browser that has just made a change, see ReplicaPinMiddleware.
+    """
+    def dispatch(self, request, *args, **kwargs):
+        if PRIMARY_COOKIE in request.COOKIES:
+            return super().dispatch(request, *args, **kwargs)
+        with read_from_replica():
+            return super().dispatch(request, *args, **kwargs)
+
+
+class ReplicaPinMiddleware:
+    """
+    After a request that can change data (any method but GET, HEAD, OPTIONS and TRACE), sets a cookie that
+    keeps ReplicaReadMixin views on the default database for DATABASE_REPLICA_PIN seconds. The page a form
+    redirects to, e.g. a new wishlist, then shows the change even if the replicas haven't caught up.
+    Removed from the stack when there are no DATABASE_REPLICAS.
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'DATABASE_REPLICAS', []):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            response.set_cookie(PRIMARY_COOKIE, '1', max_age=getattr(settings, 'DATABASE_REPLICA_PIN', 10),
+                                httponly=True, samesite='Lax')
+        return response
+
+
+class ReplicaRouter:
+    """
+    Routes reads inside read_from_replica() to a random DATABASE_REPLICAS alias. Everything else,
+    including all writes and migrations, goes to the default database.
+    """
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if replicas and getattr(_local, 'replica', False):
+            return random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the default database
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class DatabaseHealthCheckMiddleware:
+    """
+    Replaces persistent connections that the database server has dropped before the view uses them,
+    rather than failing the request. Enabled by DB_HEALTH_CHECKS.
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'DB_HEALTH_CHECKS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        for conn in connections.all():
+            if conn.connection is not None and not conn.is_usable():
+                conn.close()
+        return self.get_response(request)
@@ -0,0 +1,259 @@
+"""
+Per-request performance instrumentation.
+
+PerformanceMiddleware times a sample of requests (settings.PERF_SAMPLE_RATE): wall time, database
+queries, template rendering and outbound email. Each sampled response gets a Server-Timing header,
+and the timings are aggregated per URL name into histograms that can be viewed at /admin/performance/
+or dumped with `manage.py dump_request_metrics`.
+
+Histograms live in each worker's memory and are copied to the cache every PERF_FLUSH_INTERVAL seconds,
+so with a shared cache (file or redis) the page and command show all workers together.
+"""
+import bisect
+import os
+import random
+import socket
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.models.signals import post_save, pre_save
+from django.template.backends.django import DjangoTemplates as BaseDjangoTemplates, Template as BaseTemplate
+
+# Histogram bucket upper bounds in milliseconds, each 25% above the last, from 0.1 ms to about a minute
+BUCKETS = [0.1 * 1.25 ** i for i in range(60)]
+METRICS = ('total', 'db', 'db_queries', 'template', 'email')
+CACHE_INDEX_KEY = 'gifttracker.instrumentation:workers'
+
+_local = threading.local()
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. Percentiles are approximate (to the bucket's upper bound), but
+    recording is O(log buckets) and histograms from different workers can be merged by adding counts.
+    """
+    def __init__(self, counts=None):
+        self.counts = list(counts) if counts else [0] * (len(BUCKETS) + 1)
+
+    def record(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def percentile(self, p):
+        total = self.count
+        if not total:
+            return None
+        threshold = total * p / 100
+        running = 0
+        for i, n in enumerate(self.counts):
+            running += n
+            if running >= threshold:
+                return BUCKETS[i] if i < len(BUCKETS) else float('inf')
+
+
+class Registry:
+    """
+    Histograms for each (URL name, metric) pair, for this worker process
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.last_flush = time.monotonic()
+
+    def record(self, name, values):
+        with self._lock:
+            for metric, value in values.items():
+                self.histograms.setdefault((name, metric), Histogram()).record(value)
+
+    def snapshot(self):
+        with self._lock:
+            return {key: list(h.counts) for key, h in self.histograms.items()}
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+
+    def flush(self, force=False):
+        """
+        Copies this worker's histograms to the cache, at most every PERF_FLUSH_INTERVAL seconds
+        """
+        now = time.monotonic()
+        if not force and now - self.last_flush < getattr(settings, 'PERF_FLUSH_INTERVAL', 30):
+            return
+        self.last_flush = now
+        key = 'gifttracker.instrumentation:{0}:{1}'.format(socket.gethostname(), os.getpid())
+        cache.set(key, self.snapshot(), None)
+        workers = cache.get(CACHE_INDEX_KEY) or []
+        if key not in workers:
+            cache.set(CACHE_INDEX_KEY, workers + [key], None)
+
+
+registry = Registry()
+
+
+def collect():
+    """
+    Merges the histograms of every worker that has flushed to the cache (and this one), returning
+    a list of {'name', 'metric', 'count', 'p50', 'p95', 'p99'} dicts sorted by URL name
+    """
+    registry.flush(force=True)
+    merged = {}
+    for snapshot in cache.get_many(cache.get(CACHE_INDEX_KEY) or []).values():
+        for key, counts in snapshot.items():
+            merged.setdefault(tuple(key), Histogram()).merge(Histogram(counts))
+    return [
+        {
+            'name': name,
+            'metric': metric,
+            'count': h.count,
+            'p50': h.percentile(50),
+            'p95': h.percentile(95),
+            'p99': h.percentile(99),
+        }
+        for (name, metric), h in sorted(merged.items(), key=lambda item: (item[0][0], METRICS.index(item[0][1])))
+    ]
+
+
+def reset():
+    """
+    Clears the histograms of every worker
+    """
+    registry.reset()
+    workers = cache.get(CACHE_INDEX_KEY) or []
+    cache.delete_many(workers + [CACHE_INDEX_KEY])
+
+
+def start(metric):
+    """
+    Starts timing `metric` for the request being sampled, if any. Returns whether it started, which it
+    doesn't if `metric` is already being timed, so nested blocks are only counted once.
+    """
+    timings = getattr(_local, 'timings', None)
+    if timings is None or metric in timings.active:
+        return False
+    timings.active[metric] = time.perf_counter()
+    return True
+
+
+def stop(metric):
+    """
+    Adds the time since start(metric) to `metric` for the request being sampled
+    """
+    timings = getattr(_local, 'timings', None)
+    started = timings.active.pop(metric, None) if timings is not None else None
+    if started is not None:
+        timings.values[metric] = timings.values.get(metric, 0) + (time.perf_counter() - started) * 1000
+
+
+class timed:
+    """
+    Adds the time spent in the block to `metric` for the request being sampled, if any
+    """
+    def __init__(self, metric):
+        self.metric = metric
+
+    def __enter__(self):
+        self.started = start(self.metric)
+
+    def __exit__(self, *exc_info):
+        if self.started:
+            stop(self.metric)
+
+
+def email_queueing(sender, **kwargs):
+    start('email')
+
+
+def email_queued(sender, **kwargs):
+    stop('email')
+
+
+def connect():
+    """
+    Times queueing outbound email, i.e. saving an accounts.OutboundEmail, as the request's `email` metric
+    """
+    pre_save.connect(email_queueing, sender='accounts.OutboundEmail', dispatch_uid='instrumentation.email_queueing')
+    post_save.connect(email_queued, sender='accounts.OutboundEmail', dispatch_uid='instrumentation.email_queued')
+
+
+class RequestTimings:
+    def __init__(self):
+        self.values = {'db': 0, 'db_queries': 0}
+        self.active = {}
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.values['db'] += (time.perf_counter() - start) * 1000
+            self.values['db_queries'] += 1
+
+    def server_timing(self):
+        parts = ['total;dur={0:.1f}'.format(self.values['total'])]
+        parts.append('db;dur={0:.1f};desc="{1} queries"'.format(self.values['db'], self.values['db_queries']))
+        for metric in ('template', 'email'):
+            if metric in self.values:
+                parts.append('{0};dur={1:.1f}'.format(metric, self.values[metric]))
+        return ', '.join(parts)
+
+
+class PerformanceMiddleware:
+    """
+    Times a random sample of requests. Removed from the stack entirely when PERF_SAMPLE_RATE is 0.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PERF_SAMPLE_RATE', 0)
+        if not self.sample_rate:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timings = _local.timings = RequestTimings()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            _local.timings = None
+        timings.values['total'] = (time.perf_counter() - start) * 1000
+
+        match = request.resolver_match
+        registry.record(match.view_name if match else '<unresolved>', timings.values)
+        registry.flush()
+        response['Server-Timing'] = timings.server_timing()
+        return response
+
+
+class Template(BaseTemplate):
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return super().render(context, request)
+
+
+class DjangoTemplates(BaseDjangoTemplates):
+    """
+    Django template backend that reports render time to PerformanceMiddleware
+    """
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return Template(template.template, self)
@@ -0,0 +1,28 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from gifttracker import instrumentation
+
+
+class Command(BaseCommand):
+    help = (
+        'Prints request timing percentiles per URL name, as recorded by PerformanceMiddleware. '
+        'Only workers sharing this cache (file or redis) are included.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Print JSON instead of a table')
+        parser.add_argument('--reset', action='store_true', help='Clear the recorded timings afterwards')
+
+    def handle(self, *args, **options):
+        metrics = instrumentation.collect()
+        if options['json']:
+            self.stdout.write(json.dumps(metrics, indent=2))
+        else:
+            self.stdout.write('{0:<32} {1:<12} {2:>8} {3:>9} {4:>9} {5:>9}'.format(
+                'URL name', 'metric', 'requests', 'p50', 'p95', 'p99'))
+            for row in metrics:
+                self.stdout.write('{name:<32} {metric:<12} {count:>8} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f}'.format(**row))
+        if options['reset']:
+            instrumentation.reset()
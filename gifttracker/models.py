@@ -0,0 +1,16 @@
+from django.db import models
+
+
+class RateLimitCounter(models.Model):
+    """
+    Requests counted by gifttracker.ratelimit against one key, in the current and previous fixed windows
+    """
+    key = models.CharField(max_length=300, unique=True)
+    current_window = models.BigIntegerField()
+    count = models.PositiveIntegerField(default=0)
+    previous_count = models.PositiveIntegerField(default=0)
+    # Once the current window and the next are over, neither count matters and cleanup_accounts deletes the row
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,114 @@
+"""
+Throttling for routes that are expensive to abuse, e.g. logins, which hash a password every attempt.
+
+Requests are counted with a sliding window: the count for the current fixed window plus the previous
+window's count, weighted by how much of it still overlaps the last `period` seconds. The counts are kept
+in the database (RateLimitCounter) so that every worker sees them. Limits per route are set in the
+RATE_LIMITS setting.
+"""
+import math
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, F, When
+from django.http import HttpResponse
+
+from .models import RateLimitCounter
+
+
+class RateLimiter:
+    def __init__(self, clock=time.time):
+        self.clock = clock
+
+    def hit(self, key, limit, period):
+        """
+        Counts a request against `key`. Returns 0 if it is within `limit` requests per `period`
+        seconds, otherwise the number of seconds until the next window starts.
+        """
+        now = self.clock()
+        window = int(now // period)
+        key = '{0}:{1}'.format(key, period)
+        counters = RateLimitCounter.objects.filter(key=key)
+        expires_at = datetime.fromtimestamp((window + 2) * period, timezone.utc)
+        # A single UPDATE, so concurrent requests all count. When the window has moved on, the count
+        # becomes the previous count, or is dropped if the counter has been idle for a whole window.
+        changes = {
+            'previous_count': Case(
+                When(current_window=window, then=F('previous_count')),
+                When(current_window=window - 1, then=F('count')),
+                default=0, output_field=models.PositiveIntegerField(),
+            ),
+            'count': Case(
+                When(current_window=window, then=F('count') + 1),
+                default=1, output_field=models.PositiveIntegerField(),
+            ),
+            'current_window': window,
+            'expires_at': expires_at,
+        }
+        if not counters.update(**changes):
+            try:
+                with transaction.atomic():
+                    RateLimitCounter.objects.create(key=key, current_window=window, count=1, expires_at=expires_at)
+            except IntegrityError:
+                # Created by a concurrent request
+                counters.update(**changes)
+        count, previous_count = counters.values_list('count', 'previous_count').get()
+
+        overlap = 1 - (now - window * period) / period
+        if count + previous_count * overlap > limit:
+            return max(1, math.ceil((window + 1) * period - now))
+        return 0
+
+
+limiter = RateLimiter()
+
+
+def client_ip(request):
+    """
+    The client's address, read from X-Forwarded-For when the app sits behind RATE_LIMIT_PROXY_COUNT proxies
+    """
+    proxies = getattr(settings, 'RATE_LIMIT_PROXY_COUNT', 0)
+    forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+    if proxies and len(forwarded) >= proxies:
+        # Each proxy appends the address it received the request from, so earlier entries can be forged
+        return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def request_key(request, key_type):
+    if key_type == 'ip':
+        return client_ip(request)
+    if key_type == 'email':
+        # The login form calls the email field `username`
+        email = request.POST.get('email') or request.POST.get('username')
+        # No valid address is longer than 254 characters
+        return email.strip().lower()[:254] if email else None
+    raise ValueError('Unknown rate limit key type {0!r}'.format(key_type))
+
+
+def ratelimit(route):
+    """
+    Throttles POSTs to a view with the limits in RATE_LIMITS[route], e.g.
+    {'ip': (20, 60), 'email': (5, 300)} for 20 per minute per IP and 5 per 5 minutes per email.
+    Over the limit, responds 429 without calling the view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method == 'POST':
+                limits = getattr(settings, 'RATE_LIMITS', {}).get(route, {})
+                for key_type, (limit, period) in sorted(limits.items()):
+                    value = request_key(request, key_type)
+                    if not value:
+                        continue
+                    retry_after = limiter.hit('{0}:{1}:{2}'.format(route, key_type, value), limit, period)
+                    if retry_after:
+                        response = HttpResponse('Too many requests, please try again later.', status=429)
+                        response['Retry-After'] = str(retry_after)
+                        return response
+            return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
@@ -11,6 +11,9 @@ https://docs.djangoproject.com/en/2.0/ref/settings/
 """
 
 import os
+from importlib.util import find_spec
+
+import dj_database_url
 import django_heroku
 
 
@@ -25,7 +28,7 @@ ALLOWED_HOSTS = []
 
 # Application definition
 INSTALLED_APPS = [
-    'accounts',
+    'accounts.apps.AccountsConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -34,10 +37,15 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'crispy_forms',
     'main',
+    'gifttracker.apps.GifttrackerConfig',
 ]
 
 MIDDLEWARE = [
+    'gifttracker.instrumentation.PerformanceMiddleware',
+    'gifttracker.db.DatabaseHealthCheckMiddleware',
+    'gifttracker.db.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -46,14 +54,28 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Fraction of requests PerformanceMiddleware times (0 disables it), and how often (seconds)
+# each worker copies its timings to the cache for /admin/performance/ and `manage.py dump_request_metrics`
+PERF_SAMPLE_RATE = float(os.environ.get('PERF_SAMPLE_RATE', 0))
+PERF_FLUSH_INTERVAL = 30
+
 ROOT_URLCONF = 'gifttracker.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    # Compile each template once per process. gifttracker.warmup compiles them all at startup.
+    TEMPLATE_LOADERS = [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Stock Django templates, with render times reported to PerformanceMiddleware
+        'BACKEND': 'gifttracker.instrumentation.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'gifttracker/templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -69,17 +91,110 @@ WSGI_APPLICATION = 'gifttracker.wsgi.application'
 
 
 # Database
+# DATABASE_URL (set by Heroku Postgres) selects the database, defaulting to a local SQLite file.
+DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///' + os.path.join(BASE_DIR, 'db.sqlite3'))
+# Seconds a connection is kept open for reuse by later requests; 0 reconnects on every request
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+# Check persistent connections at the start of each request, replacing any the server has dropped.
+# Off by default: it costs a query per connection on every request, and is only worth it where
+# connections are dropped while idle, e.g. behind a pooler with a short idle timeout.
+DB_HEALTH_CHECKS = os.environ.get('DB_HEALTH_CHECKS', 'false') == 'true'
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    'default': dj_database_url.parse(
+        DATABASE_URL, conn_max_age=DB_CONN_MAX_AGE, ssl_require=DATABASE_URL.startswith('postgres'),
+    ),
 }
 
+# DATABASE_POOLER=pgbouncer when DATABASE_URL points at PgBouncer in transaction pooling mode,
+# which can't hold server side cursors open across transactions
+if os.environ.get('DATABASE_POOLER') == 'pgbouncer':
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# SQLite tuned for concurrent workers on a single node: WAL lets readers run alongside the writer,
+# and writers wait on each other rather than failing with "database is locked"
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['ENGINE'] = 'gifttracker.db.sqlite3'
+    DATABASES['default']['OPTIONS'] = {
+        'pragmas': {
+            'journal_mode': 'wal',
+            'synchronous': 'normal',
+            # Milliseconds
+            'busy_timeout': 5000,
+            # Bytes
+            'mmap_size': 256 * 1024 * 1024,
+        },
+    }
+
+# Comma separated read replica URLs. Views using gifttracker.db.ReplicaReadMixin read from them.
+DATABASE_REPLICAS = []
+for i, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(','))):
+    alias = 'replica{0}'.format(i)
+    DATABASES[alias] = dj_database_url.parse(url, conn_max_age=DB_CONN_MAX_AGE, ssl_require=url.startswith('postgres'))
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+# Seconds ReplicaPinMiddleware keeps a browser's reads on the default database after it changes something,
+# which should cover the replicas' usual lag
+DATABASE_REPLICA_PIN = 10
+DATABASE_ROUTERS = ['gifttracker.db.ReplicaRouter']
+
+
+# Cache
+# Local memory by default. Set CACHE_BACKEND to 'file' (with CACHE_LOCATION as the directory) to share
+# the cache between workers on one host, or to 'redis' (with CACHE_LOCATION as the URL, needs django-redis).
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'gifttracker.cache.RedisCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', os.environ.get('REDIS_URL')),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'gifttracker.cache.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(BASE_DIR, '.cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'gifttracker.cache.LocMemCache',
+            'LOCATION': 'gifttracker',
+        }
+    }
+
+# Seconds browsers and proxies may reuse a shared wishlist page before revalidating it with its ETag
+WISHLIST_SHARE_MAX_AGE = 60
+# Seconds a wishlist's share link works for. Owners can also reset the link to revoke it sooner.
+WISHLIST_SHARE_LINK_MAX_AGE = 60 * 60 * 24 * 90
+
 
 # Custom User model for email authentication
 AUTH_USER_MODEL = 'accounts.User'
 
+# Sessions and the logged in user are read from the cache, falling back to the database
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+AUTHENTICATION_BACKENDS = ['accounts.backends.CachedModelBackend']
+USER_CACHE_TIMEOUT = 60 * 60
+# Columns loaded and cached for request.user, along with the user's permission set. Other fields are
+# fetched, all together, the first time one is read. Empty loads and caches the whole row.
+USER_AUTH_FIELDS = ['password', 'email', 'first_name', 'is_active', 'is_staff', 'is_superuser']
+
+# Seconds account activation and email change links stay valid
+ACCOUNT_TOKEN_TIMEOUT = 60 * 60 * 24 * 3
+
+# Throttling of POSTs to routes that hash passwords or send email, by client IP and by submitted email.
+# Each entry is (requests, seconds). Counters are kept in the database, so they are shared by every worker.
+RATE_LIMITS = {
+    'login': {'ip': (20, 60), 'email': (5, 300)},
+    'register': {'ip': (5, 60)},
+    'password_reset': {'ip': (5, 60), 'email': (3, 60 * 60)},
+}
+# Proxies in front of the app that append to X-Forwarded-For. Heroku's router is one.
+RATE_LIMIT_PROXY_COUNT = int(os.environ.get('RATE_LIMIT_PROXY_COUNT', 1 if 'DYNO' in os.environ else 0))
+
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -98,6 +213,29 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# Argon2 (argon2-cffi) or bcrypt is preferred when installed, falling back to PBKDF2. Every hasher in
+# Django's default list is kept (Argon2 and bcrypt when installed), so passwords stored before this setting
+# existed still verify, and are rehashed with the preferred hasher and current costs at login. Hashes from
+# hashers not listed, such as Django's unsalted and plain SHA1/MD5 ones, won't verify; this project never used them.
+# `manage.py tune_password_hashing --target-ms 100` suggests costs for this host.
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 150000))
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2))
+# KiB per hash, held for the duration of each login. Every worker thread can be hashing at once, so
+# keep threads x memory cost well within the dyno's memory.
+PASSWORD_ARGON2_MEMORY_COST = int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 19 * 1024))
+PASSWORD_BCRYPT_ROUNDS = int(os.environ.get('PASSWORD_BCRYPT_ROUNDS', 12))
+
+PASSWORD_HASHERS = [
+    'accounts.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+if find_spec('bcrypt'):
+    PASSWORD_HASHERS.insert(0, 'accounts.hashers.BCryptSHA256PasswordHasher')
+if find_spec('argon2'):
+    PASSWORD_HASHERS.insert(0, 'accounts.hashers.Argon2PasswordHasher')
+
+
 # Internationalization
 LANGUAGE_CODE = 'en-au'
 TIME_ZONE = 'Australia/Melbourne'
@@ -111,13 +249,39 @@ EMAIL_BACKEND = "sgbackend.SendGridBackend"
 SENDGRID_API_KEY = os.environ.get('SENDGRID_API_KEY')
 DEFAULT_FROM_EMAIL = 'GiftTracker <admin@gifttracker-new.herokuapp.com>'
 
+# Outbound mail queue, drained by `manage.py send_queued_email`.
+# The worker uses EMAIL_BACKEND unless EMAIL_QUEUE_BACKEND is set, e.g. to
+# 'django.core.mail.backends.console.EmailBackend' to run it offline.
+EMAIL_QUEUE_BACKEND = os.environ.get('EMAIL_QUEUE_BACKEND')
+EMAIL_QUEUE_BATCH_SIZE = 100
+EMAIL_QUEUE_MAX_ATTEMPTS = 5
+# Seconds before the first retry; doubled on each further attempt
+EMAIL_QUEUE_RETRY_DELAY = 60
+# Seconds a worker may hold a batch before other workers can pick it up again
+EMAIL_QUEUE_LEASE = 300
+# Seconds sent and dead emails are kept before `manage.py cleanup_accounts` deletes them. Their bodies hold
+# activation and email change links.
+EMAIL_QUEUE_RETENTION = 60 * 60 * 24 * 7
+
+# User.objects.send_bulk_email(): messages per backend connection, and connections used in parallel
+BULK_EMAIL_CHUNK_SIZE = 100
+BULK_EMAIL_CONCURRENCY = 4
+
 
 # Crispy Forms
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 
 # Static files (CSS, JavaScript, Images)
+# collectstatic writes each file under a content hash, along with gzip and (when the brotli package is
+# installed) brotli copies. WhiteNoise serves the hashed names with a ten year max-age, and picks the
+# compressed copy the browser accepts. Third party assets are listed in gifttracker/assets.py.
 STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATICFILES_DIRS = [os.path.join(BASE_DIR, 'gifttracker/static')]
+STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Unhashed files, e.g. from STATICFILES_DIRS in development
+WHITENOISE_MAX_AGE = 0 if DEBUG else 60 * 60
 
-# Heroku Django
-django_heroku.settings(locals())
+# Heroku Django. DATABASES and static files are configured above.
+django_heroku.settings(locals(), databases=False, staticfiles=False)
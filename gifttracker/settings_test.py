@@ -0,0 +1,46 @@
+"""
+Settings for the test suite, selected by `manage.py test`. Trades security and durability for speed:
+passwords hash with MD5, the database lives in memory and mail stays in django.core.mail.outbox.
+"""
+from .settings import *  # noqa: F401,F403
+
+SECRET_KEY = os.environ.get('SECRET_KEY', 'insecure-test-secret-key')
+
+DEBUG = False
+
+TEST_RUNNER = 'gifttracker.test_runner.TimedTestRunner'
+# Number of tests listed in the slowest tests report printed after each run (0 disables it)
+TEST_SLOWEST = 10
+
+# Each worker of `manage.py test --parallel` gets its own copy of the in-memory database.
+# WAL and mmap don't apply in memory, so only the remaining pragmas from settings.py are kept.
+DATABASES = {
+    'default': {
+        'ENGINE': 'gifttracker.db.sqlite3',
+        'NAME': ':memory:',
+        'OPTIONS': {
+            'pragmas': {
+                'synchronous': 'normal',
+                'busy_timeout': 5000,
+            },
+        },
+    },
+}
+DATABASE_REPLICAS = []
+
+CACHES = {
+    'default': {
+        'BACKEND': 'gifttracker.cache.LocMemCache',
+        'LOCATION': 'gifttracker',
+    }
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+EMAIL_QUEUE_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+# Templates render {% static %} without collectstatic having built a manifest
+STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+
+PERF_SAMPLE_RATE = 0
@@ -0,0 +1,93 @@
+"""
+A test runner that times every test, including those run in worker processes by `manage.py test --parallel`,
+and prints the slowest ones after the run.
+"""
+import sys
+import time
+import unittest
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner, ParallelTestSuite, RemoteTestResult, RemoteTestRunner
+
+
+class TimedTestResultMixin:
+    """
+    Records how long each test took in `durations`, as (seconds, test id) pairs
+    """
+    # Set while replaying events from worker processes, which send their own durations
+    timed_remotely = False
+
+    def __init__(self, *args, **kwargs):
+        super(TimedTestResultMixin, self).__init__(*args, **kwargs)
+        self.durations = []
+        self._started = None
+
+    def startTest(self, test):
+        self._started = time.perf_counter()
+        super(TimedTestResultMixin, self).startTest(test)
+
+    def stopTest(self, test):
+        if not self.timed_remotely:
+            self.record_duration(test, time.perf_counter() - self._started)
+        super(TimedTestResultMixin, self).stopTest(test)
+
+    def record_duration(self, test, seconds):
+        self.durations.append((seconds, test.id()))
+
+
+class TimedTextTestResult(TimedTestResultMixin, unittest.TextTestResult):
+    pass
+
+
+class TimedRemoteTestResult(TimedTestResultMixin, RemoteTestResult):
+    """
+    Sends each duration back to the main process as an event, replayed there on TimedTextTestResult
+    """
+    def record_duration(self, test, seconds):
+        self.events.append(('record_duration', self.test_index, seconds))
+
+
+class TimedRemoteTestRunner(RemoteTestRunner):
+    resultclass = TimedRemoteTestResult
+
+
+class TimedParallelTestSuite(ParallelTestSuite):
+    runner_class = TimedRemoteTestRunner
+
+    def run(self, result):
+        result.timed_remotely = True
+        return super(TimedParallelTestSuite, self).run(result)
+
+
+class TimedTestRunner(DiscoverRunner):
+    parallel_test_suite = TimedParallelTestSuite
+
+    def __init__(self, slowest=None, **kwargs):
+        super(TimedTestRunner, self).__init__(**kwargs)
+        self.slowest = getattr(settings, 'TEST_SLOWEST', 10) if slowest is None else slowest
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super(TimedTestRunner, cls).add_arguments(parser)
+        parser.add_argument(
+            '--slowest', type=int, metavar='N',
+            help='Number of slowest tests to report (default: TEST_SLOWEST). 0 disables the report.',
+        )
+
+    def get_resultclass(self):
+        resultclass = super(TimedTestRunner, self).get_resultclass()
+        if resultclass is None:
+            return TimedTextTestResult
+        return type('Timed' + resultclass.__name__, (TimedTestResultMixin, resultclass), {})
+
+    def suite_result(self, suite, result, **kwargs):
+        if self.slowest > 0 and getattr(result, 'durations', None):
+            self.report_slowest(result.durations)
+        return super(TimedTestRunner, self).suite_result(suite, result, **kwargs)
+
+    def report_slowest(self, durations):
+        slowest = sorted(durations, reverse=True)[:self.slowest]
+        total = sum(seconds for seconds, _ in durations)
+        lines = ['', 'Slowest {0} of {1} tests ({2:.2f}s in tests):'.format(len(slowest), len(durations), total)]
+        lines.extend('{0:8.3f}s  {1}'.format(seconds, test_id) for seconds, test_id in slowest)
+        print('\n'.join(lines), file=sys.stderr)
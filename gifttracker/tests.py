@@ -0,0 +1,305 @@
+import base64
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from io import StringIO
+from unittest import mock
+
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.template import engines
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import User
+from main.models import Wishlist
+from . import assets, cache as cache_backends, db, instrumentation, ratelimit, test_runner, warmup
+
+
+class CacheStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        cache_backends.stats.reset()
+
+    def test_hits_and_misses_counted(self):
+        cache.get('missing')
+        cache.set('present', 1)
+        cache.get('present')
+        cache.get_many(['present', 'missing'])
+        stats = cache_backends.stats.snapshot()
+        self.assertEqual(stats[0]['hits'], 2)
+        self.assertEqual(stats[0]['misses'], 2)
+        self.assertEqual(stats[0]['ratio'], 0.5)
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_stats_admin_page(self):
+        url = reverse('admin_cache_stats')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        user = User.objects.create(email='staff@test.com', first_name='John', last_name='Doe', is_active=True, is_staff=True)
+        self.client.force_login(user)
+        cache.get('missing')
+        self.assertContains(self.client.get(url), 'gifttracker')
+
+
+@override_settings(PERF_SAMPLE_RATE=1, STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        instrumentation.reset()
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('main:home'))
+        self.assertIn('total;dur=', response['Server-Timing'])
+        self.assertIn('template;dur=', response['Server-Timing'])
+
+    def test_timings_aggregated_per_url_name(self):
+        user = User.objects.create(email='test@test.com', first_name='John', last_name='Doe', is_active=True)
+        self.client.force_login(user)
+        for i in range(3):
+            self.client.get(reverse('main:wishlist_list'))
+        metrics = {(m['name'], m['metric']): m for m in instrumentation.collect()}
+        self.assertEqual(metrics[('main:wishlist_list', 'total')]['count'], 3)
+        self.assertGreaterEqual(metrics[('main:wishlist_list', 'db_queries')]['p50'], 1)
+
+    def test_email_time_recorded(self):
+        timings = instrumentation._local.timings = instrumentation.RequestTimings()
+        self.addCleanup(setattr, instrumentation._local, 'timings', None)
+        user = User.objects.create(email='test@test.com', first_name='John', last_name='Doe')
+        user.send_email(subject='Hello', message='World')
+        timings.values['total'] = 0
+        self.assertIn('email;dur=', timings.server_timing())
+
+    def test_staff_endpoint(self):
+        self.client.get(reverse('main:home'))
+        user = User.objects.create(email='staff@test.com', first_name='John', last_name='Doe', is_active=True, is_staff=True)
+        self.client.force_login(user)
+        self.assertContains(self.client.get(reverse('admin_performance_stats')), 'main:home')
+
+    def test_dump_command(self):
+        self.client.get(reverse('main:home'))
+        out = StringIO()
+        call_command('dump_request_metrics', '--reset', stdout=out)
+        self.assertIn('main:home', out.getvalue())
+        self.assertEqual(instrumentation.collect(), [])
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_disabled(self):
+        response = self.client.get(reverse('main:home'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class DatabaseTests(TestCase):
+    def test_sqlite_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            # NORMAL
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    @override_settings(DATABASE_REPLICAS=['replica0'])
+    def test_replica_routing(self):
+        router = db.ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Wishlist))
+        with db.read_from_replica():
+            self.assertEqual(router.db_for_read(Wishlist), 'replica0')
+            self.assertEqual(router.db_for_write(Wishlist), 'default')
+        self.assertIsNone(router.db_for_read(Wishlist))
+        self.assertFalse(router.allow_migrate('replica0', 'main'))
+
+    @override_settings(DATABASE_REPLICAS=['replica0'])
+    def test_read_only_views_use_replica(self):
+        user = User.objects.create(email='john@test.com', first_name='John', last_name='Doe', is_active=True)
+        self.client.force_login(user)
+        routed = []
+
+        def db_for_read(router, model, **hints):
+            routed.append(getattr(db._local, 'replica', False))
+
+        with mock.patch.object(db.ReplicaRouter, 'db_for_read', db_for_read):
+            self.client.get(reverse('main:wishlist_list'))
+        self.assertIn(True, routed)
+        self.assertFalse(db._local.replica)
+
+    @override_settings(DATABASE_REPLICAS=['replica0'])
+    def test_reads_pinned_to_default_after_write(self):
+        user = User.objects.create(email='john@test.com', first_name='John', last_name='Doe', is_active=True)
+        self.client.force_login(user)
+        response = self.client.post(reverse('main:wishlist_create'), {'name': 'Birthday'})
+        self.assertIn(db.PRIMARY_COOKIE, response.cookies)
+        routed = []
+
+        def db_for_read(router, model, **hints):
+            routed.append(getattr(db._local, 'replica', False))
+
+        with mock.patch.object(db.ReplicaRouter, 'db_for_read', db_for_read):
+            self.client.get(response.url)
+        self.assertTrue(routed)
+        self.assertNotIn(True, routed)
+
+    @override_settings(DB_HEALTH_CHECKS=True)
+    def test_health_check_replaces_dropped_connection(self):
+        connection.ensure_connection()
+        middleware = db.DatabaseHealthCheckMiddleware(lambda request: None)
+        with mock.patch.object(connection, 'is_usable', return_value=False), mock.patch.object(connection, 'close') as close:
+            middleware(None)
+        self.assertTrue(close.called)
+
+
+class FakeClock:
+    # The start of a window for periods that divide 6000000, e.g. 60
+    def __init__(self, now=6000000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(ratelimit.limiter, 'clock', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sliding_window(self):
+        """
+        The previous window's count still applies, weighted by how much of it overlaps the last period
+        """
+        for _ in range(10):
+            self.assertEqual(ratelimit.limiter.hit('key', 10, 60), 0)
+        self.assertEqual(ratelimit.limiter.hit('key', 10, 60), 60)
+        # A quarter into the next window, three quarters of the previous 11 hits still count
+        self.clock.now += 75
+        self.assertEqual(ratelimit.limiter.hit('key', 10, 60), 0)
+        self.assertEqual(ratelimit.limiter.hit('key', 10, 60), 45)
+        self.clock.now += 60
+        self.assertEqual(ratelimit.limiter.hit('key', 10, 60), 0)
+        # Idle for a whole window, so nothing carries over
+        self.clock.now += 120
+        for _ in range(10):
+            self.assertEqual(ratelimit.limiter.hit('key', 10, 60), 0)
+
+    @override_settings(RATE_LIMITS={'login': {'email': (3, 300), 'ip': (100, 60)}})
+    def test_login_throttled_per_email(self):
+        data = {'username': 'john@test.com', 'password': 'wrong'}
+        for _ in range(3):
+            self.assertEqual(self.client.post(reverse('login'), data).status_code, 200)
+        # Turned away before the form looks the user up or hashes the password
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('login'), data)
+        self.assertFalse([query for query in queries if 'accounts_user' in query['sql']])
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(int(response['Retry-After']) > 0)
+        self.assertEqual(self.client.post(reverse('login'), dict(data, username='jane@test.com')).status_code, 200)
+        self.clock.now += 600
+        self.assertEqual(self.client.post(reverse('login'), data).status_code, 200)
+
+    @override_settings(RATE_LIMITS={'register': {'ip': (1, 60)}}, RATE_LIMIT_PROXY_COUNT=1)
+    def test_register_throttled_per_forwarded_ip(self):
+        url = reverse('register')
+        self.assertEqual(self.client.post(url, {}, HTTP_X_FORWARDED_FOR='10.0.0.1').status_code, 200)
+        self.assertEqual(self.client.post(url, {}, HTTP_X_FORWARDED_FOR='10.0.0.1').status_code, 429)
+        # A forged leading entry doesn't help
+        self.assertEqual(self.client.post(url, {}, HTTP_X_FORWARDED_FOR='1.2.3.4, 10.0.0.1').status_code, 429)
+        self.assertEqual(self.client.post(url, {}, HTTP_X_FORWARDED_FOR='10.0.0.2').status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_X_FORWARDED_FOR='10.0.0.1').status_code, 200)
+
+
+class TemplateWarmupTests(TestCase):
+    def test_warm_templates(self):
+        names = warmup.template_names(engines.all()[0])
+        self.assertIn('accounts/register.html', names)
+        self.assertIn('base.html', names)
+        self.assertEqual(warmup.warm_templates(), len(names))
+
+
+class StaticAssetTests(TestCase):
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root)
+        assets.is_vendored.cache_clear()
+        self.addCleanup(assets.is_vendored.cache_clear)
+
+    def test_vendored_assets_match_integrity(self):
+        """
+        Every asset is committed to gifttracker/static, and is the file its integrity hash pins
+        """
+        for name, asset in assets.ASSETS.items():
+            path = finders.find(asset.path)
+            self.assertIsNotNone(path, name)
+            algorithm, expected = asset.integrity.split('-', 1)
+            with open(path, 'rb') as f:
+                self.assertEqual(base64.b64encode(hashlib.new(algorithm, f.read()).digest()).decode(), expected, name)
+
+    def test_referenced_assets_hashed(self):
+        """
+        Every asset the templates reference is collected under a hashed name, with a compressed copy
+        """
+        with self.settings(STATIC_ROOT=self.static_root,
+                           STATICFILES_STORAGE='whitenoise.storage.CompressedManifestStaticFilesStorage'):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            names = [asset.path for asset in assets.ASSETS.values()]
+            engine = engines.all()[0]
+            for template in warmup.template_names(engine):
+                with open(engine.get_template(template).origin.name) as f:
+                    names += re.findall(r"{% static ['\"]([^'\"]+)['\"]", f.read())
+            for name in names:
+                hashed = staticfiles_storage.stored_name(name)
+                self.assertNotEqual(hashed, name)
+                self.assertTrue(os.path.exists(os.path.join(self.static_root, hashed)), hashed)
+                self.assertTrue(os.path.exists(os.path.join(self.static_root, hashed + '.gz')), hashed)
+
+            response = self.client.get(reverse('main:home'))
+            urls = {name: staticfiles_storage.url(asset.path) for name, asset in assets.ASSETS.items()}
+        self.assertContains(response, '<link rel="preload" href="{0}" as="style"'.format(urls['bootstrap.css']))
+        self.assertContains(response, '<link rel="stylesheet" href="{0}"'.format(urls['bootstrap.css']))
+        self.assertContains(response, '<script src="{0}"'.format(urls['jquery.js']))
+        self.assertContains(response, '<script src="{0}"'.format(urls['bootstrap.js']))
+        for asset in assets.ASSETS.values():
+            self.assertNotContains(response, asset.cdn_url)
+
+
+class SlowTestReportTests(SimpleTestCase):
+    def test_slowest_reported(self):
+        """
+        Every test is timed, and the report lists the slowest first
+        """
+        class Sample(unittest.TestCase):
+            def test_fast(self):
+                pass
+
+            def test_slow(self):
+                clock.now += 2
+
+        clock = FakeClock(0.0)
+        suite = unittest.TestSuite([Sample('test_fast'), Sample('test_slow')])
+        result = test_runner.TimedTextTestResult(StringIO(), False, 0)
+        with mock.patch.object(test_runner.time, 'perf_counter', clock):
+            suite.run(result)
+        self.assertEqual([test_id.rsplit('.', 1)[1] for _, test_id in result.durations], ['test_fast', 'test_slow'])
+
+        runner = test_runner.TimedTestRunner(slowest=1)
+        with mock.patch('sys.stderr', new_callable=StringIO) as stderr:
+            runner.report_slowest(result.durations)
+        self.assertIn('Slowest 1 of 2 tests', stderr.getvalue())
+        self.assertIn('2.000s', stderr.getvalue())
+        self.assertIn('test_slow', stderr.getvalue())
+        self.assertNotIn('test_fast', stderr.getvalue())
+
+    def test_remote_durations_replayed(self):
+        """
+        With --parallel, workers send durations back as events instead of the main process timing the replay
+        """
+        result = test_runner.TimedRemoteTestResult()
+        result.startTest(self)
+        result.stopTest(self)
+        self.assertEqual([event[0] for event in result.events], ['startTest', 'record_duration', 'stopTest'])
+        self.assertEqual(result.durations, [])
@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from .views import cache_stats, performance_stats
+
 
 # Set django-admin names
 admin.site.site_title = 'GiftTracker'
@@ -8,6 +10,8 @@ admin.site.site_header = 'GiftTracker Admin'
 
 
 urlpatterns = [
+    path('admin/cache/', admin.site.admin_view(cache_stats), name='admin_cache_stats'),
+    path('admin/performance/', admin.site.admin_view(performance_stats), name='admin_performance_stats'),
     path('admin/', admin.site.urls),
     # Account related URLs. We don't namespace this, because we use built-in django auth views (which don't expect it)
     path('accounts/', include('accounts.urls')),
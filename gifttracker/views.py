@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.contrib import admin
+from django.shortcuts import render, redirect
+
+from . import cache, instrumentation
+
+
+def cache_stats(request):
+    """
+    Admin page showing cache hits and misses for this worker process
+    """
+    if request.method == 'POST':
+        cache.stats.reset()
+        return redirect('admin_cache_stats')
+    context = dict(
+        admin.site.each_context(request),
+        title='Cache statistics',
+        stats=cache.stats.snapshot(),
+    )
+    return render(request, 'admin/cache_stats.html', context)
+
+
+def performance_stats(request):
+    """
+    Admin page showing request timing percentiles per URL name
+    """
+    if request.method == 'POST':
+        instrumentation.reset()
+        return redirect('admin_performance_stats')
+    context = dict(
+        admin.site.each_context(request),
+        title='Request performance',
+        metrics=instrumentation.collect(),
+        sample_rate=settings.PERF_SAMPLE_RATE,
+    )
+    return render(request, 'admin/performance_stats.html', context)
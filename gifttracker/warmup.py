@@ -0,0 +1,45 @@
+"""
+Compiles every template at startup, so the first request to each page in a new worker doesn't pay for
+parsing it. Only useful with the cached template loader, which settings.py enables outside DEBUG.
+"""
+import logging
+import os
+import time
+
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(engine):
+    """
+    Names of the .html and .txt templates in the engine's directories and installed apps
+    """
+    dirs = list(engine.engine.dirs) + list(get_app_template_dirs('templates'))
+    names = set()
+    for directory in dirs:
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(('.html', '.txt')):
+                    names.add(os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/'))
+    return sorted(names)
+
+
+def warm_templates():
+    """
+    Loads every template through each engine's loaders. Returns the number loaded.
+    """
+    start = time.perf_counter()
+    loaded = 0
+    for engine in engines.all():
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError) as e:
+                # e.g. includes of optional templates, or template packs for libraries not installed
+                logger.debug('Skipped warming %s: %s', name, e)
+            else:
+                loaded += 1
+    logger.info('Warmed %d templates in %.0f ms', loaded, (time.perf_counter() - start) * 1000)
+    return loaded
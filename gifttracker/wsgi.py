@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/2.0/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
+from gifttracker.warmup import warm_templates
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "gifttracker.settings")
 
 application = get_wsgi_application()
+
+if not settings.DEBUG:
+    warm_templates()
@@ -0,0 +1,12 @@
+"""
+Gunicorn settings for the web process, tunable through environment variables.
+
+By default each worker serves requests from a pool of threads, so a request waiting on the
+database holds one thread rather than the whole worker.
+"""
+import os
+
+# Heroku sets WEB_CONCURRENCY to suit the dyno size
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
@@ -1,3 +1,49 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-# Register your models here.
+from .assignment import NoValidAssignment
+from .models import Wishlist, Gift, Exchange, Participant
+
+
+class GiftInline(admin.TabularInline):
+    model = Gift
+    fields = ('name', 'priority', 'price', 'store', 'url', 'claimed_by')
+    raw_id_fields = ('claimed_by',)
+    extra = 0
+
+
+class WishlistAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'owner', 'created')
+    list_select_related = ('owner',)
+    search_fields = ('name',)
+    raw_id_fields = ('owner', 'shared_with')
+    inlines = [GiftInline]
+
+
+class ParticipantInline(admin.TabularInline):
+    model = Participant
+    fields = ('user', 'team', 'partner')
+    raw_id_fields = ('user', 'partner')
+    extra = 0
+
+
+class ExchangeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'organiser', 'created', 'drawn_at')
+    list_select_related = ('organiser',)
+    search_fields = ('name',)
+    raw_id_fields = ('organiser', 'previous')
+    inlines = [ParticipantInline]
+    actions = ['draw']
+
+    def draw(self, request, queryset):
+        for exchange in queryset:
+            try:
+                pairs = exchange.draw()
+            except NoValidAssignment as e:
+                self.message_user(request, '{0}: {1}'.format(exchange, e), messages.ERROR)
+            else:
+                self.message_user(request, '{0}: drew {1} participants'.format(exchange, len(pairs)))
+    draw.short_description = 'Draw who gives to whom'
+
+
+admin.site.register(Wishlist, WishlistAdmin)
+admin.site.register(Exchange, ExchangeAdmin)
@@ -0,0 +1,146 @@
+"""
+Assigns each participant of a gift exchange someone else to buy for: a derangement that avoids each
+giver's excluded receivers and their own team. A randomized greedy pass places almost everyone, and
+the few left over are placed along augmenting paths, as in bipartite matching. That search is exhaustive,
+so when it fails no valid assignment exists, and the givers it got stuck on show why.
+"""
+import random
+
+# Random receivers the greedy pass tries for each giver, before leaving them to the repair pass
+GREEDY_TRIES = 20
+
+
+class NoValidAssignment(Exception):
+    """
+    The exclusions leave no valid assignment. `givers` can only give to `receivers`, which are fewer.
+    """
+    def __init__(self, message, givers=(), receivers=()):
+        super(NoValidAssignment, self).__init__(message)
+        self.givers = list(givers)
+        self.receivers = list(receivers)
+
+
+class Draw:
+    """
+    One draw for `participants`, a list of ids. `excluded` maps a giver to the ids they mustn't give to,
+    and `teams` maps ids to a team; nobody gives to someone on their own team.
+    """
+    def __init__(self, participants, excluded=None, teams=None, rng=None):
+        self.people = list(dict.fromkeys(participants))
+        self.rng = rng or random.Random()
+        index = {person: i for i, person in enumerate(self.people)}
+        # Blank teams, as stored for participants without one, don't exclude anybody
+        self.team = [(teams or {}).get(person) for person in self.people]
+        self.team = [None if team == '' else team for team in self.team]
+        self.banned = [set() for _ in self.people]
+        for giver, receivers in (excluded or {}).items():
+            if giver in index:
+                self.banned[index[giver]].update(index[r] for r in receivers if r in index)
+        # Number of givers placed by the repair pass rather than the greedy one
+        self.repaired = 0
+
+    def allowed(self, giver, receiver):
+        return (
+            giver != receiver
+            and (self.team[giver] is None or self.team[giver] != self.team[receiver])
+            and receiver not in self.banned[giver]
+        )
+
+    def run(self):
+        """
+        Returns a dict mapping each participant to the one they give to, or raises NoValidAssignment
+        """
+        n = len(self.people)
+        if n < 2:
+            raise NoValidAssignment('An exchange needs at least two participants')
+        self.receiver_of = [None] * n
+        self.giver_of = [None] * n
+
+        free = list(range(n))
+        givers = list(range(n))
+        self.rng.shuffle(givers)
+        for giver in givers:
+            for _ in range(min(GREEDY_TRIES, len(free))):
+                k = self.rng.randrange(len(free))
+                receiver = free[k]
+                if self.allowed(giver, receiver):
+                    free[k] = free[-1]
+                    free.pop()
+                    self.match(giver, receiver)
+                    break
+
+        for giver in givers:
+            if self.receiver_of[giver] is None:
+                self.augment(giver)
+                self.repaired += 1
+
+        self.mix()
+        return {self.people[g]: self.people[r] for g, r in enumerate(self.receiver_of)}
+
+    def match(self, giver, receiver):
+        self.receiver_of[giver] = receiver
+        self.giver_of[receiver] = giver
+
+    def augment(self, start):
+        """
+        Places `start` by a breadth first search for a free receiver along alternating paths, handing
+        receivers on from giver to giver. Most givers can give to almost everyone, so rather than listing
+        each giver's options, each scan takes every still unreached receiver it's allowed. Unreached receivers
+        are kept by team so a scan can skip the giver's own, and then costs the receivers it reaches plus the
+        giver's exclusions; a whole search is O(participants + exclusions).
+        """
+        unreached = {}
+        for receiver, team in enumerate(self.team):
+            unreached.setdefault(team, set()).add(receiver)
+        reached_from = {}
+        queue = [start]
+        for giver in queue:
+            reached = []
+            for team, receivers in list(unreached.items()):
+                if team is not None and team == self.team[giver]:
+                    continue
+                allowed = [r for r in receivers if r != giver and r not in self.banned[giver]]
+                receivers.difference_update(allowed)
+                if not receivers:
+                    del unreached[team]
+                reached.extend(allowed)
+            for receiver in reached:
+                reached_from[receiver] = giver
+                if self.giver_of[receiver] is None:
+                    # Shift each receiver along the path back to the start
+                    while receiver is not None:
+                        giver = reached_from[receiver]
+                        previous = self.receiver_of[giver]
+                        self.match(giver, receiver)
+                        receiver = previous
+                    return
+                queue.append(self.giver_of[receiver])
+
+        # Every receiver these givers may give to is already taken by one of them, so there is one too few
+        givers = [self.people[g] for g in queue]
+        receivers = [self.people[r] for r in reached_from]
+        raise NoValidAssignment(
+            'No valid assignment: {0} participants can only give to {1} others between them'.format(
+                len(givers), len(receivers)),
+            givers, receivers,
+        )
+
+    def mix(self):
+        """
+        Swaps the receivers of random pairs of givers where both swaps are allowed, so the result
+        doesn't depend on the order the greedy pass went in
+        """
+        for _ in range(len(self.people)):
+            a = self.rng.randrange(len(self.people))
+            b = self.rng.randrange(len(self.people))
+            receiver_a, receiver_b = self.receiver_of[a], self.receiver_of[b]
+            if a != b and self.allowed(a, receiver_b) and self.allowed(b, receiver_a):
+                self.match(a, receiver_b)
+                self.match(b, receiver_a)
+
+
+def assign(participants, excluded=None, teams=None, rng=None):
+    """
+    Maps each participant to the one they give to. See Draw.
+    """
+    return Draw(participants, excluded, teams, rng).run()
@@ -0,0 +1,56 @@
+from django import forms
+
+from crispy_forms.helper import FormHelper
+from crispy_forms.layout import Submit
+
+from accounts.models import User
+
+from .models import Wishlist, Gift
+
+
+class WishlistForm(forms.ModelForm):
+    """
+    Create or edit a wishlist
+    """
+    helper = FormHelper()
+    helper.add_input(Submit('submit', 'Save'))
+
+    class Meta:
+        model = Wishlist
+        fields = ('name', 'description')
+
+
+class GiftForm(forms.ModelForm):
+    """
+    Add or edit a gift on a wishlist
+    """
+    helper = FormHelper()
+    helper.add_input(Submit('submit', 'Save'))
+
+    class Meta:
+        model = Gift
+        fields = ('name', 'notes', 'store', 'url', 'price', 'priority')
+
+
+class ShareWishlistForm(forms.Form):
+    """
+    The email address of a user to share a wishlist with
+    """
+    helper = FormHelper()
+    helper.add_input(Submit('submit', 'Share'))
+
+    email = forms.EmailField(label='Share with', help_text='The email address they signed up with')
+
+    def __init__(self, *args, owner=None, **kwargs):
+        super(ShareWishlistForm, self).__init__(*args, **kwargs)
+        self.owner = owner
+
+    def clean_email(self):
+        email = User.objects.normalize_email(self.cleaned_data['email'])
+        try:
+            self.user = User.objects.get(email=email, is_active=True)
+        except User.DoesNotExist:
+            raise forms.ValidationError('Nobody has signed up with that email address.')
+        if self.owner is not None and self.user.pk == self.owner.pk:
+            raise forms.ValidationError('That is your own email address.')
+        return email
@@ -0,0 +1,138 @@
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from accounts.models import User
+from main.models import Wishlist, Gift
+
+
+def naive_claim(pk, user):
+    """
+    Read the gift, then save it if nobody had claimed it, like the read-then-save() pattern. Two people can
+    both read it unclaimed, and both be told they got it.
+    """
+    gift = Gift.objects.get(pk=pk)
+    if gift.claimed_by_id is not None:
+        return Gift.CLAIM_CONFLICT
+    gift.claimed_by = user
+    gift.claimed_at = timezone.now()
+    gift.save(update_fields=['claimed_by', 'claimed_at'])
+    return Gift.CLAIM_OK
+
+
+class Command(BaseCommand):
+    help = (
+        'Races threads claiming every gift on a wishlist at once, with the conditional UPDATE in '
+        'GiftQuerySet.claim() and with a naive read-then-save, against a throwaway SQLite database. '
+        'Reports claims/sec and how many gifts more than one claimant was told they had won.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Claimants racing for the same gifts')
+        parser.add_argument('--gifts', type=int, default=200, help='Gifts on the wishlist')
+        parser.add_argument('--rounds', type=int, default=3, help='Times the gifts are released and raced for')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        tmp_dir = tempfile.mkdtemp()
+        # A file rather than the usual in-memory test database, as in production
+        connection.settings_dict.update({
+            'ENGINE': 'gifttracker.db.sqlite3',
+            'OPTIONS': {'pragmas': {'journal_mode': 'wal', 'synchronous': 'normal', 'busy_timeout': 30000}},
+            'TEST': {'NAME': os.path.join(tmp_dir, 'benchmark.sqlite3')},
+        })
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stdout.write('{0:<20} {1:>9} {2:>6} {3:>10} {4:>13} {5:>11}'.format(
+                'mode', 'attempts', 'wins', 'conflicts', 'double claims', 'claims/sec'))
+            for mode, claim in (('conditional update', Gift.objects.claim), ('read then save', naive_claim)):
+                results = self.run(options['threads'], options['gifts'], options['rounds'], claim)
+                self.stdout.write('{0:<20} {1:>9} {2:>6} {3:>10} {4:>13} {5:>11.0f}'.format(
+                    mode, results['attempts'], results['wins'], results['conflicts'], results['double_claims'],
+                    results['claims_per_second']))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def run(self, threads, gifts, rounds, claim=None):
+        """
+        Races `threads` users to claim all of `gifts` gifts, `rounds` times. Returns a summary dict, where
+        `double_claims` counts gifts that more than one user was told they had claimed in the same round.
+        """
+        claim = claim or Gift.objects.claim
+        owner = User.objects.create(email='owner@claims-benchmark.example.com', first_name='Owner', is_active=True)
+        claimants = [
+            User.objects.create(email='claimant{0}@claims-benchmark.example.com'.format(i), first_name='Claimant',
+                                is_active=True)
+            for i in range(threads)
+        ]
+        wishlist = Wishlist.objects.create(owner=owner, name='Claims benchmark')
+        Gift.objects.bulk_create([Gift(wishlist=wishlist, name='Gift {0}'.format(i)) for i in range(gifts)])
+        gift_ids = list(wishlist.gifts.values_list('pk', flat=True))
+
+        self.lock = threading.Lock()
+        self.retries = 0
+        outcomes = Counter()
+        double_claims = 0
+        elapsed = 0
+        try:
+            for round_no in range(rounds):
+                barrier = threading.Barrier(threads)
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=threads) as executor:
+                    results = list(executor.map(
+                        lambda args: self.race(claim, barrier, *args),
+                        [(user, random.Random(round_no * threads + i).sample(gift_ids, len(gift_ids)))
+                         for i, user in enumerate(claimants)],
+                    ))
+                elapsed += time.perf_counter() - start
+
+                winners = Counter()
+                for user_outcomes in results:
+                    outcomes.update(result for pk, result in user_outcomes)
+                    winners.update(pk for pk, result in user_outcomes if result == Gift.CLAIM_OK)
+                double_claims += sum(1 for wins in winners.values() if wins > 1)
+                wishlist.gifts.update(claimed_by=None, claimed_at=None)
+        finally:
+            User.objects.filter(pk__in=[owner.pk] + [user.pk for user in claimants]).delete()
+
+        attempts = sum(outcomes.values())
+        return {
+            'attempts': attempts,
+            'wins': outcomes[Gift.CLAIM_OK],
+            'conflicts': outcomes[Gift.CLAIM_CONFLICT],
+            'double_claims': double_claims,
+            'retries': self.retries,
+            'seconds': elapsed,
+            'claims_per_second': attempts / elapsed if elapsed else 0,
+        }
+
+    def race(self, claim, barrier, user, gift_ids):
+        outcomes = []
+        try:
+            barrier.wait()
+            for pk in gift_ids:
+                while True:
+                    try:
+                        outcomes.append((pk, claim(pk, user)))
+                        break
+                    except OperationalError:
+                        # An in-memory test database locks whole tables instead of waiting for busy_timeout.
+                        # Retrying is safe, since a claim the user already won comes back as CLAIM_OK.
+                        with self.lock:
+                            self.retries += 1
+                        time.sleep(0.001)
+            return outcomes
+        finally:
+            connections.close_all()
@@ -0,0 +1,111 @@
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection, transaction
+
+from accounts.models import User
+from main.models import Wishlist, Gift
+
+BASELINE_PRAGMAS = {'journal_mode': 'delete', 'synchronous': 'full'}
+
+
+def worker(args):
+    """
+    One worker process serving simulated requests for `seconds`. Returns request latencies in ms and
+    the number of requests that failed.
+    """
+    seconds, write_ratio, wishlist_id, seed = args
+    rng = random.Random(seed)
+    timings, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        # What request_started and request_finished do around every real request
+        close_old_connections()
+        start = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                Gift.objects.create(wishlist_id=wishlist_id, name='Benchmark gift', priority=rng.randint(1, 3))
+            else:
+                wishlist = Wishlist.objects.for_detail().get(pk=wishlist_id)
+                list(wishlist.gifts.for_listing()[:50])
+        except OperationalError:
+            errors += 1
+        else:
+            timings.append((time.perf_counter() - start) * 1000)
+        close_old_connections()
+    connection.close()
+    return timings, errors
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares SQLite configurations under concurrent worker processes, like gunicorn workers sharing '
+        'one database file: the default rollback journal with and without persistent connections, '
+        'against the tuned settings. Each configuration runs against its own scratch database file.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Worker processes')
+        parser.add_argument('--seconds', type=float, default=5, help='Run time per configuration')
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Fraction of requests that write')
+        parser.add_argument('--gifts', type=int, default=200, help='Gifts to seed in the wishlist')
+
+    def handle(self, *args, **options):
+        tuned = settings.DATABASES['default'].get('OPTIONS', {}).get('pragmas', {})
+        configurations = [
+            ('rollback journal, reconnect', BASELINE_PRAGMAS, 0),
+            ('rollback journal, persistent', BASELINE_PRAGMAS, 600),
+            ('tuned, persistent', tuned, 600),
+        ]
+        self.stdout.write('{0:<30} {1:>10} {2:>9} {3:>9} {4:>8}'.format(
+            'configuration', 'requests/s', 'p50 ms', 'p95 ms', 'errors'))
+        tmp_dir = tempfile.mkdtemp()
+        original = connection.settings_dict.copy()
+        try:
+            for i, (name, pragmas, conn_max_age) in enumerate(configurations):
+                connection.close()
+                connection.settings_dict.update({
+                    'ENGINE': 'gifttracker.db.sqlite3',
+                    'NAME': os.path.join(tmp_dir, 'benchmark{0}.sqlite3'.format(i)),
+                    'OPTIONS': {'pragmas': pragmas},
+                    'CONN_MAX_AGE': conn_max_age,
+                })
+                self.report(name, self.run(options))
+        finally:
+            connection.close()
+            connection.settings_dict.clear()
+            connection.settings_dict.update(original)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def run(self, options):
+        call_command('migrate', verbosity=0)
+        with transaction.atomic():
+            owner = User.objects.create(email='database-benchmark@example.com', first_name='Benchmark', last_name='User')
+            wishlist = Wishlist.objects.create(owner=owner, name='Database benchmark')
+            Gift.objects.bulk_create([
+                Gift(wishlist=wishlist, name='Gift {0}'.format(i), priority=i % 3 + 1) for i in range(options['gifts'])
+            ])
+        # Each worker opens its own connections
+        connection.close()
+
+        jobs = [(options['seconds'], options['write_ratio'], wishlist.pk, i) for i in range(options['workers'])]
+        with multiprocessing.get_context('fork').Pool(options['workers']) as pool:
+            results = pool.map(worker, jobs)
+        timings = sorted(t for worker_timings, _ in results for t in worker_timings)
+        return {
+            'requests_per_second': len(timings) / options['seconds'],
+            'p50_ms': timings[len(timings) // 2] if timings else 0,
+            'p95_ms': timings[int(len(timings) * 0.95)] if timings else 0,
+            'errors': sum(errors for _, errors in results),
+        }
+
+    def report(self, name, result):
+        self.stdout.write('{0:<30} {1:>10.1f} {2:>9.2f} {3:>9.2f} {4:>8}'.format(
+            name, result['requests_per_second'], result['p50_ms'], result['p95_ms'], result['errors']))
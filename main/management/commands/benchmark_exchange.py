@@ -0,0 +1,122 @@
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from accounts.models import User
+from main.assignment import Draw
+from main.models import Exchange, Participant, Assignment
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a throwaway SQLite database with a large gift exchange, with teams, partners and last '
+        "year's draw, and times drawing it: the assignment engine on its own with extra random exclusions "
+        'per participant, and Exchange.draw() end to end, including saving the draw with bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--participants', type=int, default=10000)
+        parser.add_argument('--team-size', type=int, default=100, help='Nobody is drawn someone on their team')
+        parser.add_argument('--exclusions', type=int, default=500,
+                            help='Extra random receivers excluded per participant, for the engine timings')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed draws of each kind')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        tmp_dir = tempfile.mkdtemp()
+        # A file rather than the usual in-memory test database, to include writing the draw to disk
+        connection.settings_dict.update({
+            'ENGINE': 'gifttracker.db.sqlite3',
+            'OPTIONS': {'pragmas': {'journal_mode': 'wal', 'synchronous': 'normal'}},
+            'TEST': {'NAME': os.path.join(tmp_dir, 'benchmark.sqlite3')},
+        })
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = self.run(options['participants'], options['team_size'], options['exclusions'],
+                               options['repeat'], options['seed'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self.stdout.write('{0} participants, teams of {1}, {2} exclusions per participant on average'.format(
+            options['participants'], options['team_size'], round(results['exclusions_per_participant'])))
+        self.stdout.write('{0:<10} {1:>9} {2:>9} {3:>10}'.format('draw', 'best ms', 'worst ms', 'repaired'))
+        for name in ('engine', 'exchange'):
+            result = results[name]
+            self.stdout.write('{0:<10} {1:>9.1f} {2:>9.1f} {3:>10}'.format(
+                name, result['best_ms'], result['worst_ms'], result['repaired']))
+
+    def run(self, participants, team_size, exclusions, repeat, seed=0):
+        """
+        Seeds an exchange of `participants` and times `repeat` draws of each kind. Returns a dict of results.
+        """
+        rng = random.Random(seed)
+        last_year, exchange = self.seed(participants, team_size, rng)
+        people, excluded, teams = exchange.exclusions()
+        # Everything the database rules out, plus random exclusions standing in for a denser set of rules
+        for giver in people:
+            excluded[giver].update(rng.sample(people, min(exclusions, len(people))))
+        team_sizes = {}
+        for team in teams.values():
+            team_sizes[team] = team_sizes.get(team, 0) + 1
+        per_participant = sum(len(banned) + team_sizes[teams[giver]] for giver, banned in excluded.items())
+
+        engine = []
+        repaired = 0
+        for i in range(repeat):
+            start = time.perf_counter()
+            draw = Draw(people, excluded, teams, random.Random(seed + i))
+            draw.run()
+            engine.append((time.perf_counter() - start) * 1000)
+            repaired += draw.repaired
+
+        drawn = []
+        for i in range(repeat):
+            start = time.perf_counter()
+            exchange.draw(seed + i)
+            drawn.append((time.perf_counter() - start) * 1000)
+        assert Assignment.objects.filter(exchange=exchange).count() == participants
+
+        return {
+            'exclusions_per_participant': per_participant / len(people),
+            'engine': {'best_ms': min(engine), 'worst_ms': max(engine), 'repaired': repaired},
+            'exchange': {'best_ms': min(drawn), 'worst_ms': max(drawn), 'repaired': '-'},
+        }
+
+    def seed(self, count, team_size, rng, batch_size=5000):
+        """
+        Last year's exchange, already drawn, and this year's, with the same people in teams and in couples
+        """
+        with transaction.atomic():
+            for start in range(0, count, batch_size):
+                User.objects.bulk_create([
+                    User(email='participant{0}@exchange-benchmark.example.com'.format(i), first_name='Participant')
+                    for i in range(start, min(start + batch_size, count))
+                ])
+            users = list(User.objects.filter(email__endswith='@exchange-benchmark.example.com')
+                         .order_by('pk').values_list('pk', flat=True))
+            partners = {}
+            shuffled = rng.sample(users, len(users))
+            for a, b in zip(shuffled[::2], shuffled[1::2]):
+                partners[a], partners[b] = b, a
+
+            exchanges = []
+            for name in ('Last year', 'This year'):
+                exchange = Exchange.objects.create(name=name, organiser_id=users[0],
+                                                   previous=exchanges[-1] if exchanges else None)
+                Participant.objects.bulk_create([
+                    Participant(exchange=exchange, user_id=user_id, team='Team {0}'.format(i // team_size),
+                                partner_id=partners.get(user_id))
+                    for i, user_id in enumerate(users)
+                ])
+                exchanges.append(exchange)
+        exchanges[0].draw(rng.randrange(2 ** 32))
+        return exchanges
@@ -0,0 +1,83 @@
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from accounts.models import User
+from main.models import Wishlist, Gift
+from main.pagination import KeysetPaginator, encode_cursor
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a throwaway SQLite database with a wishlist of many gifts and compares keyset against OFFSET '
+        'pagination latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gifts', type=int, default=1000000, help='Number of gifts to seed')
+        parser.add_argument('--per-page', type=int, default=50)
+        parser.add_argument('--pages', type=int, nargs='+', default=[1, 500], help='Page numbers to time')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per page')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        tmp_dir = tempfile.mkdtemp()
+        # A file rather than the usual in-memory test database, to include reading pages from disk
+        connection.settings_dict.update({
+            'ENGINE': 'gifttracker.db.sqlite3',
+            'OPTIONS': {'pragmas': {'journal_mode': 'wal', 'synchronous': 'normal'}},
+            'TEST': {'NAME': os.path.join(tmp_dir, 'benchmark.sqlite3')},
+        })
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.run(self.seed(options['gifts']), options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def seed(self, count, batch_size=10000):
+        owner = User.objects.create(email='pagination-benchmark@example.com', first_name='Benchmark', last_name='User')
+        wishlist = Wishlist.objects.create(owner=owner, name='Pagination benchmark')
+        for start in range(0, count, batch_size):
+            with transaction.atomic():
+                Gift.objects.bulk_create([
+                    Gift(wishlist=wishlist, name='Gift {0}'.format(i), priority=i % 3 + 1)
+                    for i in range(start, min(start + batch_size, count))
+                ])
+            self.stdout.write('\rSeeded {0}/{1} gifts'.format(min(start + batch_size, count), count), ending='')
+        self.stdout.write('')
+        return wishlist
+
+    def time(self, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def run(self, wishlist, options):
+        ordering = ('priority', 'id')
+        per_page = options['per_page']
+        queryset = wishlist.gifts.for_listing()
+        paginator = KeysetPaginator(queryset, ordering, per_page)
+
+        self.stdout.write('{0:>6} {1:>12} {2:>12}'.format('page', 'keyset ms', 'offset ms'))
+        for page in options['pages']:
+            offset = (page - 1) * per_page
+            cursor = None
+            if offset:
+                # The cursor a client would hold after reading the previous page
+                last = queryset.order_by(*ordering).values_list(*ordering)[offset - 1]
+                cursor = encode_cursor(list(last))
+
+            keyset_ms = self.time(lambda: paginator.page(cursor), options['repeat'])
+            offset_ms = self.time(lambda: list(queryset.order_by(*ordering)[offset:offset + per_page]), options['repeat'])
+            self.stdout.write('{0:>6} {1:>12.2f} {2:>12.2f}'.format(page, keyset_ms, offset_ms))
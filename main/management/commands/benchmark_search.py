@@ -0,0 +1,125 @@
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from accounts.models import User
+from main.models import Wishlist, Gift
+from main.search import ScanSearchBackend, get_backend, terms
+
+STORES = ['Amazon', 'Target', 'Walmart', 'Etsy', 'IKEA', 'Best Buy', 'Costco', 'Kmart', 'JB Hi-Fi', 'Myer']
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'be', 'da', 'fo', 'gu', 'ha', 'ji', 'pe', 'zo']
+
+
+def vocabulary(rng, size):
+    """
+    `size` distinct made up words of two to four syllables
+    """
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[max(0, int(round(p / 100 * len(values) + 0.5)) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a throwaway SQLite database with gifts and compares search latency through the full text index '
+        '(whole words, and typeahead prefixes) with an icontains scan of the gift table.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gifts', type=int, default=1000000, help='Gifts to seed')
+        parser.add_argument('--queries', type=int, default=200, help='Timed searches per kind')
+        parser.add_argument('--scan-queries', type=int, default=10, help='Timed icontains scans')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the data and the queries')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        tmp_dir = tempfile.mkdtemp()
+        # A file rather than the usual in-memory test database, to include reading the index from disk
+        connection.settings_dict.update({
+            'ENGINE': 'gifttracker.db.sqlite3',
+            'OPTIONS': {'pragmas': {'journal_mode': 'wal', 'synchronous': 'normal'}},
+            'TEST': {'NAME': os.path.join(tmp_dir, 'benchmark.sqlite3')},
+        })
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = self.run(options['gifts'], options['queries'], options['scan_queries'], options['seed'])
+            size = sum(os.path.getsize(os.path.join(tmp_dir, f)) for f in os.listdir(tmp_dir))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self.stdout.write('Seeded {0} gifts in {1:.1f}s, database {2:.1f} MB'.format(
+            options['gifts'], results.pop('seed_seconds'), size / 1024 / 1024))
+        self.stdout.write('{0:<10} {1:>8} {2:>9} {3:>9} {4:>12}'.format('search', 'queries', 'p50 ms', 'p95 ms', 'avg results'))
+        for name, result in results.items():
+            self.stdout.write('{0:<10} {1:>8} {2:>9.2f} {3:>9.2f} {4:>12.1f}'.format(
+                name, result['queries'], result['p50_ms'], result['p95_ms'], result['results']))
+
+    def run(self, gifts, queries, scan_queries, seed=0):
+        """
+        Seeds `gifts` gifts and times each kind of search. Returns a dict of results per kind.
+        """
+        rng = random.Random(seed)
+        words = vocabulary(rng, 5000)
+        seed_seconds = self.seed(gifts, words, rng)
+
+        backend = get_backend()
+        # The owner can see every list, so the searches cover the whole table
+        wishlists = Wishlist.objects.visible_to(User.objects.get(email='owner@search-benchmark.example.com'))
+        # A whole word with a store, and the first few letters of a word as typed so far
+        word_queries = ['{0} {1}'.format(rng.choice(words), rng.choice(STORES)) for _ in range(queries)]
+        prefix_queries = [rng.choice(words)[:rng.randint(3, 5)] for _ in range(queries)]
+        scans = word_queries[:scan_queries]
+        return {
+            'seed_seconds': seed_seconds,
+            'words': self.time(backend, word_queries, wishlists, prefix=False),
+            'prefix': self.time(backend, prefix_queries, wishlists, prefix=True),
+            'icontains': self.time(ScanSearchBackend(backend.connection), scans, wishlists, prefix=False),
+        }
+
+    def seed(self, count, words, rng, batch_size=10000):
+        start = time.perf_counter()
+        owner = User.objects.create(email='owner@search-benchmark.example.com', first_name='Owner')
+        wishlists = [Wishlist.objects.create(owner=owner, name='List {0}'.format(i)) for i in range(100)]
+        for batch_start in range(0, count, batch_size):
+            with transaction.atomic():
+                Gift.objects.bulk_create([
+                    Gift(
+                        wishlist=rng.choice(wishlists),
+                        name=' '.join(rng.choice(words) for _ in range(rng.randint(2, 4))).capitalize(),
+                        store=rng.choice(STORES),
+                        notes=' '.join(rng.choice(words) for _ in range(rng.randint(0, 8))),
+                    )
+                    for _ in range(min(batch_size, count - batch_start))
+                ])
+            self.stdout.write('\rSeeded {0}/{1} gifts'.format(min(batch_start + batch_size, count), count), ending='')
+        self.stdout.write('')
+        return time.perf_counter() - start
+
+    def time(self, backend, queries, wishlists, prefix, limit=20):
+        timings, results = [], []
+        for query in queries:
+            start = time.perf_counter()
+            ids = backend.ranked_ids(terms(query), prefix, limit, wishlists)
+            timings.append((time.perf_counter() - start) * 1000)
+            results.append(len(ids))
+        return {
+            'queries': len(queries),
+            'p50_ms': statistics.median(timings),
+            'p95_ms': percentile(timings, 95),
+            'results': statistics.mean(results),
+        }
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from main.models import Gift
+from main.search import get_backend
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the gift search index from the gift table, a batch of gifts per transaction, for after '
+        'restoring a backup or recreating the triggers. On SQLite the index is emptied first, so searches '
+        'miss gifts not yet reindexed until it finishes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Gifts indexed per transaction')
+        parser.add_argument('--sleep', type=float, default=0, help='Seconds to pause between batches')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database to reindex')
+
+    def handle(self, *args, **options):
+        backend = get_backend(options['database'])
+        gifts = Gift.objects.using(options['database'])
+        with transaction.atomic(using=options['database']):
+            backend.clear()
+
+        done = 0
+        last_pk = 0
+        while True:
+            pks = list(gifts.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:options['batch_size']])
+            if not pks:
+                break
+            last_pk = pks[-1]
+            with transaction.atomic(using=options['database']):
+                backend.index_range(pks[0], pks[-1])
+            done += len(pks)
+            self.stdout.write('\rIndexed {0} gifts'.format(done), ending='')
+            self.stdout.flush()
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        if done:
+            self.stdout.write('')
+        backend.optimize()
+        self.stdout.write(self.style.SUCCESS('Indexed {0} gifts'.format(done)))
@@ -0,0 +1,39 @@
+import base64
+import hashlib
+import os
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from gifttracker.assets import ASSETS
+
+
+class Command(BaseCommand):
+    help = (
+        'Downloads the front end assets listed in gifttracker/assets.py into gifttracker/static, checking each '
+        'against its integrity hash. Commit the files so the site works without reaching a CDN.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Download assets that are already vendored')
+
+    def handle(self, *args, **options):
+        static_dir = os.path.join(settings.BASE_DIR, 'gifttracker', 'static')
+        for name, asset in ASSETS.items():
+            path = os.path.join(static_dir, *asset.path.split('/'))
+            if os.path.exists(path) and not options['force']:
+                self.stdout.write('{0} already vendored'.format(name))
+                continue
+
+            with urlopen(asset.cdn_url, timeout=30) as response:
+                content = response.read()
+            algorithm, expected = asset.integrity.split('-', 1)
+            actual = base64.b64encode(hashlib.new(algorithm, content).digest()).decode()
+            if actual != expected:
+                raise CommandError('{0} from {1} does not match its integrity hash'.format(name, asset.cdn_url))
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(content)
+            self.stdout.write(self.style.SUCCESS('Vendored {0} to {1}'.format(name, path)))
@@ -0,0 +1,128 @@
+from django.db import models, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+
+class WishlistQuerySet(models.QuerySet):
+    def for_index(self):
+        """
+        Lists with their owners and gift counts, in a single query
+        """
+        return self.select_related('owner').annotate(gift_count=Count('gifts'))
+
+    def visible_to(self, user):
+        """
+        Lists `user` owns or that have been shared with them
+        """
+        shared = self.model.shared_with.through.objects.filter(user=user.pk).values('wishlist_id')
+        return self.filter(Q(owner=user.pk) | Q(pk__in=shared))
+
+    def for_detail(self):
+        return self.select_related('owner')
+
+    def bump_version(self):
+        """
+        Marks the lists changed, so cached copies of their share pages are revalidated
+        """
+        return self.update(version=F('version') + 1, updated=timezone.now())
+
+
+class GiftQuerySet(models.QuerySet):
+    """
+    bulk_create(), update() and delete() bump the versions of the wishlists they change, as Gift.save()
+    and delete() do, except for updates to claims alone
+    """
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objs = super(GiftQuerySet, self).bulk_create(objs, *args, **kwargs)
+            self._bump_versions({obj.wishlist_id for obj in objs})
+        return objs
+
+    def update(self, **kwargs):
+        if set(kwargs) <= self.model.CLAIM_FIELDS:
+            return super(GiftQuerySet, self).update(**kwargs)
+        with transaction.atomic(using=self.db):
+            wishlist_ids = set(self.values_list('wishlist_id', flat=True))
+            rows = super(GiftQuerySet, self).update(**kwargs)
+            # Gifts moved to another list change that one too
+            if 'wishlist' in kwargs or 'wishlist_id' in kwargs:
+                wishlist = kwargs.get('wishlist', kwargs.get('wishlist_id'))
+                wishlist_ids.add(getattr(wishlist, 'pk', wishlist))
+            self._bump_versions(wishlist_ids)
+        return rows
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            wishlist_ids = set(self.values_list('wishlist_id', flat=True))
+            result = super(GiftQuerySet, self).delete()
+            self._bump_versions(wishlist_ids)
+        return result
+
+    def _bump_versions(self, wishlist_ids):
+        if wishlist_ids:
+            self._wishlists().filter(pk__in=wishlist_ids).bump_version()
+
+    def _wishlists(self):
+        return self.model._meta.get_field('wishlist').related_model._default_manager.using(self.db)
+
+    def for_listing(self):
+        """
+        Gifts with who claimed them, so a page of gifts costs one query
+        """
+        return self.select_related('claimed_by')
+
+    def unclaimed(self):
+        return self.filter(claimed_by__isnull=True)
+
+    def claimed_by_user(self, user):
+        return self.filter(claimed_by=user).select_related('wishlist', 'wishlist__owner')
+
+    def claim(self, pk, user):
+        """
+        Claims gift `pk` for `user`. A conditional UPDATE settles races, so when several people claim it at
+        once exactly one wins, without holding a transaction open. Returns Gift.CLAIM_OK (also when the user
+        already had it), CLAIM_CONFLICT when someone else has it, or CLAIM_NOT_FOUND for a missing gift or
+        one on the user's own list.
+        """
+        gifts = self._claimable(pk, user)
+        # Most losing claims find the gift already taken here, and skip the write that would queue them
+        # behind every other claimant
+        current = self._claimed_by(gifts)
+        if current == [None]:
+            if gifts.filter(claimed_by__isnull=True).update(claimed_by=user, claimed_at=timezone.now()):
+                return self.model.CLAIM_OK
+            # Someone else claimed it between the read and the update
+            current = self._claimed_by(gifts)
+        return self._claim_result(current, user.pk)
+
+    def unclaim(self, pk, user):
+        """
+        Releases gift `pk` if `user` has it claimed. Returns Gift.CLAIM_OK (also when it's already
+        unclaimed), CLAIM_CONFLICT when someone else has it, or CLAIM_NOT_FOUND.
+        """
+        gifts = self._claimable(pk, user)
+        if gifts.filter(claimed_by=user).update(claimed_by=None, claimed_at=None):
+            return self.model.CLAIM_OK
+        return self._claim_result(self._claimed_by(gifts), None)
+
+    def _claimable(self, pk, user):
+        """
+        Gift `pk` unless it's on `user`'s own list. Filtering on wishlist_id rather than joining keeps every
+        condition on the gift's own row, so on PostgreSQL a claim that waited on another's row lock re-checks
+        claimed_by against the committed row instead of a subquery's stale snapshot.
+        """
+        return self.filter(pk=pk).exclude(wishlist__in=self._wishlists().filter(owner=user))
+
+    @staticmethod
+    def _claimed_by(gifts):
+        """
+        [claimed_by_id] for the gift, or [] if there's no such gift
+        """
+        return list(gifts.values_list('claimed_by', flat=True)[:1])
+
+    def _claim_result(self, current, wanted):
+        if not current:
+            return self.model.CLAIM_NOT_FOUND
+        if current[0] == wanted:
+            return self.model.CLAIM_OK
+        return self.model.CLAIM_CONFLICT
@@ -0,0 +1,65 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('main', '0001_initial'),
+    ]
+
+    operations = [
+        # The initial Wishlist was an id-only placeholder with no usable rows, so rebuild it from scratch
+        migrations.DeleteModel(
+            name='Wishlist',
+        ),
+        migrations.CreateModel(
+            name='Wishlist',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('description', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wishlists', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('-created', '-id'),
+            },
+        ),
+        migrations.CreateModel(
+            name='Gift',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('notes', models.TextField(blank=True)),
+                ('store', models.CharField(blank=True, max_length=100)),
+                ('url', models.URLField(blank=True, max_length=500, verbose_name='URL')),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('priority', models.PositiveSmallIntegerField(choices=[(1, 'High'), (2, 'Medium'), (3, 'Low')], default=2)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('claimed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claimed_gifts', to=settings.AUTH_USER_MODEL)),
+                ('wishlist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gifts', to='main.Wishlist')),
+            ],
+            options={
+                'ordering': ('priority', 'id'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='wishlist',
+            index=models.Index(fields=['owner', 'created'], name='main_wishlist_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gift',
+            index=models.Index(fields=['wishlist', 'claimed_by', 'priority'], name='main_gift_unclaimed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gift',
+            index=models.Index(fields=['claimed_by', 'claimed_at'], name='main_gift_claimed_by_idx'),
+        ),
+    ]
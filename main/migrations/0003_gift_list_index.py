@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_wishlist_gift'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gift',
+            index=models.Index(fields=['wishlist', 'priority', 'id'], name='main_gift_list_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+from django.db import migrations
+
+# An external content FTS5 table over main_gift, weighting matches in the name above the store and the
+# store above the notes. The triggers only fire for the indexed columns, so claiming a gift doesn't touch it.
+# Note that on SQLite, a later migration that rebuilds main_gift drops these triggers; it must recreate
+# them and run `manage.py reindex_gift_search`. MainGiftSearchTests.test_index_triggers_exist checks for them.
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE main_gift_fts USING fts5(name, notes, store, content='main_gift', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "INSERT INTO main_gift_fts(main_gift_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 5.0)')",
+    """CREATE TRIGGER main_gift_fts_insert AFTER INSERT ON main_gift BEGIN
+        INSERT INTO main_gift_fts(rowid, name, notes, store) VALUES (new.id, new.name, new.notes, new.store);
+    END""",
+    """CREATE TRIGGER main_gift_fts_delete AFTER DELETE ON main_gift BEGIN
+        INSERT INTO main_gift_fts(main_gift_fts, rowid, name, notes, store)
+        VALUES ('delete', old.id, old.name, old.notes, old.store);
+    END""",
+    """CREATE TRIGGER main_gift_fts_update AFTER UPDATE OF name, notes, store ON main_gift BEGIN
+        INSERT INTO main_gift_fts(main_gift_fts, rowid, name, notes, store)
+        VALUES ('delete', old.id, old.name, old.notes, old.store);
+        INSERT INTO main_gift_fts(rowid, name, notes, store) VALUES (new.id, new.name, new.notes, new.store);
+    END""",
+    "INSERT INTO main_gift_fts(main_gift_fts) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    'DROP TRIGGER main_gift_fts_insert',
+    'DROP TRIGGER main_gift_fts_delete',
+    'DROP TRIGGER main_gift_fts_update',
+    'DROP TABLE main_gift_fts',
+]
+
+# A tsvector column kept up to date by a trigger, with a GIN index. It isn't a model field, so the
+# model stays the same on every database.
+POSTGRESQL_FORWARD = [
+    'ALTER TABLE main_gift ADD COLUMN search_vector tsvector',
+    """CREATE FUNCTION main_gift_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.store, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(NEW.notes, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql""",
+    'CREATE TRIGGER main_gift_search_vector BEFORE INSERT OR UPDATE OF name, notes, store ON main_gift '
+    'FOR EACH ROW EXECUTE PROCEDURE main_gift_search_vector()',
+    'UPDATE main_gift SET name = name',
+    'CREATE INDEX main_gift_search_idx ON main_gift USING GIN (search_vector)',
+]
+POSTGRESQL_REVERSE = [
+    'DROP TRIGGER main_gift_search_vector ON main_gift',
+    'DROP FUNCTION main_gift_search_vector()',
+    'ALTER TABLE main_gift DROP COLUMN search_vector',
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql, params=None)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_gift_list_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRESQL_REVERSE}),
+        ),
+    ]
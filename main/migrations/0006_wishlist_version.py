@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 21:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_exchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wishlist',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
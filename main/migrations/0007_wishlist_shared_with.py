@@ -0,0 +1,20 @@
+# Generated by Django 2.2.28 on 2026-10-18 21:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('main', '0006_wishlist_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wishlist',
+            name='shared_with',
+            field=models.ManyToManyField(blank=True, related_name='shared_wishlists', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 21:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_wishlist_shared_with'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wishlist',
+            name='share_key',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
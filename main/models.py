@@ -1,3 +1,198 @@
-from django.db import models
+import random
 
-# Create your models here.
+from django.db import models, transaction
+from django.conf import settings
+from django.utils import timezone
+
+from .assignment import assign
+from .managers import WishlistQuerySet, GiftQuerySet
+
+
+class Wishlist(models.Model):
+    """
+    A named list of gifts a user would like to receive
+    """
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='wishlists')
+    name = models.CharField(max_length=100)
+    description = models.TextField(blank=True)
+    # Friends who can see the list and claim its gifts
+    shared_with = models.ManyToManyField(settings.AUTH_USER_MODEL, blank=True, related_name='shared_wishlists')
+    # Incremented whenever the list or its gifts change, for the share page's ETag
+    version = models.PositiveIntegerField(default=1, editable=False)
+    # Signed into share links, and incremented to revoke them all
+    share_key = models.PositiveIntegerField(default=0, editable=False)
+
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = WishlistQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('-created', '-id')
+        indexes = [
+            # All lists for a user
+            models.Index(fields=['owner', 'created'], name='main_wishlist_owner_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        if self.pk is None:
+            super(Wishlist, self).save(*args, **kwargs)
+            return
+        # Incremented in the database, so a concurrent change to a gift isn't lost
+        self.version = models.F('version') + 1
+        super(Wishlist, self).save(*args, **kwargs)
+        self.refresh_from_db(fields=['version'])
+
+
+class Gift(models.Model):
+    """
+    An item on a wishlist, which other users can claim so it isn't bought twice
+    """
+    PRIORITY_HIGH = 1
+    PRIORITY_MEDIUM = 2
+    PRIORITY_LOW = 3
+    PRIORITY_CHOICES = (
+        (PRIORITY_HIGH, 'High'),
+        (PRIORITY_MEDIUM, 'Medium'),
+        (PRIORITY_LOW, 'Low'),
+    )
+
+    # Results of GiftQuerySet.claim() and unclaim()
+    CLAIM_OK = 'ok'
+    CLAIM_CONFLICT = 'conflict'
+    CLAIM_NOT_FOUND = 'not_found'
+    # Claims aren't shown on the share page, so changing only these leaves the wishlist's version alone
+    CLAIM_FIELDS = frozenset(['claimed_by', 'claimed_at'])
+
+    wishlist = models.ForeignKey(Wishlist, on_delete=models.CASCADE, related_name='gifts')
+    name = models.CharField(max_length=200)
+    notes = models.TextField(blank=True)
+    store = models.CharField(max_length=100, blank=True)
+    url = models.URLField(verbose_name='URL', max_length=500, blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    priority = models.PositiveSmallIntegerField(choices=PRIORITY_CHOICES, default=PRIORITY_MEDIUM)
+
+    claimed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
+                                   null=True, blank=True, related_name='claimed_gifts')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    created = models.DateTimeField(auto_now_add=True)
+
+    objects = GiftQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('priority', 'id')
+        indexes = [
+            # Paging through a list's gifts by (priority, id)
+            models.Index(fields=['wishlist', 'priority', 'id'], name='main_gift_list_idx'),
+            # Unclaimed items in a list, ordered by priority
+            models.Index(fields=['wishlist', 'claimed_by', 'priority'], name='main_gift_unclaimed_idx'),
+            # Items claimed by a user
+            models.Index(fields=['claimed_by', 'claimed_at'], name='main_gift_claimed_by_idx'),
+        ]
+
+    @property
+    def is_claimed(self):
+        return self.claimed_by_id is not None
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        super(Gift, self).save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or not set(update_fields) <= self.CLAIM_FIELDS:
+            Wishlist.objects.filter(pk=self.wishlist_id).bump_version()
+
+    def delete(self, *args, **kwargs):
+        result = super(Gift, self).delete(*args, **kwargs)
+        Wishlist.objects.filter(pk=self.wishlist_id).bump_version()
+        return result
+
+
+class Exchange(models.Model):
+    """
+    A gift exchange, where each participant is drawn someone else to buy for
+    """
+    name = models.CharField(max_length=100)
+    organiser = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='exchanges')
+    # Last year's exchange, whose pairs aren't drawn again
+    previous = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    created = models.DateTimeField(auto_now_add=True)
+    drawn_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ('-created', '-id')
+
+    def __str__(self):
+        return self.name
+
+    def exclusions(self):
+        """
+        Maps each participating user's id to the ids they mustn't give to: their partner (either way round)
+        and whoever they gave to in the previous exchange. Returns (participant ids, exclusions, teams).
+        """
+        participants = list(self.participants.values_list('user_id', 'team', 'partner_id'))
+        excluded = {user_id: set() for user_id, team, partner_id in participants}
+        for user_id, team, partner_id in participants:
+            if partner_id in excluded:
+                excluded[user_id].add(partner_id)
+                excluded[partner_id].add(user_id)
+        if self.previous_id is not None:
+            for giver_id, receiver_id in Assignment.objects.filter(exchange_id=self.previous_id).values_list(
+                    'giver_id', 'receiver_id'):
+                if giver_id in excluded:
+                    excluded[giver_id].add(receiver_id)
+        teams = {user_id: team for user_id, team, partner_id in participants}
+        return [user_id for user_id, team, partner_id in participants], excluded, teams
+
+    def draw(self, seed=None):
+        """
+        Draws who gives to whom, replacing any earlier draw. Raises assignment.NoValidAssignment, naming
+        the participants who can't all be placed, when the exclusions leave no valid draw.
+        """
+        participants, excluded, teams = self.exclusions()
+        pairs = assign(participants, excluded, teams, random.Random(seed))
+        with transaction.atomic():
+            self.assignments.all().delete()
+            Assignment.objects.bulk_create(
+                Assignment(exchange=self, giver_id=giver, receiver_id=receiver) for giver, receiver in pairs.items()
+            )
+            self.drawn_at = timezone.now()
+            self.save(update_fields=['drawn_at'])
+        return pairs
+
+
+class Participant(models.Model):
+    exchange = models.ForeignKey(Exchange, on_delete=models.CASCADE, related_name='participants')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    # Nobody is drawn someone on their own team
+    team = models.CharField(max_length=100, blank=True)
+    # Partners aren't drawn each other
+    partner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='+')
+
+    class Meta:
+        unique_together = (('exchange', 'user'),)
+
+    def __str__(self):
+        return str(self.user)
+
+
+class Assignment(models.Model):
+    """
+    One giver's draw in an exchange
+    """
+    exchange = models.ForeignKey(Exchange, on_delete=models.CASCADE, related_name='assignments')
+    giver = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    receiver = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        unique_together = (('exchange', 'giver'), ('exchange', 'receiver'))
+
+    def __str__(self):
+        return '{0} -> {1}'.format(self.giver_id, self.receiver_id)
@@ -0,0 +1,111 @@
+"""
+Keyset (a.k.a. cursor or seek) pagination.
+
+Rather than OFFSET, each page continues from the ordering values of the last row on the previous page,
+so fetching page 500 costs the same as page 1 provided the ordering is backed by an index.
+A page costs at most one query per ordering field.
+Cursors are opaque to clients: base64-encoded JSON of the ordering values.
+"""
+import base64
+import datetime
+import decimal
+import json
+
+from django.core.exceptions import ValidationError
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value):
+    # Keep full precision; DjangoJSONEncoder truncates datetimes to milliseconds, which would skip rows
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError('Cannot use {0!r} in a cursor'.format(value))
+
+
+def encode_cursor(values):
+    data = json.dumps(values, default=_encode_value, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor, length):
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(data.decode())
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor('Invalid cursor')
+    return values
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginates `queryset` by `ordering`, a tuple of field names (prefixed with '-' for descending).
+    The ordering must be unique, so end it with the primary key.
+    """
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset.order_by(*ordering)
+        self.ordering = ordering
+        self.per_page = per_page
+
+    def _after(self, values):
+        """
+        Yields querysets that together select the rows after `values`, in order.
+
+        For ordering (a, b) that is `a = x AND b > y`, then `a > x` (with < for descending fields).
+        Each part is a plain index seek, where a single `a > x OR (a = x AND b > y)` filter makes
+        some databases (notably SQLite) scan every row sharing the cursor's value of `a`.
+        """
+        names = [f.lstrip('-') for f in self.ordering]
+        for i in reversed(range(len(self.ordering))):
+            lookup = '{0}__{1}'.format(names[i], 'lt' if self.ordering[i].startswith('-') else 'gt')
+            filters = dict(zip(names[:i], values[:i]))
+            filters[lookup] = values[i]
+            yield self.queryset.filter(**filters)
+
+    def page(self, cursor=None):
+        """
+        Returns the page following `cursor`, or the first page if no cursor is given
+        """
+        # Fetch one extra row to find out whether there's another page
+        limit = self.per_page + 1
+        if cursor:
+            values = decode_cursor(cursor, len(self.ordering))
+            object_list = []
+            try:
+                for queryset in self._after(values):
+                    object_list.extend(queryset[:limit - len(object_list)])
+                    if len(object_list) >= limit:
+                        break
+            except (ValidationError, ValueError, TypeError):
+                raise InvalidCursor('Invalid cursor')
+        else:
+            object_list = list(self.queryset[:limit])
+
+        next_cursor = None
+        if len(object_list) > self.per_page:
+            object_list = object_list[:self.per_page]
+            last = object_list[-1]
+            next_cursor = encode_cursor([getattr(last, f.lstrip('-')) for f in self.ordering])
+        return KeysetPage(object_list, next_cursor)
@@ -0,0 +1,164 @@
+"""
+Full text search over gift names, stores and notes, best matches first, with the last word matched as a
+prefix for typeahead. Only gifts on the wishlists the searching user can see are matched, a condition
+applied inside the index query so that it can't crowd out visible matches. On SQLite it uses the main_gift_fts FTS5 table, and on PostgreSQL the search_vector
+column and its GIN index. Both are created by migration 0004 and kept up to date by database triggers, so
+bulk_create() and QuerySet.update() are covered as well as save(). Other databases fall back to icontains.
+"""
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import Gift, Wishlist
+
+TOKEN_RE = re.compile(r'\w+')
+# Words beyond this are ignored, to bound the cost of a query
+MAX_TERMS = 8
+# A short prefix can match a large part of the table. Typeahead ranks this many of its matches rather
+# than all of them, so its cost stays flat as the table grows; whole word searches rank every match.
+PREFIX_CANDIDATES = 2000
+
+
+def terms(query):
+    """
+    The words in a search box query, lowercased
+    """
+    return TOKEN_RE.findall(query.lower())[:MAX_TERMS]
+
+
+class SearchBackend:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def ranked_ids(self, words, prefix, limit, wishlists):
+        """
+        Primary keys of the best `limit` gifts containing all of `words` on the `wishlists` queryset, best first.
+        Without an index to rank by, this matches icontains on every column, in primary key order.
+        """
+        gifts = Gift.objects.using(self.connection.alias).filter(wishlist__in=wishlists)
+        for word in words:
+            gifts = gifts.filter(Q(name__icontains=word) | Q(notes__icontains=word) | Q(store__icontains=word))
+        return list(gifts.order_by('pk').values_list('pk', flat=True)[:limit])
+
+    def wishlist_ids(self, wishlists):
+        """
+        SQL and params selecting the primary keys of `wishlists`, for an IN condition
+        """
+        return wishlists.values('pk').query.get_compiler(connection=self.connection).as_sql()
+
+    def clear(self):
+        """
+        Empties the index, before reindex_gift_search refills it
+        """
+
+    def index_range(self, first_pk, last_pk):
+        """
+        (Re)indexes the gifts with primary keys from first_pk to last_pk
+        """
+
+    def optimize(self):
+        pass
+
+
+class SQLiteSearchBackend(SearchBackend):
+    def match(self, words, prefix):
+        phrases = ['"{0}"'.format(word) for word in words]
+        if prefix:
+            phrases[-1] += '*'
+        return ' '.join(phrases)
+
+    def ranked_ids(self, words, prefix, limit, wishlists):
+        wishlist_sql, wishlist_params = self.wishlist_ids(wishlists)
+        # rank is bm25() with the column weights set up by the migration
+        matches = (
+            'SELECT main_gift_fts.rowid, main_gift_fts.rank FROM main_gift_fts '
+            'INNER JOIN main_gift ON main_gift.id = main_gift_fts.rowid '
+            'WHERE main_gift_fts MATCH %s AND main_gift.wishlist_id IN ({0})'.format(wishlist_sql)
+        )
+        params = [self.match(words, prefix)] + list(wishlist_params)
+        with self.connection.cursor() as cursor:
+            if prefix:
+                cursor.execute(
+                    'SELECT rowid FROM ({0} LIMIT %s) ORDER BY rank LIMIT %s'.format(matches),
+                    params + [PREFIX_CANDIDATES, limit],
+                )
+            else:
+                cursor.execute('{0} ORDER BY main_gift_fts.rank LIMIT %s'.format(matches), params + [limit])
+            return [row[0] for row in cursor.fetchall()]
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("INSERT INTO main_gift_fts(main_gift_fts) VALUES ('delete-all')")
+
+    def index_range(self, first_pk, last_pk):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO main_gift_fts(rowid, name, notes, store) '
+                'SELECT id, name, notes, store FROM main_gift WHERE id BETWEEN %s AND %s',
+                [first_pk, last_pk],
+            )
+
+    def optimize(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("INSERT INTO main_gift_fts(main_gift_fts) VALUES ('optimize')")
+
+
+class PostgreSQLSearchBackend(SearchBackend):
+    def tsquery(self, words, prefix):
+        query = ' & '.join(words)
+        return query + ':*' if prefix else query
+
+    def ranked_ids(self, words, prefix, limit, wishlists):
+        wishlist_sql, wishlist_params = self.wishlist_ids(wishlists)
+        candidates = (
+            "SELECT id, search_vector FROM main_gift WHERE search_vector @@ to_tsquery('simple', %s) "
+            'AND wishlist_id IN ({0})'.format(wishlist_sql)
+        )
+        params = [self.tsquery(words, prefix)] + list(wishlist_params)
+        if prefix:
+            candidates += ' LIMIT %s'
+            params.append(PREFIX_CANDIDATES)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT id FROM ({0}) candidates ORDER BY ts_rank_cd(search_vector, to_tsquery('simple', %s)) DESC, "
+                'id LIMIT %s'.format(candidates),
+                params + [self.tsquery(words, prefix), limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def index_range(self, first_pk, last_pk):
+        with self.connection.cursor() as cursor:
+            # Setting a column fires the trigger that recomputes search_vector
+            cursor.execute('UPDATE main_gift SET name = name WHERE id BETWEEN %s AND %s', [first_pk, last_pk])
+
+
+class ScanSearchBackend(SearchBackend):
+    """
+    The default icontains on every column, for databases without a full text index. Reads the whole table.
+    """
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgreSQLSearchBackend,
+}
+
+
+def get_backend(using=None):
+    connection = connections[using or router.db_for_read(Gift)]
+    return BACKENDS.get(connection.vendor, ScanSearchBackend)(connection)
+
+
+def search_gifts(query, user, limit=20, prefix=True, using=None):
+    """
+    Gifts on the wishlists `user` can see that match every word in `query`, best match first, with their wishlists
+    """
+    words = terms(query)
+    if not words:
+        return []
+    backend = get_backend(using)
+    wishlists = Wishlist.objects.using(backend.connection.alias).visible_to(user)
+    ids = backend.ranked_ids(words, prefix, limit, wishlists)
+    gifts = Gift.objects.using(backend.connection.alias).select_related('wishlist').in_bulk(ids)
+    return [gifts[pk] for pk in ids if pk in gifts]
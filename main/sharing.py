@@ -0,0 +1,28 @@
+"""
+Signed links to a read-only view of a wishlist, for friends who don't have an account. The wishlist id and
+its share key travel in the link with a signature, so forged links are turned away without a database
+query. Resetting the wishlist's share key revokes every link made before, and links expire after
+WISHLIST_SHARE_LINK_MAX_AGE seconds.
+"""
+from django.conf import settings
+from django.core import signing
+
+SALT = 'main.sharing'
+
+
+def make_share_token(wishlist):
+    return signing.TimestampSigner(salt=SALT).sign('{0}.{1}'.format(wishlist.pk, wishlist.share_key))
+
+
+def parse_share_token(token):
+    """
+    (wishlist id, share key) from a genuine, unexpired share token, otherwise None. The key still has to
+    be checked against the wishlist's.
+    """
+    try:
+        value = signing.TimestampSigner(salt=SALT).unsign(
+            token, max_age=getattr(settings, 'WISHLIST_SHARE_LINK_MAX_AGE', None))
+        pk, key = value.split('.')
+        return int(pk), int(key)
+    except (signing.BadSignature, ValueError):
+        return None
@@ -0,0 +1,34 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from gifttracker.assets import ASSETS, asset_url, is_vendored
+
+register = template.Library()
+
+
+def _attrs(name):
+    # Cross-origin requests need CORS mode for the browser to check the integrity hash
+    if is_vendored(name):
+        return format_html(' integrity="{0}"', ASSETS[name].integrity)
+    return format_html(' integrity="{0}" crossorigin="anonymous"', ASSETS[name].integrity)
+
+
+@register.simple_tag
+def stylesheet(name):
+    return format_html('<link rel="stylesheet" href="{0}"{1}>', asset_url(name), _attrs(name))
+
+
+@register.simple_tag
+def script(name):
+    return format_html('<script src="{0}"{1}></script>', asset_url(name), _attrs(name))
+
+
+@register.simple_tag
+def preload_assets():
+    """
+    Preload hints for every asset, so the browser fetches the scripts at the end of the page in
+    parallel with the stylesheet
+    """
+    return format_html_join('\n', '<link rel="preload" href="{0}" as="{1}"{2}>', (
+        (asset_url(name), asset.kind, _attrs(name)) for name, asset in ASSETS.items()
+    ))
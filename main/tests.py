@@ -1,3 +1,555 @@
-from django.test import TestCase
+import random
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.tests.factories import UserFactory
+from .assignment import NoValidAssignment, assign
+from .models import Wishlist, Gift, Exchange, Participant
+from .pagination import KeysetPaginator, encode_cursor
+from .search import ScanSearchBackend, search_gifts
+from .sharing import make_share_token
+
+
+class MainWishlistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserFactory.create(email='owner@test.com', first_name='Jane')
+        cls.friend = UserFactory.create(email='friend@test.com')
+        cls.stranger = UserFactory.create(email='stranger@test.com')
+        cls.wishlist = Wishlist.objects.create(owner=cls.owner, name='Birthday')
+        cls.wishlist.shared_with.add(cls.friend)
+
+    def add_gifts(self, wishlist, count):
+        Gift.objects.bulk_create([
+            Gift(wishlist=wishlist, name='Gift {0}'.format(i), priority=i % 3 + 1, claimed_by=self.friend if i % 2 else None)
+            for i in range(count)
+        ])
+
+    def test_gifts_ordered_by_priority(self):
+        self.add_gifts(self.wishlist, 6)
+        priorities = list(self.wishlist.gifts.unclaimed().values_list('priority', flat=True))
+        self.assertEqual(priorities, sorted(priorities))
+        self.assertEqual(len(priorities), 3)
+
+    def test_claimed_by_user(self):
+        self.add_gifts(self.wishlist, 6)
+        self.assertEqual(Gift.objects.claimed_by_user(self.friend).count(), 3)
+
+    def test_detail_query_count_bounded(self):
+        """
+        A wishlist page costs the same number of queries however many gifts it has
+        """
+        self.client.force_login(self.friend)
+        url = reverse('main:wishlist_detail', kwargs={'pk': self.wishlist.pk})
+
+        self.add_gifts(self.wishlist, 2)
+        # The first request caches the session and user
+        self.client.get(url)
+        # Wishlist + owner, gifts + claimed_by
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertContains(response, 'Gift 1')
+
+        self.add_gifts(self.wishlist, 50)
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+    def test_index_query_count_bounded(self):
+        """
+        The wishlist index costs the same number of queries however many lists a user has
+        """
+        self.client.force_login(self.owner)
+        for i in range(10):
+            self.add_gifts(Wishlist.objects.create(owner=self.owner, name='List {0}'.format(i)), 3)
+        self.client.get(reverse('main:wishlist_list'))
+        # Wishlists with gift counts; the session and user come from the cache
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('main:wishlist_list'))
+        self.assertContains(response, 'List 9')
+
+    def test_owner_cannot_see_claims(self):
+        self.add_gifts(self.wishlist, 2)
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('main:wishlist_detail', kwargs={'pk': self.wishlist.pk}))
+        self.assertNotContains(response, 'Claimed By')
+
+    def test_only_shared_lists_visible(self):
+        url = reverse('main:wishlist_detail', kwargs={'pk': self.wishlist.pk})
+        self.client.force_login(self.stranger)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertNotContains(self.client.get(reverse('main:wishlist_list')), 'Birthday')
+        self.client.force_login(self.friend)
+        self.assertContains(self.client.get(reverse('main:wishlist_list')), 'by Jane')
+
+    def test_share_with(self):
+        url = reverse('main:wishlist_share_with', kwargs={'pk': self.wishlist.pk})
+        self.client.force_login(self.stranger)
+        self.assertEqual(self.client.post(url, {'email': 'stranger@test.com'}).status_code, 404)
+
+        self.client.force_login(self.owner)
+        self.assertContains(self.client.post(url, {'email': 'nobody@test.com'}), 'Nobody has signed up')
+        self.assertRedirects(self.client.post(url, {'email': 'Stranger@Test.com'}), url)
+        self.assertContains(self.client.get(url), 'stranger@test.com')
+        self.assertIn(self.stranger, self.wishlist.shared_with.all())
+
+        unshare = reverse('main:wishlist_unshare', kwargs={'pk': self.wishlist.pk, 'user_pk': self.stranger.pk})
+        self.assertRedirects(self.client.post(unshare), url)
+        self.assertNotIn(self.stranger, self.wishlist.shared_with.all())
+
+    def test_only_owner_can_add_gifts(self):
+        url = reverse('main:gift_create', kwargs={'pk': self.wishlist.pk})
+        self.client.force_login(self.friend)
+        self.assertEqual(self.client.post(url, {'name': 'Socks', 'priority': 1}).status_code, 404)
+        self.client.force_login(self.owner)
+        self.client.post(url, {'name': 'Socks', 'priority': 1})
+        self.assertTrue(self.wishlist.gifts.filter(name='Socks').exists())
+
+
+class MainPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserFactory.create(email='owner@test.com', first_name='Jane')
+        cls.wishlist = Wishlist.objects.create(owner=cls.owner, name='Birthday')
+        Gift.objects.bulk_create([
+            Gift(wishlist=cls.wishlist, name='Gift {0}'.format(i), priority=i % 3 + 1) for i in range(25)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+    def test_keyset_pages_cover_every_gift_once(self):
+        paginator = KeysetPaginator(self.wishlist.gifts.all(), ('priority', 'id'), 4)
+        seen = []
+        page = paginator.page()
+        seen.extend(page)
+        while page.has_next:
+            page = paginator.page(page.next_cursor)
+            seen.extend(page)
+        self.assertEqual(seen, list(self.wishlist.gifts.order_by('priority', 'id')))
+
+    def test_descending_datetime_cursor(self):
+        """
+        Rows sharing a timestamp are neither skipped nor repeated
+        """
+        Wishlist.objects.bulk_create([Wishlist(owner=self.owner, name='List {0}'.format(i)) for i in range(9)])
+        Wishlist.objects.update(created=self.wishlist.created)
+        paginator = KeysetPaginator(Wishlist.objects.all(), ('-created', '-id'), 3)
+        seen = []
+        page = paginator.page()
+        seen.extend(page)
+        while page.has_next:
+            page = paginator.page(page.next_cursor)
+            seen.extend(page)
+        self.assertEqual([w.pk for w in seen], list(Wishlist.objects.order_by('-id').values_list('pk', flat=True)))
+
+    def test_json_gift_pages(self):
+        url = reverse('main:wishlist_detail', kwargs={'pk': self.wishlist.pk})
+        data = self.client.get(url, {'format': 'json'}).json()
+        self.assertEqual(len(data['results']), 25)
+        self.assertIsNone(data['next_cursor'])
+        self.assertNotIn('claimed_by', data['results'][0])
+
+    def test_invalid_cursor(self):
+        url = reverse('main:wishlist_detail', kwargs={'pk': self.wishlist.pk})
+        self.assertEqual(self.client.get(url, {'cursor': 'garbage'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'cursor': encode_cursor(['x', 'y'])}).status_code, 400)
+
+
+class MainHomeTests(TestCase):
+    def test_home_page(self):
+        response = self.client.get(reverse('main:home'))
+        self.assertContains(response, 'Register')
+
+
+class MainGiftClaimTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserFactory.create(first_name='Jane')
+        cls.friend = UserFactory.create(first_name='John')
+        cls.other = UserFactory.create(first_name='Jim')
+        cls.stranger = UserFactory.create(first_name='Joe')
+        cls.wishlist = Wishlist.objects.create(owner=cls.owner, name='Birthday')
+        cls.wishlist.shared_with.add(cls.friend, cls.other)
+        cls.gift = Gift.objects.create(wishlist=cls.wishlist, name='Socks')
+
+    def url(self, name, gift=None):
+        return reverse(name, kwargs={'pk': self.wishlist.pk, 'gift_pk': (gift or self.gift).pk})
+
+    def test_claim_and_unclaim(self):
+        self.assertEqual(Gift.objects.claim(self.gift.pk, self.friend), Gift.CLAIM_OK)
+        # Claiming again, say from a double click, isn't a conflict
+        self.assertEqual(Gift.objects.claim(self.gift.pk, self.friend), Gift.CLAIM_OK)
+        self.assertEqual(Gift.objects.claim(self.gift.pk, self.other), Gift.CLAIM_CONFLICT)
+        self.assertEqual(Gift.objects.unclaim(self.gift.pk, self.other), Gift.CLAIM_CONFLICT)
+        self.gift.refresh_from_db()
+        self.assertEqual(self.gift.claimed_by, self.friend)
+        self.assertIsNotNone(self.gift.claimed_at)
+
+        self.assertEqual(Gift.objects.unclaim(self.gift.pk, self.friend), Gift.CLAIM_OK)
+        self.assertEqual(Gift.objects.unclaim(self.gift.pk, self.friend), Gift.CLAIM_OK)
+        self.gift.refresh_from_db()
+        self.assertIsNone(self.gift.claimed_by)
+        self.assertIsNone(self.gift.claimed_at)
+
+    def test_claim_updates_gift_row_directly(self):
+        """
+        The conditional UPDATE mustn't join, or PostgreSQL checks claimed_by in a subquery's snapshot and a
+        claim that waited on the winner's row lock overwrites it
+        """
+        for claim in (Gift.objects.claim, Gift.objects.unclaim):
+            with CaptureQueriesContext(connection) as queries:
+                claim(self.gift.pk, self.friend)
+            updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+            self.assertEqual(len(updates), 1)
+            self.assertIn('"main_gift"."claimed_by_id"', updates[0].split('WHERE', 1)[1])
+            self.assertNotIn('JOIN', updates[0])
+            self.assertNotIn('"main_gift"."id" IN (SELECT', updates[0])
+
+    def test_cannot_claim_own_or_missing_gift(self):
+        self.assertEqual(Gift.objects.claim(self.gift.pk, self.owner), Gift.CLAIM_NOT_FOUND)
+        self.assertEqual(Gift.objects.claim(0, self.friend), Gift.CLAIM_NOT_FOUND)
+        self.assertFalse(Gift.objects.filter(claimed_by__isnull=False).exists())
+
+    def test_claim_views(self):
+        self.client.force_login(self.friend)
+        detail = reverse('main:wishlist_detail', kwargs={'pk': self.wishlist.pk})
+        self.assertContains(self.client.get(detail), self.url('main:gift_claim'))
+        self.assertRedirects(self.client.post(self.url('main:gift_claim')), detail)
+        self.assertContains(self.client.get(detail), self.url('main:gift_unclaim'))
+
+        self.client.force_login(self.other)
+        response = self.client.post(self.url('main:gift_claim') + '?format=json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {'result': Gift.CLAIM_CONFLICT, 'claimed': False})
+        self.assertContains(self.client.post(self.url('main:gift_claim')), 'Already Claimed', status_code=409)
+
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.post(self.url('main:gift_claim')).status_code, 404)
+        # Nor can someone the list isn't shared with
+        self.client.force_login(self.stranger)
+        self.assertEqual(self.client.post(self.url('main:gift_unclaim')).status_code, 404)
+        self.assertEqual(self.client.post(self.url('main:gift_claim')).status_code, 404)
+
+
+class MainGiftClaimContentionTests(TransactionTestCase):
+    def test_claimed_exactly_once(self):
+        """
+        Threads racing for the same gifts each win a gift at most once between them
+        """
+        from .management.commands.benchmark_claims import Command
+        results = Command().run(threads=4, gifts=25, rounds=2)
+        self.assertEqual(results['attempts'], 4 * 25 * 2)
+        self.assertEqual(results['wins'], 25 * 2)
+        self.assertEqual(results['conflicts'], results['attempts'] - results['wins'])
+        self.assertEqual(results['double_claims'], 0)
+        self.assertGreater(results['claims_per_second'], 0)
+
+
+class MainGiftSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserFactory.create()
+        cls.wishlist = Wishlist.objects.create(owner=cls.owner, name='Birthday')
+        cls.lego = Gift.objects.create(wishlist=cls.wishlist, name='Lego Millennium Falcon', store='Target')
+        cls.socks = Gift.objects.create(wishlist=cls.wishlist, name='Wool socks', notes='Not lego themed')
+        cls.book = Gift.objects.create(wishlist=cls.wishlist, name='Cookbook', store='Amazon', notes='Vegetarian')
+
+    def names(self, query, user=None, **kwargs):
+        return [gift.name for gift in search_gifts(query, user or self.owner, **kwargs)]
+
+    def test_ranked(self):
+        """
+        Matches in the name rank above matches in the notes
+        """
+        self.assertEqual(self.names('lego'), ['Lego Millennium Falcon', 'Wool socks'])
+        self.assertEqual(self.names('LEGO falcon'), ['Lego Millennium Falcon'])
+        self.assertEqual(self.names('amazon'), ['Cookbook'])
+        self.assertEqual(self.names('  '), [])
+
+    def test_prefix(self):
+        self.assertEqual(self.names('veg'), ['Cookbook'])
+        self.assertEqual(self.names('veg', prefix=False), [])
+
+    def test_only_visible_wishlists(self):
+        """
+        Another user's gifts, notes included, only turn up once their list is shared
+        """
+        other = UserFactory.create()
+        secret = Wishlist.objects.create(owner=other, name='Secret')
+        Gift.objects.create(wishlist=secret, name='Lego Death Star', notes='Hide it in the garage')
+        self.assertEqual(self.names('garage', other), ['Lego Death Star'])
+        self.assertEqual(self.names('garage'), [])
+        self.assertEqual(self.names('lego'), ['Lego Millennium Falcon', 'Wool socks'])
+        self.assertEqual(self.names('lego', prefix=False), ['Lego Millennium Falcon', 'Wool socks'])
+        self.assertEqual(self.names('lego', other), ['Lego Death Star'])
+        scan = ScanSearchBackend(connection).ranked_ids(['garage'], False, 10, Wishlist.objects.visible_to(self.owner))
+        self.assertEqual(scan, [])
+        secret.shared_with.add(self.owner)
+        self.assertEqual(self.names('garage'), ['Lego Death Star'])
+
+    def test_index_follows_changes(self):
+        """
+        The triggers keep the index in step with saves, updates, bulk inserts and deletes
+        """
+        self.book.name = 'Atlas'
+        self.book.save()
+        self.assertEqual(self.names('cookbook'), [])
+        self.assertEqual(self.names('atlas'), ['Atlas'])
+        Gift.objects.filter(pk=self.socks.pk).update(notes='')
+        self.assertEqual(self.names('lego'), ['Lego Millennium Falcon'])
+        Gift.objects.bulk_create([Gift(wishlist=self.wishlist, name='Lego Batmobile')])
+        self.assertEqual(self.names('batmobile'), ['Lego Batmobile'])
+        self.lego.delete()
+        self.assertEqual(self.names('falcon'), [])
+
+    def test_index_triggers_exist(self):
+        """
+        A migration that rebuilds main_gift on SQLite, such as an AlterField on Gift, silently drops the index
+        triggers, and must recreate them as migration 0004 explains
+        """
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'main_gift'")
+            triggers = {row[0] for row in cursor.fetchall()}
+        self.assertLessEqual({'main_gift_fts_insert', 'main_gift_fts_delete', 'main_gift_fts_update'}, triggers)
+
+    def test_reindex(self):
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO main_gift_fts(main_gift_fts) VALUES ('delete-all')")
+        self.assertEqual(self.names('lego'), [])
+        out = StringIO()
+        call_command('reindex_gift_search', batch_size=2, stdout=out)
+        self.assertIn('Indexed 3 gifts', out.getvalue())
+        self.assertEqual(self.names('lego'), ['Lego Millennium Falcon', 'Wool socks'])
+
+    def test_search_view(self):
+        self.client.force_login(self.owner)
+        url = reverse('main:gift_search')
+        self.assertContains(self.client.get(url, {'q': 'sock'}), 'Wool socks')
+        results = self.client.get(url, {'q': 'cook', 'format': 'json'}).json()['results']
+        self.assertEqual([r['name'] for r in results], ['Cookbook'])
+        self.assertEqual(results[0]['wishlist']['name'], 'Birthday')
+        self.assertNotIn('claimed_by', results[0])
+
+
+class MainAssignmentTests(SimpleTestCase):
+    def assertValid(self, pairs, people, excluded=None, teams=None):
+        self.assertEqual(sorted(pairs), sorted(people))
+        self.assertEqual(sorted(pairs.values()), sorted(people))
+        for giver, receiver in pairs.items():
+            self.assertNotEqual(giver, receiver)
+            self.assertNotIn(receiver, (excluded or {}).get(giver, ()))
+            if teams and teams.get(giver):
+                self.assertNotEqual(teams[giver], teams.get(receiver))
+
+    def test_derangement(self):
+        for n in range(2, 12):
+            people = list(range(n))
+            self.assertValid(assign(people, rng=random.Random(n)), people)
+
+    def test_dense_exclusions(self):
+        """
+        Teams of 10 and 50 random exclusions each, out of 200 people, still draw
+        """
+        rng = random.Random(1)
+        people = list(range(200))
+        teams = {person: person // 10 for person in people}
+        excluded = {person: set(rng.sample(people, 50)) for person in people}
+        self.assertValid(assign(people, excluded, teams, random.Random(2)), people, excluded, teams)
+
+    def test_only_one_way(self):
+        """
+        A cycle that exclusions leave only one way round is found, however the greedy pass starts
+        """
+        people = list(range(6))
+        excluded = {p: {q for q in people if q != (p + 1) % 6} for p in people}
+        for seed in range(10):
+            self.assertEqual(assign(people, excluded, rng=random.Random(seed)), {p: (p + 1) % 6 for p in people})
+
+    def test_no_valid_assignment(self):
+        with self.assertRaises(NoValidAssignment) as cm:
+            assign([1, 2], {1: {2}})
+        self.assertEqual(cm.exception.givers, [1])
+        self.assertEqual(cm.exception.receivers, [])
+
+        # A team of more than half the participants can't all give outside it
+        people = list(range(10))
+        teams = {person: 'big' if person < 6 else '' for person in people}
+        with self.assertRaises(NoValidAssignment) as cm:
+            assign(people, teams=teams)
+        self.assertGreater(len(cm.exception.givers), len(cm.exception.receivers))
+        self.assertTrue(set(cm.exception.givers) <= set(range(6)))
+
+        with self.assertRaises(NoValidAssignment):
+            assign([1])
+
+
+class MainExchangeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [UserFactory.create() for _ in range(12)]
+        cls.last_year = Exchange.objects.create(name='Last year', organiser=cls.users[0])
+        cls.exchange = Exchange.objects.create(name='This year', organiser=cls.users[0], previous=cls.last_year)
+        for exchange in (cls.last_year, cls.exchange):
+            Participant.objects.bulk_create([
+                Participant(exchange=exchange, user=user, team='Team {0}'.format(i // 4))
+                for i, user in enumerate(cls.users)
+            ])
+        # Partners on different teams
+        Participant.objects.filter(exchange=cls.exchange, user=cls.users[0]).update(partner=cls.users[5])
+
+    def test_exclusions(self):
+        self.last_year.draw(seed=1)
+        people, excluded, teams = self.exchange.exclusions()
+        self.assertEqual(sorted(people), sorted(user.pk for user in self.users))
+        self.assertIn(self.users[5].pk, excluded[self.users[0].pk])
+        self.assertIn(self.users[0].pk, excluded[self.users[5].pk])
+        for giver, receiver in self.last_year.assignments.values_list('giver_id', 'receiver_id'):
+            self.assertIn(receiver, excluded[giver])
+
+    def test_draw(self):
+        self.last_year.draw(seed=1)
+        previous = set(self.last_year.assignments.values_list('giver_id', 'receiver_id'))
+        teams = {user.pk: i // 4 for i, user in enumerate(self.users)}
+        for seed in range(5):
+            # Participants, last year's draw, then one DELETE, INSERT and UPDATE in a savepoint
+            with self.assertNumQueries(7):
+                pairs = self.exchange.draw(seed)
+            saved = set(self.exchange.assignments.values_list('giver_id', 'receiver_id'))
+            self.assertEqual(saved, set(pairs.items()))
+            self.assertEqual(len(saved), len(self.users))
+            self.assertFalse(saved & previous)
+            self.assertNotEqual(pairs[self.users[0].pk], self.users[5].pk)
+            self.assertNotEqual(pairs[self.users[5].pk], self.users[0].pk)
+            self.assertTrue(all(teams[giver] != teams[receiver] for giver, receiver in pairs.items()))
+        self.exchange.refresh_from_db()
+        self.assertIsNotNone(self.exchange.drawn_at)
+
+    def test_failed_draw_keeps_previous(self):
+        self.exchange.draw(seed=1)
+        before = set(self.exchange.assignments.values_list('giver_id', 'receiver_id'))
+        self.exchange.participants.update(team='Everyone')
+        with self.assertRaises(NoValidAssignment):
+            self.exchange.draw()
+        self.assertEqual(set(self.exchange.assignments.values_list('giver_id', 'receiver_id')), before)
+
+    def test_benchmark(self):
+        from .management.commands.benchmark_exchange import Command
+        results = Command().run(participants=200, team_size=10, exclusions=50, repeat=1)
+        self.assertGreater(results['exclusions_per_participant'], 50)
+        self.assertGreater(results['engine']['best_ms'], 0)
+
+
+class MainWishlistShareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserFactory.create(first_name='Jane')
+        cls.friend = UserFactory.create()
+        cls.wishlist = Wishlist.objects.create(owner=cls.owner, name='Birthday')
+        cls.gift = Gift.objects.create(wishlist=cls.wishlist, name='Lego', claimed_by=cls.friend)
+        cls.url = reverse('main:wishlist_share', kwargs={'token': make_share_token(cls.wishlist)})
+
+    def version(self):
+        return Wishlist.objects.get(pk=self.wishlist.pk).version
+
+    def test_share_page(self):
+        """
+        Anyone with the link sees the list without claims, and the page is the same for everyone
+        """
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Lego')
+        self.assertNotContains(response, 'Claim')
+        self.assertEqual(response['ETag'], '"wishlist-{0}-{1}"'.format(self.wishlist.pk, self.version()))
+        self.assertIn('Last-Modified', response)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=60', response['Cache-Control'])
+
+        self.client.force_login(self.friend)
+        # Wishlist version, then wishlist + owner and gifts; no session or user
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertNotIn('Cookie', response.get('Vary', ''))
+        self.assertNotContains(response, 'Logout')
+
+    def test_bad_token(self):
+        self.assertEqual(self.client.get(self.url[:-2] + '/').status_code, 404)
+        token = make_share_token(Wishlist(pk=self.wishlist.pk + 100))
+        self.assertEqual(self.client.get(reverse('main:wishlist_share', kwargs={'token': token})).status_code, 404)
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        with self.assertNumQueries(1):
+            cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        self.assertIn('public', cached['Cache-Control'])
+        cached = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_edits_bump_version(self):
+        """
+        Changing the list or its gifts gives the page a new ETag, so cached copies are replaced
+        """
+        etag = self.client.get(self.url)['ETag']
+        version = self.version()
+
+        self.wishlist.description = 'Turning 30'
+        self.wishlist.save()
+        self.assertEqual(self.wishlist.version, version + 1)
+        gift = Gift.objects.create(wishlist=self.wishlist, name='Socks')
+        gift.price = 10
+        gift.save()
+        gift.delete()
+        self.assertEqual(self.version(), version + 4)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Turning 30')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_queryset_writes_bump_version(self):
+        version = self.version()
+        Gift.objects.bulk_create([Gift(wishlist=self.wishlist, name='Socks')])
+        self.assertEqual(self.version(), version + 1)
+        Gift.objects.filter(wishlist=self.wishlist).update(notes='Size 9')
+        self.assertEqual(self.version(), version + 2)
+        Gift.objects.filter(name='Socks').delete()
+        self.assertEqual(self.version(), version + 3)
+        # Claims aren't on the share page
+        self.wishlist.gifts.update(claimed_by=None, claimed_at=None)
+        self.assertEqual(self.version(), version + 3)
+
+    def test_claims_keep_version(self):
+        version = self.version()
+        self.assertEqual(Gift.objects.unclaim(self.gift.pk, self.friend), Gift.CLAIM_OK)
+        self.assertEqual(Gift.objects.claim(self.gift.pk, self.friend), Gift.CLAIM_OK)
+        self.assertEqual(self.version(), version)
+
+    def test_owner_sees_share_link(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('main:wishlist_detail', kwargs={'pk': self.wishlist.pk}))
+        self.assertContains(response, 'http://testserver/shared/')
+        self.assertContains(response, reverse('main:wishlist_share_reset', kwargs={'pk': self.wishlist.pk}))
+
+    def test_reset_link(self):
+        """
+        Resetting the share key revokes the links made before, and only the owner can do it
+        """
+        reset_url = reverse('main:wishlist_share_reset', kwargs={'pk': self.wishlist.pk})
+        self.client.force_login(self.friend)
+        self.assertEqual(self.client.post(reset_url).status_code, 404)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        self.client.force_login(self.owner)
+        self.assertRedirects(self.client.post(reset_url), reverse('main:wishlist_detail', kwargs={'pk': self.wishlist.pk}))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        token = make_share_token(Wishlist.objects.get(pk=self.wishlist.pk))
+        self.assertEqual(self.client.get(reverse('main:wishlist_share', kwargs={'token': token})).status_code, 200)
+
+    def test_link_expires(self):
+        with self.settings(WISHLIST_SHARE_LINK_MAX_AGE=-1):
+            self.assertEqual(self.client.get(self.url).status_code, 404)
@@ -0,0 +1,20 @@
+from django.urls import path
+
+from .views import *
+
+app_name = 'main'
+
+urlpatterns = [
+    path('', HomeView.as_view(), name='home'),
+    path('wishlists/', WishlistListView.as_view(), name='wishlist_list'),
+    path('wishlists/new/', WishlistCreateView.as_view(), name='wishlist_create'),
+    path('wishlists/<int:pk>/', WishlistDetailView.as_view(), name='wishlist_detail'),
+    path('wishlists/<int:pk>/share/', WishlistShareWithView.as_view(), name='wishlist_share_with'),
+    path('wishlists/<int:pk>/unshare/<int:user_pk>/', WishlistShareWithView.as_view(share=False), name='wishlist_unshare'),
+    path('wishlists/<int:pk>/share/reset/', WishlistShareLinkResetView.as_view(), name='wishlist_share_reset'),
+    path('shared/<str:token>/', WishlistShareView.as_view(), name='wishlist_share'),
+    path('gifts/search/', GiftSearchView.as_view(), name='gift_search'),
+    path('wishlists/<int:pk>/gifts/new/', GiftCreateView.as_view(), name='gift_create'),
+    path('wishlists/<int:pk>/gifts/<int:gift_pk>/claim/', GiftClaimView.as_view(), name='gift_claim'),
+    path('wishlists/<int:pk>/gifts/<int:gift_pk>/unclaim/', GiftClaimView.as_view(claim=False), name='gift_unclaim'),
+]
@@ -1,3 +1,307 @@
-from django.shortcuts import render
+from calendar import timegm
 
-# Create your views here.
+from django.conf import settings
+from django.http import Http404, JsonResponse, HttpResponse, HttpResponseBadRequest
+from django.db.models import F
+from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views import View
+from django.views.generic import TemplateView
+from django.contrib.auth.mixins import LoginRequiredMixin
+
+from gifttracker.db import ReplicaReadMixin
+
+from .forms import WishlistForm, GiftForm, ShareWishlistForm
+from .models import Wishlist, Gift
+from .pagination import KeysetPaginator, InvalidCursor
+from .search import search_gifts
+from .sharing import make_share_token, parse_share_token
+
+
+class KeysetPaginationMixin:
+    """
+    Paginates with opaque `?cursor=` values instead of page numbers. Add `?format=json` for the JSON variant.
+    """
+    ordering = ('id',)
+    paginate_by = 50
+
+    def paginate(self, queryset):
+        paginator = KeysetPaginator(queryset, self.ordering, self.paginate_by)
+        return paginator.page(self.request.GET.get('cursor'))
+
+    def wants_json(self):
+        return self.request.GET.get('format') == 'json'
+
+
+def wishlist_json(wishlist):
+    return {
+        'id': wishlist.pk,
+        'name': wishlist.name,
+        'description': wishlist.description,
+        'gift_count': wishlist.gift_count,
+        'url': reverse('main:wishlist_detail', kwargs={'pk': wishlist.pk}),
+    }
+
+
+def wishlist_json_summary(wishlist):
+    return {
+        'id': wishlist.pk,
+        'name': wishlist.name,
+        'url': reverse('main:wishlist_detail', kwargs={'pk': wishlist.pk}),
+    }
+
+
+def gift_json(gift, show_claims):
+    data = {
+        'id': gift.pk,
+        'name': gift.name,
+        'notes': gift.notes,
+        'store': gift.store,
+        'url': gift.url,
+        'price': None if gift.price is None else str(gift.price),
+        'priority': gift.priority,
+    }
+    if show_claims:
+        data['claimed_by'] = gift.claimed_by.get_short_name() if gift.claimed_by else None
+    return data
+
+
+class HomeView(TemplateView):
+    template_name = 'main/index.html'
+
+
+class WishlistListView(LoginRequiredMixin, ReplicaReadMixin, KeysetPaginationMixin, View):
+    """
+    The current user's wishlists and those shared with them, newest first
+    """
+    template_name = 'main/wishlist_list.html'
+    ordering = ('-created', '-id')
+
+    def get(self, request):
+        try:
+            page = self.paginate(Wishlist.objects.visible_to(request.user).for_index())
+        except InvalidCursor:
+            return HttpResponseBadRequest('Invalid cursor')
+
+        if self.wants_json():
+            return JsonResponse({
+                'results': [wishlist_json(w) for w in page],
+                'next_cursor': page.next_cursor,
+            })
+        return render(request, self.template_name, {'wishlists': page})
+
+
+class WishlistDetailView(LoginRequiredMixin, ReplicaReadMixin, KeysetPaginationMixin, View):
+    """
+    A wishlist and its gifts, highest priority first
+    """
+    template_name = 'main/wishlist_detail.html'
+    ordering = ('priority', 'id')
+
+    def get(self, request, pk):
+        wishlist = get_object_or_404(Wishlist.objects.visible_to(request.user).for_detail(), pk=pk)
+        try:
+            gifts = self.paginate(wishlist.gifts.for_listing())
+        except InvalidCursor:
+            return HttpResponseBadRequest('Invalid cursor')
+        # Owners shouldn't find out what has been claimed for them
+        show_claims = wishlist.owner_id != request.user.pk
+
+        if self.wants_json():
+            return JsonResponse({
+                'results': [gift_json(g, show_claims) for g in gifts],
+                'next_cursor': gifts.next_cursor,
+            })
+        context = {
+            'wishlist': wishlist,
+            'gifts': gifts,
+            'show_claims': show_claims,
+        }
+        if wishlist.owner_id == request.user.pk:
+            context['share_url'] = request.build_absolute_uri(
+                reverse('main:wishlist_share', kwargs={'token': make_share_token(wishlist)}))
+        return render(request, self.template_name, context)
+
+
+class WishlistShareView(KeysetPaginationMixin, View):
+    """
+    A read-only wishlist for anyone with its share link, without claims. It never reads the session or
+    request.user, so one copy suits every visitor and can be cached publicly. Copies are revalidated by
+    the wishlist's version, which is checked without loading or rendering the page.
+    """
+    template_name = 'main/wishlist_share.html'
+    ordering = ('priority', 'id')
+
+    def get(self, request, token):
+        parsed = parse_share_token(token)
+        if parsed is None:
+            raise Http404('No such wishlist')
+        # Links made before the owner last reset the share key find nothing
+        wishlists = Wishlist.objects.filter(pk=parsed[0], share_key=parsed[1])
+        versions = list(wishlists.values_list('pk', 'version', 'updated'))
+        if not versions:
+            raise Http404('No such wishlist')
+        pk, version, updated = versions[0]
+        response = get_conditional_response(
+            request, etag=self.etag(pk, version), last_modified=timegm(updated.utctimetuple()))
+        if response is None:
+            wishlist = get_object_or_404(wishlists.for_detail())
+            try:
+                gifts = self.paginate(wishlist.gifts.all())
+            except InvalidCursor:
+                return HttpResponseBadRequest('Invalid cursor')
+            # Without the request, so no context processor looks up the visitor
+            response = HttpResponse(render_to_string(self.template_name, {'wishlist': wishlist, 'gifts': gifts}))
+            # The version the page was rendered from, in case it changed since the check above
+            version, updated = wishlist.version, wishlist.updated
+
+        response['ETag'] = self.etag(pk, version)
+        response['Last-Modified'] = http_date(timegm(updated.utctimetuple()))
+        patch_cache_control(response, public=True, max_age=getattr(settings, 'WISHLIST_SHARE_MAX_AGE', 60))
+        return response
+
+    @staticmethod
+    def etag(pk, version):
+        return quote_etag('wishlist-{0}-{1}'.format(pk, version))
+
+
+class WishlistShareLinkResetView(LoginRequiredMixin, View):
+    """
+    Revokes every share link for one of the current user's wishlists, so only the new link works
+    """
+    def post(self, request, pk):
+        if not request.user.wishlists.filter(pk=pk).update(share_key=F('share_key') + 1):
+            raise Http404('No such wishlist')
+        return redirect('main:wishlist_detail', pk=pk)
+
+
+class GiftSearchView(LoginRequiredMixin, ReplicaReadMixin, View):
+    """
+    Gifts on the user's own and shared wishlists matching the `?q=` words, best match first. The last word matches as a prefix,
+    so `?format=json` can back a typeahead.
+    """
+    template_name = 'main/gift_search.html'
+    limit = 50
+    typeahead_limit = 10
+
+    def get(self, request):
+        query = request.GET.get('q', '')
+        if request.GET.get('format') == 'json':
+            return JsonResponse({
+                'results': [
+                    dict(gift_json(gift, show_claims=False), wishlist=wishlist_json_summary(gift.wishlist))
+                    for gift in search_gifts(query, request.user, self.typeahead_limit)
+                ],
+            })
+        return render(request, self.template_name, {'query': query, 'gifts': search_gifts(query, request.user, self.limit)})
+
+
+class WishlistCreateView(LoginRequiredMixin, View):
+    """
+    Create a new wishlist for the current user
+    """
+    form_class = WishlistForm
+    template_name = 'main/wishlist_form.html'
+
+    def get(self, request):
+        form = self.form_class()
+        return render(request, self.template_name, {'form': form})
+
+    def post(self, request):
+        form = self.form_class(request.POST)
+
+        if form.is_valid():
+            wishlist = form.save(commit=False)
+            wishlist.owner = request.user
+            wishlist.save()
+            return redirect('main:wishlist_detail', pk=wishlist.pk)
+        else:
+            return render(request, self.template_name, {'form': form})
+
+
+class GiftCreateView(LoginRequiredMixin, View):
+    """
+    Add a gift to one of the current user's wishlists
+    """
+    form_class = GiftForm
+    template_name = 'main/gift_form.html'
+
+    def get(self, request, pk):
+        wishlist = get_object_or_404(request.user.wishlists, pk=pk)
+        form = self.form_class()
+        return render(request, self.template_name, {'form': form, 'wishlist': wishlist})
+
+    def post(self, request, pk):
+        wishlist = get_object_or_404(request.user.wishlists, pk=pk)
+        form = self.form_class(request.POST)
+
+        if form.is_valid():
+            gift = form.save(commit=False)
+            gift.wishlist = wishlist
+            gift.save()
+            return redirect('main:wishlist_detail', pk=wishlist.pk)
+        else:
+            return render(request, self.template_name, {'form': form, 'wishlist': wishlist})
+
+
+class GiftClaimView(LoginRequiredMixin, View):
+    """
+    Claim a gift on someone else's wishlist, or with claim=False release it again. When several people
+    claim the same gift at once, one wins and the rest get a 409 Conflict. Add `?format=json` for the JSON variant.
+    """
+    claim = True
+    template_name = 'main/gift_conflict.html'
+
+    def post(self, request, pk, gift_pk):
+        gifts = Gift.objects.filter(wishlist__in=Wishlist.objects.visible_to(request.user).filter(pk=pk))
+        if self.claim:
+            result = gifts.claim(gift_pk, request.user)
+        else:
+            result = gifts.unclaim(gift_pk, request.user)
+        if result == Gift.CLAIM_NOT_FOUND:
+            raise Http404('No such gift')
+
+        status = 409 if result == Gift.CLAIM_CONFLICT else 200
+        if request.GET.get('format') == 'json':
+            return JsonResponse({'result': result, 'claimed': self.claim == (result == Gift.CLAIM_OK)}, status=status)
+        if status == 409:
+            gift = get_object_or_404(gifts.select_related('wishlist'), pk=gift_pk)
+            return render(request, self.template_name, {'gift': gift, 'wishlist': gift.wishlist}, status=status)
+        return redirect('main:wishlist_detail', pk=pk)
+
+
+class WishlistShareWithView(LoginRequiredMixin, View):
+    """
+    The people one of the current user's wishlists is shared with. The owner can add someone by email,
+    or with share=False stop sharing with them.
+    """
+    share = True
+    form_class = ShareWishlistForm
+    template_name = 'main/wishlist_share_with.html'
+
+    def get(self, request, pk):
+        wishlist = get_object_or_404(request.user.wishlists, pk=pk)
+        return self.render(request, wishlist, self.form_class(owner=request.user))
+
+    def post(self, request, pk, user_pk=None):
+        wishlist = get_object_or_404(request.user.wishlists, pk=pk)
+        if not self.share:
+            wishlist.shared_with.remove(user_pk)
+            return redirect('main:wishlist_share_with', pk=pk)
+
+        form = self.form_class(request.POST, owner=request.user)
+        if form.is_valid():
+            wishlist.shared_with.add(form.user)
+            return redirect('main:wishlist_share_with', pk=pk)
+        return self.render(request, wishlist, form)
+
+    def render(self, request, wishlist, form):
+        context = {
+            'wishlist': wishlist,
+            'form': form,
+            'shared_with': wishlist.shared_with.order_by('first_name', 'email'),
+        }
+        return render(request, self.template_name, context)